@@ -0,0 +1,192 @@
+"""Akamai Reporting API v2 backend with EdgeGrid signing — no browser needed.
+
+Requests are signed with the EG1-HMAC-SHA256 scheme using credentials from an
+.edgerc file and sent over a small pool of keep-alive connections; the report
+executor issues one request per report type, at most MAX_WORKERS at a time.
+Responses are converted with the same helpers as the in-page endpoint path, so
+outputs match the UI flow.
+"""
+
+import base64
+import configparser
+import hashlib
+import hmac
+import http.client
+import json
+import queue
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from urllib.parse import urlencode, urlsplit
+
+from scripts.cloudfront import convert_dates_to_utc
+from scripts.config import ReportConfig
+from scripts.data_extract import build_report_output
+from scripts.report_api import geography_from_response, traffic_from_response
+
+# Reporting API v2 data endpoints for each report page
+API_ENDPOINTS = {
+    'hostname': '/reporting-api/v2/reports/delivery/traffic/current/data',
+    'geography': '/reporting-api/v2/reports/delivery/traffic/current/data',
+}
+
+# Dimensions and metrics requested for each report page
+API_QUERIES = {
+    'hostname': (['time1day'], ['edgeBytesSum', 'originBytesSum', 'midgressBytesSum']),
+    'geography': (['country'], ['edgeBytesSum']),
+}
+
+# EdgeGrid signs at most this many bytes of a POST body
+MAX_BODY = 131072
+
+# Concurrent requests (the edgegrid resource capacity in akamai_report)
+MAX_WORKERS = 4
+
+
+class ApiError(RuntimeError):
+    """Non-2xx response from the Akamai API."""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f'HTTP {status}: {body[:200]}')
+        self.status = status
+
+
+@dataclass
+class EdgeRc:
+    host: str
+    client_token: str
+    client_secret: str
+    access_token: str
+
+
+def load_edgerc(path: str, section: str = 'default') -> EdgeRc:
+    """Read EdgeGrid credentials from an .edgerc file section."""
+    parser = configparser.ConfigParser()
+    if not parser.read(path):
+        raise FileNotFoundError(f'.edgerc not found: {path}')
+    cfg = parser[section]
+    return EdgeRc(
+        host=cfg['host'].removeprefix('https://').rstrip('/'),
+        client_token=cfg['client_token'],
+        client_secret=cfg['client_secret'],
+        access_token=cfg['access_token'],
+    )
+
+
+def _hmac_b64(key: bytes, msg: str) -> str:
+    return base64.b64encode(hmac.new(key, msg.encode(), hashlib.sha256).digest()).decode()
+
+
+def sign_request(
+    creds: EdgeRc,
+    method: str,
+    host: str,
+    path: str,
+    body: bytes = b'',
+    timestamp: str | None = None,
+    nonce: str | None = None,
+) -> str:
+    """Build the EG1-HMAC-SHA256 Authorization header for a request.
+
+    path includes the query string. timestamp and nonce are generated when omitted.
+    """
+    timestamp = timestamp or datetime.now(UTC).strftime('%Y%m%dT%H:%M:%S+0000')
+    nonce = nonce or str(uuid.uuid4())
+    auth = (
+        f'EG1-HMAC-SHA256 client_token={creds.client_token};access_token={creds.access_token};'
+        f'timestamp={timestamp};nonce={nonce};'
+    )
+    content_hash = ''
+    if method.upper() == 'POST' and body:
+        content_hash = base64.b64encode(hashlib.sha256(body[:MAX_BODY]).digest()).decode()
+    data = '\t'.join([method.upper(), 'https', host, path, '', content_hash, auth])
+    signing_key = _hmac_b64(creds.client_secret.encode(), timestamp)
+    return auth + 'signature=' + _hmac_b64(signing_key.encode(), data)
+
+
+class ApiClient:
+    """Signed JSON client over a pool of keep-alive connections.
+
+    base_url overrides the scheme and host from the credentials (used by tests
+    to point at a local stub server).
+    """
+
+    def __init__(self, creds: EdgeRc, base_url: str | None = None, timeout: float = 60):
+        self.creds = creds
+        url = urlsplit(base_url or f'https://{creds.host}')
+        self._conn_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self._netloc = url.netloc
+        self._timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._conn_class(self._netloc, timeout=self._timeout), False
+
+    def request(self, method: str, path: str, params: dict | None = None, body: dict | None = None) -> dict:
+        """Send a signed request and return the decoded JSON response.
+
+        A pooled connection closed by the server is retried once on a fresh one.
+
+        Raises:
+            ApiError: on a non-2xx response
+        """
+        target = f'{path}?{urlencode(params)}' if params else path
+        data = json.dumps(body).encode() if body is not None else b''
+        headers = {
+            'Authorization': sign_request(self.creds, method, self._netloc, target, data),
+            'Accept': 'application/json',
+        }
+        if data:
+            headers['Content-Type'] = 'application/json'
+        while True:
+            conn, reused = self._acquire()
+            try:
+                conn.request(method, target, body=data or None, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+            self._pool.put(conn)
+            if resp.status >= 400:
+                raise ApiError(resp.status, payload.decode(errors='replace'))
+            return json.loads(payload)
+
+    def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+def build_api_query(page: str, config: ReportConfig, start_date: str, end_date: str) -> tuple[dict, dict]:
+    """Build (query params, JSON body) for a report page, date range and CP codes."""
+    dimensions, metrics = API_QUERIES[page]
+    start, end = convert_dates_to_utc(start_date, end_date)
+    body = {'dimensions': dimensions, 'metrics': metrics}
+    if config.cp_codes != ['ALL']:
+        body['filters'] = [{'dimensionName': 'cpcode', 'operator': 'IN_LIST', 'expressions': config.cp_codes}]
+    return {'start': start, 'end': end}, body
+
+
+def fetch_report(client: ApiClient, name: str, config: ReportConfig, start_date: str, end_date: str) -> dict:
+    """Fetch one report type and return the same output dict as the UI flow."""
+    page = 'geography' if name == 'geography' else 'hostname'
+    params, body = build_api_query(page, config, start_date, end_date)
+    doc = client.request('POST', API_ENDPOINTS[page], params, body)
+    if page == 'geography':
+        traffic, geography = {}, geography_from_response(doc, config.geo_countries)
+    else:
+        traffic, geography = traffic_from_response(doc, config.unit), None
+    return build_report_output(
+        report_type=name,
+        label=config.label,
+        start_date=start_date,
+        end_date=end_date,
+        traffic=traffic,
+        unit=config.unit,
+        geography=geography,
+    )
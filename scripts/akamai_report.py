@@ -3,20 +3,71 @@
 import argparse
 import functools
 import json
-import time
+import os
+import subprocess
+from collections.abc import Callable
+from http.client import HTTPException
 from pathlib import Path
 
-from scripts.browser_helpers import ab_eval, ab_screenshot, close_browser, init_browser, navigate_to_report, run_ab
+from scripts.akamai_api import MAX_WORKERS as API_WORKERS
+from scripts.akamai_api import ApiClient, ApiError, fetch_report, load_edgerc
+from scripts.browser_helpers import (
+    RetryPolicy,
+    ab_eval,
+    ab_screenshot,
+    close_browser,
+    init_browser,
+    navigate_to_report,
+    page_state,
+    reinit_browser,
+    retry,
+    run_ab,
+    start_recording,
+    start_replay,
+    stop_cassette,
+)
 from scripts.calendar_nav import set_date_range
 from scripts.cloudfront import fetch_cloudfront_bytes
-from scripts.config import AKAMAI_URL, CLOUDFRONT_CONFIG, REPORT_TYPES, STATE_FILE
+from scripts.config import (
+    AKAMAI_URL,
+    CLOUDFRONT_CONFIG,
+    DATASTREAM_CONFIG,
+    EDGEGRID_CONFIG,
+    REPORT_TYPES,
+    STATE_FILE,
+    ReportConfig,
+)
+from scripts.contract_check import REPORT_PAGES, ContractRecorder
 from scripts.cpcode_select import CP_EDITOR_ID, select_cp_codes
+from scripts.cube import CUBE_PATH, store_results
+from scripts.cube import connect as connect_cube
 from scripts.data_extract import (
+    aggregate_series_daily,
     build_report_output,
     convert_unit,
+    export_table_csv,
+    extract_chart_series,
+    extract_cp_code_breakdown,
     extract_geography_table,
     extract_traffic_cards,
+    read_geography_csv,
+    traffic_for_cp_codes,
 )
+from scripts.datastream import geography_report as datastream_geography
+from scripts.datastream import hostname_report as datastream_hostname
+from scripts.datastream import ingest as ingest_datastream
+from scripts.deadline import DeadlineExceeded, deadline, pause
+from scripts.planner import (
+    FilterState,
+    PendingReport,
+    apply_report,
+    format_plan,
+    plan_in_order,
+    plan_reports,
+    report_steps,
+)
+from scripts.report_api import build_report_url, fetch_reports, geography_from_response, traffic_from_response
+from scripts.sources import Job, Resource, Source, SourceError, run_jobs
 
 # Force unbuffered print so logs appear in real-time
 print = functools.partial(print, flush=True)  # noqa: A001
@@ -29,6 +80,9 @@ WAIT_UI_UPDATE = 2
 WAIT_REPORT_LOAD = 10
 WAIT_BROWSER_INIT = 5
 
+# Contract-check page key for each report page
+CONTRACT_PAGE = {name: page for page, name in REPORT_PAGES.items()}
+
 
 def _setup_report_filters(
     report_type: str,
@@ -36,44 +90,71 @@ def _setup_report_filters(
     config,
     start_date: str,
     end_date: str,
+    recorder: ContractRecorder | None = None,
 ) -> None:
     """Navigate to report page and apply date range + CP code filters.
 
     Shared setup flow for both hostname and geography reports:
     navigate → open filter panel → set date → select CP codes → Apply.
+    Steps already satisfied by the session's current page and filters are
+    skipped (see planner.report_steps).
+    With a recorder, 'filter' phase contract counts are taken while the panel is open.
     """
     print(f'[{report_type}] Running: {config.label}')
 
-    navigate_to_report(report_page)
+    # Forget the filters until Apply succeeds: a report failing part-way
+    # leaves the page in an unknown state
+    state = page_state()
+    previous = state.pop('filters', FilterState())
+    dates = (start_date, end_date)
+    report = PendingReport(report_type, report_page, tuple(config.cp_codes))
+    steps = report_steps(previous, report, dates)
+
+    if 'navigate' in steps:
+        navigate_to_report(report_page)
+    if 'open_filters' not in steps:
+        state['filters'] = previous
+        print(f'[{report_type}] Filters already applied, skipping filter panel')
+        return
 
     # Open filter panel (wait command blocks until element appears)
     ab_eval("document.querySelector('app-date-range-preview')?.click()")
     run_ab('wait', f'#{CP_EDITOR_ID}')
+    if recorder:
+        recorder.record(CONTRACT_PAGE[report_page], 'filter')
 
     # Set date range
-    print(f'[{report_type}] Setting date range: {start_date} to {end_date}')
-    set_date_range(start_date, end_date)
-    time.sleep(WAIT_UI_UPDATE)
+    if 'date_range' in steps:
+        print(f'[{report_type}] Setting date range: {start_date} to {end_date}')
+        set_date_range(start_date, end_date)
+        pause(WAIT_UI_UPDATE)
 
     # Select CP codes
-    print(f'[{report_type}] Selecting CP codes: {config.cp_codes}')
-    select_cp_codes(config)
-    time.sleep(WAIT_UI_UPDATE)
+    if 'cp_codes' in steps:
+        print(f'[{report_type}] Selecting CP codes: {config.cp_codes}')
+        select_cp_codes(config)
+        pause(WAIT_UI_UPDATE)
 
     # Click Apply
     run_ab('scrollintoview', "button:has-text('Apply')")
     run_ab('click', "button:has-text('Apply')")
-    time.sleep(WAIT_REPORT_LOAD)
+    pause(WAIT_REPORT_LOAD)
+    state['filters'] = apply_report(previous, report, dates)
 
 
-def run_akamai_report(report_type: str, start_date: str, end_date: str) -> dict:
+def run_akamai_report(
+    report_type: str, start_date: str, end_date: str, recorder: ContractRecorder | None = None
+) -> dict:
     """Run a single Akamai traffic-by-hostname report type. Browser must already be initialized."""
     config = REPORT_TYPES[report_type]
-    _setup_report_filters(report_type, 'Traffic by Hostname', config, start_date, end_date)
+    _setup_report_filters(report_type, 'Traffic by Hostname', config, start_date, end_date, recorder)
 
     # Extract traffic data
     print(f'[{report_type}] Extracting traffic data...')
     cards = extract_traffic_cards()
+    daily = aggregate_series_daily(extract_chart_series())
+    if recorder:
+        recorder.record('hostname', 'data')
 
     traffic = {}
     for key in ['edge', 'origin', 'midgress', 'offload']:
@@ -99,17 +180,35 @@ def run_akamai_report(report_type: str, start_date: str, end_date: str) -> dict:
         end_date=end_date,
         traffic=traffic,
         unit=config.unit,
+        daily=daily,
     )
 
 
-def run_geography_report(start_date: str, end_date: str) -> dict:
-    """Run geography report (Traffic by Geography). Browser must already be initialized."""
+def run_geography_report(
+    start_date: str, end_date: str, recorder: ContractRecorder | None = None, extraction: str = 'dom'
+) -> dict:
+    """Run geography report (Traffic by Geography). Browser must already be initialized.
+
+    extraction='dom' reads the rendered table; extraction='csv' downloads the
+    widget's CSV export and parses it, which avoids paging through large tables.
+    """
     config = REPORT_TYPES['geography']
-    _setup_report_filters('geography', 'Traffic by Geography', config, start_date, end_date)
+    _setup_report_filters('geography', 'Traffic by Geography', config, start_date, end_date, recorder)
 
     # Extract geography data
-    print('[geography] Extracting geography data...')
-    geography = extract_geography_table(config.geo_countries)
+    geography = None
+    if extraction == 'csv':
+        csv_path = OUTPUT_DIR / f'geography_{start_date}_{end_date}.csv'
+        print(f'[geography] Exporting geography CSV: {csv_path}')
+        try:
+            geography = read_geography_csv(export_table_csv(csv_path), config.geo_countries)
+        except ValueError as e:
+            print(f'[geography] CSV export unreadable ({e}), reading the table instead')
+    if geography is None:
+        print('[geography] Extracting geography data...')
+        geography = extract_geography_table(config.geo_countries)
+    if recorder:
+        recorder.record('geography', 'data')
 
     # Take screenshot
     screenshot_path = str(OUTPUT_DIR / f'geography_{start_date}_{end_date}.png')
@@ -127,6 +226,86 @@ def run_geography_report(start_date: str, end_date: str) -> dict:
     )
 
 
+def run_cp_code_batch(
+    report_types: list[str], start_date: str, end_date: str, recorder: ContractRecorder | None = None
+) -> dict[str, dict]:
+    """Run hostname report types with one Apply over the union of their CP codes.
+
+    Reads the per-CP-code breakdown once and sums each type's CP codes locally.
+    Returns outputs for the types whose CP codes were all in the breakdown.
+    """
+    codes = [code for name in report_types for code in REPORT_TYPES[name].cp_codes]
+    union = ['ALL'] if 'ALL' in codes else list(dict.fromkeys(codes))
+    batch = ReportConfig(label=f'{len(report_types)} report types', cp_codes=union, unit='TB')
+    _setup_report_filters('cp-batch', 'Traffic by Hostname', batch, start_date, end_date, recorder)
+
+    print(f'[cp-batch] Extracting CP code breakdown for {len(report_types)} report types...')
+    breakdown = extract_cp_code_breakdown()
+    if recorder:
+        recorder.record('hostname', 'data')
+
+    screenshot_path = str(OUTPUT_DIR / f'cp_batch_{start_date}_{end_date}.png')
+    ab_screenshot(screenshot_path)
+    print(f'[cp-batch] Screenshot: {screenshot_path}')
+
+    results = {}
+    for name in report_types:
+        config = REPORT_TYPES[name]
+        try:
+            traffic = traffic_for_cp_codes(breakdown, config.cp_codes, config.unit)
+        except KeyError as e:
+            print(f'[{name}] {e.args[0]}')
+            continue
+        results[name] = build_report_output(
+            report_type=name,
+            label=config.label,
+            start_date=start_date,
+            end_date=end_date,
+            traffic=traffic,
+            unit=config.unit,
+        )
+    return results
+
+
+def run_api_reports(report_types: list[str], start_date: str, end_date: str) -> dict[str, dict]:
+    """Fetch report types from the reports app's JSON endpoints in one page evaluation.
+
+    Skips the filter UI and screenshots. Returns outputs for the types that
+    succeeded; failed types are left out so the caller can run them through the UI.
+    """
+    print(f'[api] Fetching {len(report_types)} report(s): {start_date} to {end_date}')
+    urls = {
+        name: build_report_url(
+            'geography' if name == 'geography' else 'hostname', REPORT_TYPES[name], start_date, end_date
+        )
+        for name in report_types
+    }
+    results = {}
+    for name, doc in fetch_reports(urls).items():
+        if doc is None:
+            # Request failed (already reported by fetch_reports)
+            continue
+        config = REPORT_TYPES[name]
+        try:
+            if name == 'geography':
+                traffic, geography = {}, geography_from_response(doc, config.geo_countries)
+            else:
+                traffic, geography = traffic_from_response(doc, config.unit), None
+        except (KeyError, TypeError, ValueError) as e:
+            print(f'[{name}] Unexpected API response ({e!r}), falling back to UI')
+            continue
+        results[name] = build_report_output(
+            report_type=name,
+            label=config.label,
+            start_date=start_date,
+            end_date=end_date,
+            traffic=traffic,
+            unit=config.unit,
+            geography=geography,
+        )
+    return results
+
+
 def run_cloudfront_report(start_date: str, end_date: str) -> dict:
     """Run CloudFront BytesDownloaded report."""
     print(f'[cloudfront] Fetching CloudFront metrics: {start_date} to {end_date}')
@@ -145,6 +324,314 @@ def run_cloudfront_report(start_date: str, end_date: str) -> dict:
     }
 
 
+# Whole browser reports are not retried on transient errors (the steps retry themselves),
+# but a lost session restarts the browser once and reruns the report
+REPORT_RETRY = RetryPolicy(attempts=1)
+
+
+def _reinit_browser() -> None:  # pragma: no cover
+    reinit_browser()
+    pause(WAIT_BROWSER_INIT)
+
+
+class BrowserHostnameSource(Source):
+    """Hostname report types through the filter UI."""
+
+    name = 'browser'
+    resources = ('browser',)
+
+    def __init__(self, recorder: ContractRecorder | None = None):
+        self.recorder = recorder
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        return retry(
+            lambda: run_akamai_report(report_type, start_date, end_date, self.recorder),
+            REPORT_RETRY,
+            on_session_lost=_reinit_browser,
+        )
+
+
+class BrowserGeographySource(Source):
+    """Geography report through the filter UI (table scrape or CSV export)."""
+
+    name = 'browser'
+    resources = ('browser',)
+
+    def __init__(self, recorder: ContractRecorder | None = None, extraction: str = 'dom'):
+        self.recorder = recorder
+        self.extraction = extraction
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        return retry(
+            lambda: run_geography_report(start_date, end_date, self.recorder, self.extraction),
+            REPORT_RETRY,
+            on_session_lost=_reinit_browser,
+        )
+
+
+class CpCodeBatchSource(Source):
+    """Hostname report types from one Apply over the union of their CP codes."""
+
+    name = 'cp-batch'
+    resources = ('browser',)
+
+    def __init__(self, recorder: ContractRecorder | None = None):
+        self.recorder = recorder
+
+    def start(self, report_types: list[str], start_date: str, end_date: str) -> None:
+        try:
+            self.results = run_cp_code_batch(report_types, start_date, end_date, self.recorder)
+        except (RuntimeError, subprocess.SubprocessError, ValueError, DeadlineExceeded) as e:
+            raise SourceError(f'CP code breakdown unavailable: {e}') from e
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        if report_type not in self.results:
+            raise SourceError('not in CP code breakdown')
+        return self.results[report_type]
+
+
+class PageApiSource(Source):
+    """Report types from the reports app's JSON endpoints, all fetched in one page evaluation on start."""
+
+    name = 'page-api'
+    resources = ('browser',)
+
+    def start(self, report_types: list[str], start_date: str, end_date: str) -> None:
+        # A failed page evaluation sends every type to the UI flow
+        try:
+            self.results = run_api_reports(report_types, start_date, end_date)
+        except (subprocess.SubprocessError, ValueError, DeadlineExceeded) as e:
+            raise SourceError(f'in-page fetch failed: {e}') from e
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        if report_type not in self.results:
+            raise SourceError('no endpoint result')
+        return self.results[report_type]
+
+
+class EdgeGridSource(Source):
+    """Report types from the Akamai Reporting API with EdgeGrid credentials (no browser, no screenshots)."""
+
+    name = 'edgegrid'
+    resources = ('edgegrid',)
+
+    def start(self, report_types: list[str], start_date: str, end_date: str) -> None:
+        try:
+            self.client = ApiClient(load_edgerc(EDGEGRID_CONFIG.edgerc, EDGEGRID_CONFIG.section))
+        except (FileNotFoundError, KeyError) as e:
+            raise SourceError(f'credentials unavailable: {e}') from e
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        print(f'[{report_type}] Fetching from Reporting API: {start_date} to {end_date}')
+        try:
+            return fetch_report(self.client, report_type, REPORT_TYPES[report_type], start_date, end_date)
+        except (ApiError, OSError, HTTPException, KeyError, TypeError, ValueError) as e:
+            raise SourceError(str(e)) from e
+
+    def stop(self) -> None:
+        self.client.close()
+
+
+class DataStreamSource(Source):
+    """Report types from ingested DataStream 2 logs; new log data is ingested on start."""
+
+    name = 'datastream'
+
+    def start(self, report_types: list[str], start_date: str, end_date: str) -> None:
+        if not Path(DATASTREAM_CONFIG.log_dir).is_dir():
+            raise SourceError(f'log directory not found: {DATASTREAM_CONFIG.log_dir}')
+        conn = connect_cube()
+        try:
+            ingest_datastream(conn, DATASTREAM_CONFIG.log_dir)
+        except (EOFError, OSError) as e:
+            raise SourceError(f'log ingest failed: {e}') from e
+        finally:
+            conn.close()
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        print(f'[{report_type}] Reading DataStream logs: {start_date} to {end_date}')
+        conn = connect_cube()
+        try:
+            if report_type == 'geography':
+                return datastream_geography(conn, start_date, end_date)
+            return datastream_hostname(conn, report_type, start_date, end_date)
+        except LookupError as e:
+            raise SourceError(str(e)) from e
+        finally:
+            conn.close()
+
+
+class CloudWatchSource(Source):
+    """CloudFront BytesDownloaded from CloudWatch."""
+
+    name = 'cloudwatch'
+    resources = ('aws',)
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        return run_cloudfront_report(start_date, end_date)
+
+
+def build_jobs(
+    types_to_run: list[str],
+    recorder: ContractRecorder | None = None,
+    extraction: str = 'dom',
+    api: bool = False,
+    edgegrid: bool = False,
+    single_apply: bool = False,
+    datastream: bool = False,
+) -> list[Job]:
+    """Build one job per report type, in the given order, with its source chain.
+
+    Akamai types try DataStream logs, the EdgeGrid API, then the in-page endpoints, then (for
+    hostname types) the single-Apply CP code batch, each when enabled, and
+    finally the per-type filter UI.
+    """
+    hostname, geography = BrowserHostnameSource(recorder), BrowserGeographySource(recorder, extraction)
+    optional = ((DataStreamSource(), datastream), (EdgeGridSource(), edgegrid), (PageApiSource(), api))
+    preferred = [source for source, on in optional if on]
+    batch = [CpCodeBatchSource(recorder)] if single_apply else []
+    jobs = []
+    for report_type in types_to_run:
+        if report_type == 'cloudfront':
+            chain = [CloudWatchSource()]
+        elif report_type == 'geography':
+            chain = preferred + [geography]
+        else:
+            chain = preferred + batch + [hostname]
+        jobs.append(Job(report_type, chain))
+    return jobs
+
+
+def pending_reports(report_types: list[str]) -> list[PendingReport]:
+    """Browser work for Akamai report types, for the run planner."""
+    return [
+        PendingReport(
+            report_type,
+            'Traffic by Geography' if report_type == 'geography' else 'Traffic by Hostname',
+            tuple(REPORT_TYPES[report_type].cp_codes),
+        )
+        for report_type in report_types
+    ]
+
+
+def _open_browser(headed: bool) -> None:  # pragma: no cover
+    init_browser(STATE_FILE, AKAMAI_URL, headed=headed)
+    pause(WAIT_BROWSER_INIT)
+
+
+def _print_result(result: dict) -> None:
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+def write_json_atomic(path: str | Path, data) -> None:
+    """Write JSON to a temporary file next to path, then rename it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _print_compact(result: dict) -> None:
+    print(json.dumps(result, ensure_ascii=False, separators=(',', ':')), flush=True)
+
+
+def ndjson_writer(path: str | Path, truncate: bool = True) -> Callable[[dict], None]:
+    """Open an NDJSON file; the returned callback appends one compact record and flushes it.
+
+    Consumers can tail the file while the run continues. truncate=False keeps existing records.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if truncate or not path.exists():
+        path.write_text('', encoding='utf-8')
+    elif path.stat().st_size:
+        # Terminate a record cut off by a crash so the next one starts on its own line
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def write(result: dict) -> None:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    return write
+
+
+def load_checkpoint(path: str | Path, start_date: str, end_date: str) -> dict[str, dict]:
+    """Completed outputs for the date range recorded in a checkpoint file, by report type.
+
+    A partly written last line (the run was killed mid-write) is ignored.
+    """
+    done = {}
+    if not Path(path).exists():
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if result.get('date_range') == {'start': start_date, 'end': end_date}:
+                done[result['type']] = result
+    return done
+
+
+def run_reports(
+    types_to_run: list[str],
+    start_date: str,
+    end_date: str,
+    recorder: ContractRecorder | None = None,
+    extraction: str = 'dom',
+    api: bool = False,
+    edgegrid: bool = False,
+    single_apply: bool = False,
+    datastream: bool = False,
+    headed: bool = False,
+    explain: bool = False,
+    on_result: Callable[[dict], None] = _print_result,
+    report_timeout: float | None = None,
+    browser: Resource | None = None,
+) -> list[dict]:
+    """Plan and run report types through their source chains; returns outputs in run order.
+
+    on_result receives each output as it completes (default: print it). The
+    browser is opened on first use and closed when all jobs finish. A report
+    that runs past report_timeout seconds (or the caller's deadline) is left
+    out of the outputs. A caller that keeps a browser open between runs passes
+    it as browser, a Resource without open/close.
+    """
+    # Order Akamai types to minimise page and filter changes; CloudFront runs alongside
+    dates = (start_date, end_date)
+    configured = pending_reports([t for t in types_to_run if t not in ('geography', 'cloudfront')])
+    configured += pending_reports([t for t in types_to_run if t == 'geography'])
+    plan = plan_reports(configured, dates)
+    if explain:
+        print(format_plan(plan, baseline=plan_in_order(configured, dates)))
+    types_to_run = [item.report.report_type for item in plan] + [t for t in types_to_run if t == 'cloudfront']
+
+    # One browser session shared by all browser sources; sources run concurrently within these limits
+    resources = {
+        'browser': browser or Resource('browser', open=functools.partial(_open_browser, headed), close=close_browser),
+        'edgegrid': Resource('edgegrid', capacity=API_WORKERS),
+        'aws': Resource('aws'),
+    }
+    jobs = build_jobs(
+        types_to_run,
+        recorder,
+        extraction,
+        api=api,
+        edgegrid=edgegrid,
+        single_apply=single_apply,
+        datastream=datastream,
+    )
+    return run_jobs(jobs, resources, start_date, end_date, on_result=on_result, job_timeout=report_timeout)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Akamai + CloudFront Traffic Report')
     parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
@@ -156,55 +643,136 @@ def main():
     )
     parser.add_argument('--headed', action='store_true', help='Run browser in headed mode')
     parser.add_argument('--output', help='Output JSON file path')
+    parser.add_argument(
+        '--format',
+        choices=['json', 'ndjson'],
+        default='json',
+        help='ndjson: also append each report to <output>.ndjson as it completes',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Reuse reports finished by an earlier failed run of the same range (from its checkpoint)',
+    )
     parser.add_argument('--save-golden', action='store_true', help='Save each result as golden data in tests/golden/')
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='PATH', help='Record every browser command to a cassette file')
+    cassette.add_argument('--replay', metavar='PATH', help='Replay browser commands from a cassette (no browser)')
+    parser.add_argument(
+        '--contract-counts',
+        nargs='?',
+        const='',
+        metavar='PATH',
+        help='Record contract-check selector counts during the run (default: output/contract_counts_<start>_<end>.json)',
+    )
+    parser.add_argument(
+        '--geo-extract',
+        choices=['dom', 'csv'],
+        default='dom',
+        help='Geography extraction: scrape the table (dom) or download the CSV export (csv)',
+    )
+    parser.add_argument(
+        '--edgegrid',
+        action='store_true',
+        help='Fetch Akamai reports from the Reporting API with EdgeGrid credentials (no browser; falls back per report)',
+    )
+    parser.add_argument(
+        '--single-apply',
+        action='store_true',
+        help='Apply the union of all hostname CP codes once and split totals per report type from the CP code table',
+    )
+    parser.add_argument(
+        '--datastream',
+        action='store_true',
+        help='Build Akamai reports from ingested DataStream 2 logs first (falls back per report)',
+    )
+    parser.add_argument('--explain', action='store_true', help='Print the planned report order with estimated times')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS', help='Time budget for the whole run')
+    parser.add_argument(
+        '--report-deadline', type=float, metavar='SECONDS', help='Time budget for each report once it starts'
+    )
+    parser.add_argument(
+        '--api',
+        action='store_true',
+        help="Fetch Akamai reports from the reports app's JSON endpoints (falls back to the UI per report)",
+    )
     args = parser.parse_args()
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+    if args.record:
+        start_recording(args.record)
+    elif args.replay:
+        start_replay(args.replay)
+
     # Determine which reports to run
     if args.type:
         types_to_run = [args.type]
     else:
         types_to_run = list(REPORT_TYPES.keys()) + ['cloudfront']
 
-    # Separate Akamai hostname, geography, and CloudFront types
-    akamai_hostname_types = [t for t in types_to_run if t not in ('cloudfront', 'geography')]
-    run_geo = 'geography' in types_to_run
-    run_cf = 'cloudfront' in types_to_run
-
-    results = []
-
-    # Run all Akamai reports in a single browser session
-    if akamai_hostname_types or run_geo:
-        init_browser(STATE_FILE, AKAMAI_URL, headed=args.headed)
-        time.sleep(WAIT_BROWSER_INIT)
-        try:
-            for report_type in akamai_hostname_types:
-                result = run_akamai_report(report_type, args.start, args.end)
-                results.append(result)
-                print(json.dumps(result, ensure_ascii=False, indent=2))
-
-            if run_geo:
-                result = run_geography_report(args.start, args.end)
-                results.append(result)
-                print(json.dumps(result, ensure_ascii=False, indent=2))
-        finally:
-            close_browser()
-
-    # Run CloudFront (no browser needed)
-    if run_cf:
-        result = run_cloudfront_report(args.start, args.end)
-        results.append(result)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+    recorder = ContractRecorder() if args.contract_counts is not None else None
+    output_path = Path(args.output or OUTPUT_DIR / f'report_{args.start}_{args.end}.json')
+
+    # Every finished report is checkpointed; --resume reuses the ones already done for this range
+    checkpoint_path = OUTPUT_DIR / f'checkpoint_{args.start}_{args.end}.ndjson'
+    resumed = load_checkpoint(checkpoint_path, args.start, args.end) if args.resume else {}
+    resumed = {t: resumed[t] for t in types_to_run if t in resumed}
+    if resumed:
+        print(f'Resuming: reusing {", ".join(resumed)} from {checkpoint_path}')
+    sinks = [ndjson_writer(checkpoint_path, truncate=not args.resume)]
+    if args.format == 'ndjson':
+        stream_path = output_path.with_suffix('.ndjson')
+        stream = ndjson_writer(stream_path)
+        for result in resumed.values():
+            stream(result)
+        sinks += [stream, _print_compact]
+        print(f'Streaming results to {stream_path}')
+    else:
+        sinks.append(_print_result)
+
+    def on_result(result: dict) -> None:
+        for sink in sinks:
+            sink(result)
+
+    try:
+        with deadline(args.deadline):
+            results = run_reports(
+                [t for t in types_to_run if t not in resumed],
+                args.start,
+                args.end,
+                recorder,
+                args.geo_extract,
+                api=args.api,
+                edgegrid=args.edgegrid,
+                single_apply=args.single_apply,
+                datastream=args.datastream,
+                headed=args.headed,
+                explain=args.explain,
+                on_result=on_result,
+                report_timeout=args.report_deadline,
+            )
+    except Exception:
+        print(f'\nRun failed; finished reports are kept in {checkpoint_path} (rerun with --resume)')
+        raise
+    finally:
+        stop_cassette()
+    order = {t: i for i, t in enumerate(types_to_run)}
+    results = sorted([*resumed.values(), *results], key=lambda r: order[r['type']])
+    unfinished = [t for t in types_to_run if t not in {r['type'] for r in results}]
+
+    if recorder and recorder.results:
+        recorder.save(args.contract_counts or OUTPUT_DIR / f'contract_counts_{args.start}_{args.end}.json')
 
     # Save output
-    output_path = args.output or str(OUTPUT_DIR / f'report_{args.start}_{args.end}.json')
-    output_parent = Path(output_path).parent
-    if not output_parent.exists():
-        output_parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results if len(results) > 1 else results[0], f, ensure_ascii=False, indent=2)
-    print(f'\nOutput saved: {output_path}')
+    if results:
+        write_json_atomic(output_path, results if len(results) > 1 else results[0])
+        print(f'\nOutput saved: {output_path}')
+        print(f'Cube updated: {store_results(results)} facts in {CUBE_PATH}')
+    if unfinished:
+        print(f'\nOut of time for {", ".join(unfinished)}; rerun with --resume to finish them')
+    else:
+        checkpoint_path.unlink(missing_ok=True)
 
     # Save golden data (one file per report type)
     if args.save_golden:
@@ -216,6 +784,8 @@ def main():
                 json.dump(result, f, ensure_ascii=False, indent=2)
             print(f'Golden saved: {golden_path}')
 
+    if unfinished:
+        raise SystemExit(1)
     return results
 
 
@@ -2,24 +2,197 @@
 
 import contextlib
 import json
+import random
 import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TypeVar
 
 from scripts.config import AB_BIN, SESSION
+from scripts.deadline import DeadlineExceeded, no_deadline, pause, remaining, skip_waits
 
-# Global options set during init_browser
-_global_opts: list[str] = []
+# Global options set during init_browser, per session (sessions may be initialised concurrently)
+_global_opts: dict[str, list[str]] = {}
 
+# Seconds before an agent-browser command is abandoned (trimmed to the time budget)
+COMMAND_TIMEOUT = 120
 
-def exec_ab(*args: str) -> str:
-    """Run agent-browser with session only (no global opts), return stdout."""
-    cmd = [AB_BIN, '--session', SESSION, *args]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=120)
+# agent-browser session used by exec_ab; override per thread with use_session()
+_session: ContextVar[str] = ContextVar('ab_session', default=SESSION)
+
+# Options that precede the command verb and may differ between record and replay
+_OPTS_WITH_VALUE = ('--state',)
+_OPTS_FLAG = ('--headed',)
+
+# Commands whose arguments (URLs, file paths) are volatile between runs;
+# replay matches them on the verb only
+_VOLATILE_COMMANDS = ('open', 'screenshot', 'download')
+
+
+class CassetteMismatchError(RuntimeError):
+    """Replayed command does not match the next recorded command."""
+
+
+class Cassette:
+    """Record agent-browser commands to, or replay them from, a JSON-lines file.
+
+    Each line holds one command: {"args": [...], "stdout": "...", "elapsed": 0.12}
+    plus "returncode"/"stderr" for failed commands or "timeout" for timeouts.
+
+    Commands are kept in one global order, so record and replay a single
+    browser session at a time; parallel sessions (daemon, service) would
+    interleave their commands. The lock only keeps lines whole.
+    """
+
+    def __init__(self, path: str | Path, mode: str, realtime: bool = False, strict: bool = True):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f'Unknown cassette mode: {mode!r}')
+        self.path = Path(path)
+        self.mode = mode
+        self.realtime = realtime
+        self.strict = strict
+        self.position = 0
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            lines = self.path.read_text(encoding='utf-8').splitlines()
+            self.entries = [json.loads(line) for line in lines if line.strip()]
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text('', encoding='utf-8')
+            self.entries = []
+
+    def exec(self, args: tuple[str, ...], run) -> str:
+        """Record `run(args)` or replay the next recorded response for args."""
+        if self.mode == 'replay':
+            return self._replay(args)
+
+        entry: dict = {'args': list(args)}
+        t0 = time.monotonic()
+        try:
+            entry['stdout'] = run(args)
+        except subprocess.CalledProcessError as e:
+            entry.update(stdout=(e.stdout or '').strip(), returncode=e.returncode, stderr=e.stderr or '')
+            self._append(entry, t0)
+            raise
+        except subprocess.TimeoutExpired as e:
+            entry.update(stdout='', timeout=e.timeout)
+            self._append(entry, t0)
+            raise
+        # Anything else (e.g. DeadlineExceeded before the command ran) is not replayable
+        self._append(entry, t0)
+        return entry['stdout']
+
+    def _append(self, entry: dict, t0: float) -> None:
+        entry['elapsed'] = round(time.monotonic() - t0, 4)
+        with self._lock:
+            self.entries.append(entry)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _replay(self, args: tuple[str, ...]) -> str:
+        with self._lock:
+            if self.position >= len(self.entries):
+                raise CassetteMismatchError(
+                    f'Cassette exhausted after {len(self.entries)} commands, got {list(args)!r}'
+                )
+            entry = self.entries[self.position]
+            self.position += 1
+        if self.strict and _match_key(args) != _match_key(entry['args']):
+            raise CassetteMismatchError(
+                f'Command #{self.position} mismatch: expected {entry["args"]!r}, got {list(args)!r}'
+            )
+        if self.realtime:
+            time.sleep(entry.get('elapsed', 0))
+        if 'timeout' in entry:
+            raise subprocess.TimeoutExpired(cmd=[AB_BIN, *args], timeout=entry['timeout'])
+        if entry.get('returncode'):
+            raise subprocess.CalledProcessError(
+                entry['returncode'], [AB_BIN, *args], output=entry['stdout'], stderr=entry.get('stderr', '')
+            )
+        return entry['stdout']
+
+
+def _match_key(args: tuple[str, ...] | list[str]) -> list[str]:
+    """Strip global browser options and volatile arguments for replay matching."""
+    rest = list(args)
+    while rest and rest[0] in _OPTS_WITH_VALUE + _OPTS_FLAG:
+        rest = rest[2:] if rest[0] in _OPTS_WITH_VALUE else rest[1:]
+    if rest and rest[0] in _VOLATILE_COMMANDS:
+        return rest[:1]
+    return rest
+
+
+# Active cassette, set via start_recording / start_replay
+_cassette: Cassette | None = None
+
+
+def start_recording(path: str | Path) -> None:
+    """Log every agent-browser command and its stdout to a cassette file."""
+    global _cassette
+    _cassette = Cassette(path, 'record')
+    skip_waits(False)
+
+
+def start_replay(path: str | Path, realtime: bool = False, strict: bool = True) -> None:
+    """Serve agent-browser commands from a cassette file instead of a browser.
+
+    Fixed waits (pause) are skipped unless realtime is set.
+
+    Args:
+        realtime: sleep for each command's recorded duration
+        strict: raise CassetteMismatchError when a command differs from the recording
+    """
+    global _cassette
+    _cassette = Cassette(path, 'replay', realtime=realtime, strict=strict)
+    skip_waits(not realtime)
+
+
+def stop_cassette() -> None:
+    """Return to running agent-browser directly."""
+    global _cassette
+    _cassette = None
+    skip_waits(False)
+
+
+@contextlib.contextmanager
+def use_session(name: str) -> Iterator[None]:
+    """Route agent-browser commands in the current thread/context to another session."""
+    token = _session.set(name)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def _exec_subprocess(args: tuple[str, ...]) -> str:
+    cmd = [AB_BIN, '--session', _session.get(), *args]
+    timeout = remaining(COMMAND_TIMEOUT)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout)
+    except subprocess.TimeoutExpired as e:
+        if timeout < COMMAND_TIMEOUT:
+            raise DeadlineExceeded(f'time budget exhausted during {args[:1]}') from e
+        raise
     return result.stdout.strip()
 
 
+def exec_ab(*args: str) -> str:
+    """Run agent-browser with session only (no global opts), return stdout.
+
+    When a cassette is active, the command is recorded to or replayed from it.
+    """
+    if _cassette is not None:
+        return _cassette.exec(args, _exec_subprocess)
+    return _exec_subprocess(args)
+
+
 def run_ab(*args: str) -> str:
     """Run agent-browser with global browser options, return stdout."""
-    return exec_ab(*_global_opts, *args)
+    return exec_ab(*_global_opts.get(_session.get(), []), *args)
 
 
 def ab_eval(js: str) -> str:
@@ -39,6 +212,23 @@ def ab_screenshot(path: str) -> None:  # pragma: no cover
     run_ab('screenshot', path)
 
 
+def wait_until(predicate: Callable[[], bool], timeout: float, interval: float = 0.5) -> bool:
+    """Poll predicate until it returns True or timeout (seconds) elapses.
+
+    timeout is trimmed to the remaining time budget.
+
+    Returns:
+        True if the predicate succeeded, False on timeout.
+    """
+    end = time.monotonic() + remaining(timeout)
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= end:
+            return False
+        time.sleep(interval)
+
+
 def get_element_center(js_selector: str) -> tuple[int, int]:
     """Get center coordinates of element via getBoundingClientRect.
 
@@ -64,59 +254,181 @@ def get_element_center(js_selector: str) -> tuple[int, int]:
     return data['x'], data['y']
 
 
+class TransientError(RuntimeError):
+    """The page is not ready yet (element missing, navigation pending); worth retrying."""
+
+
+class SessionLostError(RuntimeError):
+    """The browser session is gone or logged out; retrying needs a fresh browser."""
+
+
+# Lower-case fragments of agent-browser errors, by failure class
+SESSION_LOST_MARKERS = (
+    'target closed',
+    'browser has been closed',
+    'browser has disconnected',
+    'not running',
+    'econnrefused',
+)
+TRANSIENT_MARKERS = ('timeout', 'not found', 'not visible', 'waiting for', 'detached', 'intercepts pointer events')
+
+
+def classify_failure(exc: BaseException) -> str:
+    """Classify a browser failure as 'transient', 'session' or 'fatal'.
+
+    A command that hit the subprocess timeout counts as a lost session: the
+    browser is hung, and a restart is faster than waiting out more timeouts.
+    """
+    if isinstance(exc, SessionLostError | subprocess.TimeoutExpired):
+        return 'session'
+    if isinstance(exc, TransientError):
+        return 'transient'
+    if isinstance(exc, subprocess.CalledProcessError):
+        text = f'{exc.stderr or ""} {exc.stdout or ""}'.lower()
+        if any(marker in text for marker in SESSION_LOST_MARKERS):
+            return 'session'
+        if any(marker in text for marker in TRANSIENT_MARKERS):
+            return 'transient'
+    return 'fatal'
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Attempts and jittered exponential backoff for transient failures.
+
+    session_restarts is how many times a lost session may be re-initialised
+    (only when retry() is given on_session_lost); restarts do not use attempts.
+    """
+
+    attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 0.5
+    session_restarts: int = 1
+
+    def delay(self, attempt: int, rand: Callable[[], float] = random.random) -> float:
+        """Seconds to wait after failed attempt number attempt (0-based)."""
+        cap = min(self.max_delay, self.base_delay * 2**attempt)
+        return cap * (1 - self.jitter * rand())
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+T = TypeVar('T')
+
+
+def retry(
+    fn: Callable[[], T],
+    policy: RetryPolicy = DEFAULT_RETRY,
+    on_session_lost: Callable[[], None] | None = None,
+    sleep: Callable[[float], None] = pause,
+) -> T:
+    """Call fn, retrying transient failures with backoff.
+
+    A lost session calls on_session_lost (e.g. reinit_browser) and retries
+    straight away, up to policy.session_restarts times; without a handler it is
+    raised. Fatal failures (including DeadlineExceeded) and the last transient
+    failure are raised; backoff waits stop at the time budget.
+    """
+    attempt = restarts = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            kind = classify_failure(e)
+            if kind == 'session' and on_session_lost is not None and restarts < policy.session_restarts:
+                restarts += 1
+                print(f'[browser] Session lost ({e}); re-initialising')
+                on_session_lost()
+                continue
+            if kind != 'transient' or attempt + 1 >= policy.attempts:
+                raise
+            sleep(policy.delay(attempt))
+            attempt += 1
+
+
+# Known page state (e.g. applied report filters) per session; cleared when the browser restarts
+_page_state: dict[str, dict] = {}
+
+# init_browser arguments per session, for reinit_browser
+_init_args: dict[str, tuple[str, str, bool]] = {}
+
+
+def page_state() -> dict:
+    """Return the mutable page-state dict of the current session."""
+    return _page_state.setdefault(_session.get(), {})
+
+
 def init_browser(state_file: str, url: str, headed: bool = False) -> None:  # pragma: no cover
     """Initialize browser session and navigate to URL.
 
     Always closes any existing daemon first, then launches fresh with --state
     to ensure cookies from the state file are loaded.
     """
-    global _global_opts
+    session = _session.get()
+    _page_state.pop(session, None)
+    _init_args[session] = (state_file, url, headed)
 
     # Close any existing daemon so --state will be applied on fresh launch
-    _global_opts = []
+    _global_opts.pop(session, None)
     with contextlib.suppress(subprocess.CalledProcessError):
         run_ab('close')
 
-    _global_opts = ['--state', state_file]
-    if headed:
-        _global_opts.append('--headed')
+    _global_opts[session] = ['--state', state_file, *(['--headed'] if headed else [])]
     run_ab('open', url)
 
 
+def reinit_browser() -> None:  # pragma: no cover
+    """Restart the current session's browser with its last init_browser arguments."""
+    if _session.get() not in _init_args:
+        raise SessionLostError('browser was never initialised in this session')
+    init_browser(*_init_args[_session.get()])
+
+
 REPORT_HASH = {
     'Traffic by Hostname': '#/predefined/traffic-by-hostname-2',
     'Traffic by Geography': '#/predefined/traffic-by-geography',
 }
 
+# Max seconds to wait for the report title after a hash change
+WAIT_NAVIGATION = 8
+
+# Navigation: one hash change per attempt, each polled for WAIT_NAVIGATION seconds
+NAVIGATION_RETRY = RetryPolicy(attempts=2, base_delay=0.5)
+
 
 def navigate_to_report(report_name: str) -> None:  # pragma: no cover
     """Navigate to a specific report via URL hash change.
 
     Uses window.location.hash to switch reports within the SPA.
     Do NOT include query string parameters — they cause permission errors.
+    A redirect to the login page raises SessionLostError.
     """
-    import time
+
+    def title() -> str:
+        return ab_eval("document.querySelector('h2')?.textContent?.trim() || ''")
 
     # Check if already on the correct report
-    title = ab_eval("document.querySelector('h2')?.textContent?.trim() || ''")
-    if report_name in title:
+    if report_name in title():
         return
 
     hash_path = REPORT_HASH[report_name]
-    ab_eval(f"window.location.hash = '{hash_path}'")
-    time.sleep(8)
 
-    # Verify navigation succeeded
-    new_title = ab_eval("document.querySelector('h2')?.textContent?.trim() || ''")
-    if report_name not in new_title:
-        # Retry once
+    def attempt() -> None:
         ab_eval(f"window.location.hash = '{hash_path}'")
-        time.sleep(8)
-        retry_title = ab_eval("document.querySelector('h2')?.textContent?.trim() || ''")
-        if report_name not in retry_title:
-            raise RuntimeError(f'Failed to navigate to {report_name!r} after retry (got {retry_title!r})')
+        # Poll for the title instead of a fixed wait
+        if wait_until(lambda: report_name in title(), WAIT_NAVIGATION):
+            return
+        location = ab_eval('window.location.href')
+        if '/apps/auth/' in location or '/login' in location:
+            raise SessionLostError(f'redirected to login ({location})')
+        raise TransientError(f'Failed to navigate to {report_name!r} (got {title()!r})')
+
+    retry(attempt, NAVIGATION_RETRY)
 
 
 def close_browser() -> None:  # pragma: no cover
-    """Close the browser session."""
-    run_ab('close')
+    """Close the browser session (even when the run is out of time)."""
+    _page_state.pop(_session.get(), None)
+    with no_deadline():
+        run_ab('close')
@@ -1,10 +1,10 @@
 """Calendar navigation logic for Akamai date range picker."""
 
 import re
-import time
 from datetime import datetime
 
 from scripts.browser_helpers import ab_eval, run_ab
+from scripts.deadline import pause
 
 MONTH_NAMES = [
     'January',
@@ -184,7 +184,7 @@ def set_date_range(start_date: str, end_date: str) -> None:  # pragma: no cover
     direction = 'forward' if clicks > 0 else 'back'
     for _ in range(abs(clicks)):
         click_calendar_arrow(direction)
-        time.sleep(0.5)
+        pause(0.5)
 
     # Click start day - determine which calendar panel it's in
     current = get_displayed_months()
@@ -194,7 +194,7 @@ def set_date_range(start_date: str, end_date: str) -> None:  # pragma: no cover
     else:
         click_day_cell(1, start_dt.day)
 
-    time.sleep(0.5)
+    pause(0.5)
 
     # Navigate to end month if different
     if end_month_str != start_month_str:
@@ -203,7 +203,7 @@ def set_date_range(start_date: str, end_date: str) -> None:  # pragma: no cover
         direction = 'forward' if clicks > 0 else 'back'
         for _ in range(abs(clicks)):
             click_calendar_arrow(direction)
-            time.sleep(0.5)
+            pause(0.5)
 
     # Click end day
     current = get_displayed_months()
@@ -213,4 +213,4 @@ def set_date_range(start_date: str, end_date: str) -> None:  # pragma: no cover
     else:
         click_day_cell(1, end_dt.day)
 
-    time.sleep(0.5)
+    pause(0.5)
@@ -5,6 +5,8 @@ import subprocess
 from collections.abc import Sequence
 from datetime import UTC, datetime, timedelta, timezone
 
+from scripts.deadline import remaining
+
 UTC_PLUS_8 = timezone(timedelta(hours=8))
 
 
@@ -110,7 +112,7 @@ def fetch_cloudfront_bytes(
         'json',
     ]
 
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=60)
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=remaining(60))
     data = json.loads(result.stdout)
 
     metric_results = data['MetricDataResults'][0]
@@ -0,0 +1,209 @@
+"""CloudFront standard access log ingestion: bytes by day, country and URI prefix.
+
+Log files (gzipped TSV, one or many per hour) are decompressed as a stream and
+split only up to the last needed column. Files are parsed in a process pool and
+each worker returns per-group totals, so memory is bounded by the number of
+(day, country, prefix) groups rather than by the number of lines. Days follow
+the UTC+8 boundaries used by every other report, so one day spans log files of
+two UTC days: totals are added to the cube and each ingested file is recorded,
+so files can be ingested in any batches without double counting or partial
+days overwriting complete ones.
+
+Standard logs have no country column; it is read when present (c-country in
+real-time or v2 logs with that field selected) and left empty otherwise.
+
+Usage:
+    uv run python -m scripts.cloudfront_logs --dir logs/cloudfront/ --prefix-depth 2
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+
+from scripts.config import CLOUDFRONT_CONFIG
+from scripts.cube import CUBE_PATH, Fact, add_facts, connect
+
+# Fields in the standard log format up to cs-uri-stem; used when a file has no #Fields header
+DEFAULT_FIELDS = ['date', 'time', 'x-edge-location', 'sc-bytes', 'c-ip', 'cs-method', 'cs(Host)', 'cs-uri-stem']
+
+# Cube source name, kept apart from the CloudWatch series of the same distribution
+LOG_SOURCE = 'cloudfront-logs'
+
+# Log times are UTC; later than this they belong to the next UTC+8 day
+UTC8_ROLLOVER = '16:00:00'
+
+INGESTED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cloudfront_log_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+Groups = dict[tuple[str, str, str], int]
+
+
+def uri_prefix(stem: str, depth: int) -> str:
+    """Leading directories of a URI path: '/img/a/b.png' → '/img' (depth 1), '/img/a' (depth 2)."""
+    dirs = [part for part in stem.split('/')[1:-1] if part][:depth]
+    return '/' + '/'.join(dirs)
+
+
+def _positions(fields: list[str]) -> tuple[int, int, int, int, int | None, int]:
+    """Indexes of date, time, sc-bytes, cs-uri-stem and c-country (or None), plus the last one needed."""
+    columns = {name: i for i, name in enumerate(fields)}
+    needed = [columns[name] for name in ('date', 'time', 'sc-bytes', 'cs-uri-stem')]
+    country = columns.get('c-country')
+    return (*needed, country, max(needed + [country or 0]))
+
+
+def parse_log_lines(lines: Iterable[str], depth: int = 1, groups: Groups | None = None) -> Groups:
+    """Sum sc-bytes per (UTC+8 day, country, URI prefix) over log lines.
+
+    Comment lines are skipped except #Fields, which sets the column positions.
+    Lines with a non-numeric sc-bytes are ignored.
+    """
+    groups = {} if groups is None else groups
+    next_day: dict[str, str] = {}
+    i_date, i_time, i_bytes, i_stem, i_country, last = _positions(DEFAULT_FIELDS)
+    for line in lines:
+        if line.startswith('#'):
+            if line.startswith('#Fields:'):
+                i_date, i_time, i_bytes, i_stem, i_country, last = _positions(line[8:].split())
+            continue
+        parts = line.rstrip('\n').split('\t', last + 1)
+        if len(parts) <= last or not parts[i_bytes].isdigit():
+            continue
+        day = parts[i_date]
+        if parts[i_time] >= UTC8_ROLLOVER:
+            if day not in next_day:
+                next_day[day] = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+            day = next_day[day]
+        country = parts[i_country] if i_country is not None and parts[i_country] != '-' else ''
+        key = (day, country, uri_prefix(parts[i_stem], depth))
+        groups[key] = groups.get(key, 0) + int(parts[i_bytes])
+    return groups
+
+
+def parse_log_file(path: str | Path, depth: int = 1) -> Groups | None:
+    """Stream one log file (gzipped or plain) and return its group totals.
+
+    A gzipped file that ends early (truncated, or still being written) gives
+    None, so it can be skipped and read on a later run.
+    """
+    opener = gzip.open if str(path).endswith('.gz') else open
+    try:
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            return parse_log_lines(f, depth)
+    except EOFError:
+        return None
+
+
+def merge_groups(total: Groups, part: Groups) -> Groups:
+    for key, value in part.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def log_files(directory: str | Path) -> list[str]:
+    return sorted(str(p) for p in Path(directory).rglob('*') if p.is_file() and not p.name.startswith('.'))
+
+
+def _parse_files(files: list[str], depth: int, workers: int | None) -> tuple[Groups, list[str]]:
+    """Parse files in a process pool; returns (reduced totals, files read completely)."""
+    total: Groups = {}
+    read = []
+    if not files:
+        return total, read
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, part in zip(files, pool.map(partial(parse_log_file, depth=depth), files)):
+            if part is None:
+                print(f'[cloudfront-logs] {path} is incomplete; skipped until a later run')
+                continue
+            merge_groups(total, part)
+            read.append(path)
+    return total, read
+
+
+def ingest_directory(
+    directory: str | Path, depth: int = 1, workers: int | None = None, files: list[str] | None = None
+) -> Groups:
+    """Parse log files (default: every file under directory) in a process pool and reduce the totals."""
+    return _parse_files(log_files(directory) if files is None else files, depth, workers)[0]
+
+
+def new_log_files(conn: sqlite3.Connection, directory: str | Path) -> list[str]:
+    """Log files under directory that have not been ingested yet."""
+    conn.executescript(INGESTED_SCHEMA)
+    known = dict(conn.execute('SELECT path, size FROM cloudfront_log_files'))
+    files = []
+    for path in log_files(directory):
+        if path not in known:
+            files.append(path)
+        elif os.path.getsize(path) != known[path]:
+            print(f'[cloudfront-logs] {path} changed since it was ingested; not read again')
+    return files
+
+
+def ingest(
+    conn: sqlite3.Connection, directory: str | Path, distribution_id: str, depth: int = 1, workers: int | None = None
+) -> tuple[list[str], Groups]:
+    """Add the totals of new log files to the cube; returns (files read, their group totals).
+
+    The files are recorded in the same transaction as the facts; incomplete
+    gzipped files are left unrecorded and read again next time.
+    """
+    groups, files = _parse_files(new_log_files(conn, directory), depth, workers)
+    conn.executemany('INSERT INTO cloudfront_log_files VALUES (?, ?)', [(f, os.path.getsize(f)) for f in files])
+    add_facts(conn, facts_from_groups(groups, distribution_id), accumulate=True)
+    return files, groups
+
+
+def facts_from_groups(groups: Groups, distribution_id: str) -> list[Fact]:
+    """One-day cube facts for a distribution's group totals (to be added to stored totals)."""
+    return [
+        Fact(LOG_SOURCE, distribution_id, '', country, prefix, 'edge', day, day, value)
+        for (day, country, prefix), value in sorted(groups.items())
+    ]
+
+
+def summarize(groups: Groups) -> dict[str, dict[str, dict[str, int]]]:
+    """Per-day totals by country and by prefix: {day: {"countries": {...}, "prefixes": {...}}}."""
+    days: dict[str, dict[str, dict[str, int]]] = {}
+    for (day, country, prefix), value in sorted(groups.items()):
+        entry = days.setdefault(day, {'countries': {}, 'prefixes': {}})
+        entry['countries'][country or 'unknown'] = entry['countries'].get(country or 'unknown', 0) + value
+        entry['prefixes'][prefix] = entry['prefixes'].get(prefix, 0) + value
+    return days
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Ingest CloudFront standard access logs')
+    parser.add_argument('--dir', required=True, help='Directory of log files (searched recursively)')
+    parser.add_argument('--prefix-depth', type=int, default=1, help='URI directory levels kept in the prefix')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--output', help='Write the per-day summary JSON to this file')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        files, groups = ingest(conn, args.dir, CLOUDFRONT_CONFIG.distribution_id, args.prefix_depth, args.workers)
+    finally:
+        conn.close()
+    summary = summarize(groups)
+    print(f'{len(files)} new file(s): {len(groups)} groups over {len(summary)} day(s) added to {args.db}')
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'Output saved: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
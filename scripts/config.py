@@ -73,3 +73,83 @@ CLOUDFRONT_CONFIG = CloudFrontConfig(
     region=_settings['cloudfront']['region'],
     metric_name=_settings['cloudfront']['metric_name'],
 )
+
+
+@dataclass
+class EdgeGridConfig:
+    edgerc: str
+    section: str
+
+
+# Optional: Akamai API credentials for the browser-free --edgegrid backend
+_edgegrid = _settings.get('edgegrid') or {}
+EDGEGRID_CONFIG = EdgeGridConfig(
+    edgerc=os.path.expanduser(os.path.expandvars(_edgegrid.get('edgerc', '~/.edgerc'))),
+    section=_edgegrid.get('section', 'default'),
+)
+
+
+@dataclass
+class DataStreamConfig:
+    log_dir: str
+
+
+# Optional: directory where DataStream 2 JSON-lines logs land, for the --datastream source
+_datastream = _settings.get('datastream') or {}
+DATASTREAM_CONFIG = DataStreamConfig(
+    log_dir=str(_PROJECT_ROOT / os.path.expanduser(_datastream.get('log_dir', 'logs/datastream'))),
+)
+
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    at: str  # HH:MM, UTC+8
+    days: int  # report range: the days ending yesterday (UTC+8)
+    types: list[str] = field(default_factory=list)  # empty: every report type and CloudFront
+    weekdays: list[str] = field(default_factory=lambda: list(WEEKDAYS))
+    deadline_minutes: int = 60  # time budget for one run of the job
+
+
+@dataclass
+class DaemonConfig:
+    sessions: list[str]
+    refresh_minutes: int
+    jobs: list[ScheduledJob]
+
+
+def _build_daemon_config(raw: dict) -> DaemonConfig:
+    """Build DaemonConfig from the raw YAML daemon section, validating job times, weekdays and report types."""
+    jobs = []
+    for cfg in raw.get('jobs') or []:
+        hour, _, minute = str(cfg['at']).partition(':')
+        if not (hour.isdigit() and minute.isdigit() and int(hour) < 24 and int(minute) < 60):
+            raise ValueError(f'Invalid time {cfg["at"]!r} in job {cfg["name"]!r}: must be HH:MM')
+        weekdays = [day.lower()[:3] for day in cfg.get('weekdays', WEEKDAYS)]
+        if unknown := set(weekdays) - set(WEEKDAYS):
+            raise ValueError(f'Invalid weekdays {sorted(unknown)} in job {cfg["name"]!r}')
+        types = cfg.get('types') or []
+        if unknown := [t for t in types if t not in REPORT_TYPES and t != 'cloudfront']:
+            raise ValueError(f'Unknown report types {unknown} in job {cfg["name"]!r}')
+        jobs.append(
+            ScheduledJob(
+                name=cfg['name'],
+                at=f'{int(hour):02d}:{int(minute):02d}',
+                days=int(cfg.get('days', 1)),
+                types=types,
+                weekdays=weekdays,
+                deadline_minutes=int(cfg.get('deadline_minutes', 60)),
+            )
+        )
+    return DaemonConfig(
+        sessions=raw.get('sessions') or [SESSION],
+        refresh_minutes=int(raw.get('refresh_minutes', 30)),
+        jobs=jobs,
+    )
+
+
+# Optional: scheduled report jobs for the long-running daemon (scripts/daemon.py)
+DAEMON_CONFIG = _build_daemon_config(_settings.get('daemon') or {})
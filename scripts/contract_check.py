@@ -3,28 +3,59 @@
 Connects to real Akamai Control Center and checks that all selectors
 used by the automation scripts are present with expected element counts.
 
+Each phase counts all of its selectors in a single evaluation, and the
+hostname and geography pages are checked at the same time in separate
+agent-browser sessions.
+
 Usage:
     uv run python -m scripts.contract_check --headed            # run check
     uv run python -m scripts.contract_check --headed --save     # save baseline
     uv run python -m scripts.contract_check --headed --diff     # compare to baseline
+    uv run python -m scripts.contract_check --serial            # one session, pages in turn
+    uv run python -m scripts.contract_check --fingerprint --diff  # full check only if DOM changed
+    uv run python -m scripts.contract_check --from output/contract_counts_<start>_<end>.json --diff
+
+With --fingerprint, a compact structural hash of the subtrees under every
+selector is compared with the one stored next to the baseline; the detailed
+per-selector pass runs only when it differs.
+
+With --from, counts recorded by `akamai_report --contract-counts` are checked
+instead, so no browser session is needed.
 """
 
 import argparse
+import contextlib
+import hashlib
 import json
 import sys
-import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
+from functools import partial
 from pathlib import Path
 
-from scripts.browser_helpers import ab_eval, close_browser, init_browser, navigate_to_report, run_ab
+from scripts.browser_helpers import (
+    ab_eval,
+    close_browser,
+    init_browser,
+    navigate_to_report,
+    run_ab,
+    use_session,
+    wait_until,
+)
 from scripts.calendar_nav import set_date_range
-from scripts.config import AKAMAI_URL, STATE_FILE
+from scripts.config import AKAMAI_URL, SESSION, STATE_FILE
 
 BASELINE_PATH = Path(__file__).resolve().parent.parent / 'tests' / 'golden' / 'contract_baseline.json'
+FINGERPRINT_PATH = BASELINE_PATH.with_name('contract_fingerprint.json')
 
-WAIT_REPORT_LOAD = 15
-WAIT_KPI_POLL = 2
-WAIT_KPI_MAX_RETRIES = 10
+# Levels of child elements included in each structural signature
+FINGERPRINT_DEPTH = 2
+
+# Readiness timeouts (seconds); checks poll and continue as soon as elements appear
+WAIT_PAGE_READY = 15
+WAIT_DATA_READY = 30
+WAIT_POLL = 0.5
 
 # (css_selector, description, page, phase, expected_min_count)
 # phase: 'data' = check after page data loads, 'filter' = check after filter panel opens
@@ -41,6 +72,18 @@ CONTRACTS = [
 ]
 
 
+REPORT_PAGES = {
+    'hostname': 'Traffic by Hostname',
+    'geography': 'Traffic by Geography',
+}
+
+# Element whose presence signals that a page's report data has loaded
+DATA_INDICATORS = {
+    'hostname': ('akam-single-kpi', 4),
+    'geography': ('table.cdk-table.akam-table', 1),
+}
+
+
 def check_selector(selector: str) -> int:  # pragma: no cover
     """Return count of elements matching CSS selector."""
     escaped = selector.replace("'", "\\'")
@@ -51,9 +94,114 @@ def check_selector(selector: str) -> int:  # pragma: no cover
         return 0
 
 
+def count_selectors(selectors: list[str]) -> dict[str, int]:
+    """Count elements for every selector in a single evaluation.
+
+    Invalid selectors count as 0 instead of failing the whole evaluation.
+    """
+    js = f"""
+    (() => {{
+        const out = {{}};
+        for (const s of {json.dumps(selectors)}) {{
+            try {{ out[s] = document.querySelectorAll(s).length; }} catch (e) {{ out[s] = 0; }}
+        }}
+        return out;
+    }})()
+    """
+    try:
+        data = json.loads(ab_eval(js))
+    except (ValueError, TypeError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    return {s: int(data.get(s) or 0) for s in selectors}
+
+
+def collect_signatures(selectors: list[str]) -> dict[str, str]:
+    """Describe the DOM structure under every selector in a single evaluation.
+
+    A signature holds the distinct shapes of the matched subtrees (tag names
+    and class sets, two levels deep), empty when nothing matches. Match counts
+    are left out since they follow the data shown (e.g. calendar day cells per
+    month). Text is ignored, and Angular's generated 'ng-*' classes are dropped
+    since they change per build.
+    """
+    js = f"""
+    (() => {{
+        const classes = el => Array.from(el.classList).filter(c => !c.startsWith('ng-')).sort().join('.');
+        const shape = (el, depth) => {{
+            let out = el.tagName.toLowerCase() + (el.classList.length ? '.' + classes(el) : '');
+            if (depth > 0 && el.children.length) {{
+                const kids = new Set(Array.from(el.children).map(c => shape(c, depth - 1)));
+                out += '[' + Array.from(kids).sort().join(',') + ']';
+            }}
+            return out;
+        }};
+        const out = {{}};
+        for (const s of {json.dumps(selectors)}) {{
+            try {{
+                const els = Array.from(document.querySelectorAll(s));
+                const shapes = new Set(els.map(el => shape(el, {FINGERPRINT_DEPTH})));
+                out[s] = Array.from(shapes).sort().join('|');
+            }} catch (e) {{ out[s] = 'error'; }}
+        }}
+        return out;
+    }})()
+    """
+    try:
+        data = json.loads(ab_eval(js))
+    except (ValueError, TypeError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    return {s: str(data.get(s, '')) for s in selectors}
+
+
+def hash_signatures(signatures: dict[str, str]) -> dict:
+    """Reduce per-selector signatures to short per-subtree hashes plus one overall hash."""
+    subtrees = {sel: hashlib.sha1(sig.encode()).hexdigest()[:12] for sel, sig in sorted(signatures.items())}
+    overall = hashlib.sha256(json.dumps(subtrees, sort_keys=True).encode()).hexdigest()[:16]
+    return {'hash': overall, 'subtrees': subtrees}
+
+
+def diff_fingerprint(old: dict, new: dict) -> list[str]:
+    """Return selectors whose subtree hash changed, appeared or disappeared."""
+    old_trees, new_trees = old.get('subtrees', {}), new.get('subtrees', {})
+    return sorted(sel for sel in old_trees.keys() | new_trees.keys() if old_trees.get(sel) != new_trees.get(sel))
+
+
+def load_fingerprint() -> dict | None:
+    """Load the stored fingerprint, or None if there is none yet."""
+    if not FINGERPRINT_PATH.exists():
+        return None
+    return json.loads(FINGERPRINT_PATH.read_text())
+
+
+def save_fingerprint(fingerprint: dict) -> None:
+    """Store a fingerprint next to the contract baseline."""
+    FINGERPRINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    doc = {'timestamp': datetime.now(UTC).isoformat(), **fingerprint}
+    FINGERPRINT_PATH.write_text(json.dumps(doc, indent=2) + '\n')
+    print(f'Fingerprint saved: {FINGERPRINT_PATH}')
+
+
 def _check_and_record(selector: str, description: str, page: str, min_count: int, results: list[dict]) -> None:
     """Check a single selector and append result."""
-    count = check_selector(selector)
+    _record(selector, description, page, check_selector(selector), min_count, results)
+
+
+def _check_phase(contracts: list[tuple], phase: str, results: list[dict]) -> None:
+    """Count all selectors of one phase in a single evaluation and append results."""
+    phase_contracts = [c for c in contracts if c[3] == phase]
+    if not phase_contracts:
+        return
+    counts = count_selectors([c[0] for c in phase_contracts])
+    for selector, description, page, _phase, min_count in phase_contracts:
+        _record(selector, description, page, counts[selector], min_count, results)
+
+
+def _record(selector: str, description: str, page: str, count: int, min_count: int, results: list[dict]) -> None:
+    """Append a selector result and print its status."""
     found = count >= min_count
     status = 'OK' if found else 'MISSING'
     icon = '\u2705' if found else '\u274c'
@@ -70,84 +218,158 @@ def _check_and_record(selector: str, description: str, page: str, min_count: int
     )
 
 
-def _wait_for_data(indicator_selector: str) -> None:  # pragma: no cover
-    """Poll until data elements appear or timeout."""
-    for i in range(WAIT_KPI_MAX_RETRIES):
-        count = check_selector(indicator_selector)
-        if count > 0:
-            print(f'  (data loaded after {(i + 1) * WAIT_KPI_POLL}s)')
+class ContractRecorder:
+    """Collect CONTRACTS selector counts while a report run is already on the page.
+
+    Each (page, phase) is counted once, in one evaluation; results use the
+    baseline format so they can be compared with diff_baseline.
+    """
+
+    def __init__(self):
+        self.results: list[dict] = []
+        self._done: set[tuple[str, str]] = set()
+
+    def record(self, page: str, phase: str) -> None:
+        if (page, phase) in self._done:
             return
-        time.sleep(WAIT_KPI_POLL)
-    print(f'  (data not loaded after {WAIT_KPI_MAX_RETRIES * WAIT_KPI_POLL}s, checking anyway)')
+        self._done.add((page, phase))
+        _check_phase([c for c in CONTRACTS if c[2] == page], phase, self.results)
 
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc = {'timestamp': datetime.now(UTC).isoformat(), 'results': self.results}
+        path.write_text(json.dumps(doc, indent=2) + '\n')
+        print(f'Contract counts saved: {path}')
 
-def run_checks(headed: bool) -> list[dict]:  # pragma: no cover
-    """Run all contract checks against live Akamai.
 
-    For each page:
-      1. Navigate to report page
-      2. Open filter panel → check 'filter' selectors (calendar, CP codes)
-      3. Click Apply to trigger data load → check 'data' selectors (KPI, geo table)
+def load_results(path: str | Path) -> list[dict]:
+    """Load selector results saved by a report run or by --save."""
+    return json.loads(Path(path).read_text())['results']
+
+
+def _wait_for_counts(minimums: dict[str, int], timeout: float) -> bool:  # pragma: no cover
+    """Poll (one evaluation per poll) until every selector reaches its minimum count."""
+
+    def ready() -> bool:
+        counts = count_selectors(list(minimums))
+        return all(counts[s] >= m for s, m in minimums.items())
+
+    return wait_until(ready, timeout, WAIT_POLL)
+
+
+def _open_page(page: str) -> None:  # pragma: no cover
+    """Navigate to a report page and open its filter panel, waiting for readiness."""
+    navigate_to_report(REPORT_PAGES[page])
+    _wait_for_counts({'app-date-range-preview': 1}, WAIT_PAGE_READY)
+
+    # Open filter panel; wait until the calendar has rendered its day cells
+    ab_eval("document.querySelector('app-date-range-preview')?.click()")
+    run_ab('wait', '#cpcodes-filter-editor')
+    _wait_for_counts({'.akam-calendar-body-cell-content': 28}, WAIT_PAGE_READY)
+
+
+def _check_page(page: str) -> list[dict]:  # pragma: no cover
+    """Check one report page in the current session.
+
+    1. Navigate to report page
+    2. Open filter panel → check 'filter' selectors (calendar, CP codes)
+    3. Click Apply to trigger data load → check 'data' selectors (KPI, geo table)
+    """
+    page_contracts = [c for c in CONTRACTS if c[2] == page]
+    results: list[dict] = []
+    if not page_contracts:
+        return results
+
+    _open_page(page)
+
+    # Check 'filter' phase selectors while panel is open
+    _check_phase(page_contracts, 'filter', results)
+
+    # Set date range to a known-good period (ensures data exists)
+    set_date_range('2026-01-25', '2026-01-31')
+
+    # Ensure CP codes are selected (filters don't carry over between reports)
+    ab_eval("""(() => {
+        const editor = document.getElementById('cpcodes-filter-editor');
+        const spans = editor.querySelectorAll('span');
+        for (const s of spans) {
+            if (s.textContent.trim().startsWith('Select:')) { s.click(); break; }
+        }
+    })()""")
+
+    # Click Apply to trigger data load, then wait for the page's data indicator
+    run_ab('scrollintoview', "button:has-text('Apply')")
+    run_ab('click', "button:has-text('Apply')")
+    indicator, min_count = DATA_INDICATORS[page]
+    if not _wait_for_counts({indicator: min_count}, WAIT_DATA_READY):
+        print(f'  ({page}: data not loaded after {WAIT_DATA_READY}s, checking anyway)')
+
+    # Check 'data' phase selectors after data loads
+    _check_phase(page_contracts, 'data', results)
+    return results
+
+
+def _fingerprint_page(page: str) -> dict[str, str]:  # pragma: no cover
+    """Collect structural signatures for one page without setting filters or applying.
+
+    The page's default report data is used; if it has not loaded in time the
+    signatures differ from the stored ones and the full check runs instead.
+    """
+    selectors = [c[0] for c in CONTRACTS if c[2] == page]
+    if not selectors:
+        return {}
+    _open_page(page)
+    indicator, min_count = DATA_INDICATORS[page]
+    _wait_for_counts({indicator: min_count}, WAIT_PAGE_READY)
+    return collect_signatures(selectors)
+
+
+def _run_in_session(func, page: str, session: str):  # pragma: no cover
+    with use_session(session):
+        return func(page)
+
+
+@contextlib.contextmanager
+def _open_sessions(headed: bool, serial: bool) -> Iterator[Callable[[Callable], list]]:  # pragma: no cover
+    """Open the report page sessions and yield a runner: run(func) -> [func(page) for every page].
+
+    By default each page gets its own browser session and the pages run
+    concurrently; serial=True runs them in turn in one session. The sessions
+    stay open across runs, so a fingerprint and a full check share them.
     """
-    init_browser(STATE_FILE, AKAMAI_URL, headed=headed)
-    time.sleep(5)
+    pages = list(REPORT_PAGES)
+    sessions = [SESSION] if serial else [f'{SESSION}-contract-{page}' for page in pages]
 
-    results = []
+    def run(func) -> list:
+        if serial:
+            return [func(page) for page in pages]
+        with ThreadPoolExecutor(max_workers=len(pages)) as pool:
+            return list(pool.map(partial(_run_in_session, func), pages, sessions))
 
     try:
-        for page in ['hostname', 'geography']:
-            page_contracts = [(s, d, p, ph, m) for s, d, p, ph, m in CONTRACTS if p == page]
-            if not page_contracts:
-                continue
-
-            # Navigate
-            report_name = 'Traffic by Hostname' if page == 'hostname' else 'Traffic by Geography'
-            navigate_to_report(report_name)
-            time.sleep(WAIT_REPORT_LOAD)
-
-            # Open filter panel
-            ab_eval("document.querySelector('app-date-range-preview')?.click()")
-            run_ab('wait', '#cpcodes-filter-editor')
-            time.sleep(2)
-
-            # Check 'filter' phase selectors while panel is open
-            for selector, description, pg, phase, min_count in page_contracts:
-                if phase == 'filter':
-                    _check_and_record(selector, description, pg, min_count, results)
-
-            # Set date range to a known-good period (ensures data exists)
-            set_date_range('2026-01-25', '2026-01-31')
-            time.sleep(1)
-
-            # Ensure CP codes are selected (filters don't carry over between reports)
-            ab_eval("""(() => {
-                const editor = document.getElementById('cpcodes-filter-editor');
-                const spans = editor.querySelectorAll('span');
-                for (const s of spans) {
-                    if (s.textContent.trim().startsWith('Select:')) { s.click(); break; }
-                }
-            })()""")
-            time.sleep(1)
-
-            # Click Apply to trigger data load
-            run_ab('scrollintoview', "button:has-text('Apply')")
-            run_ab('click', "button:has-text('Apply')")
-            time.sleep(WAIT_REPORT_LOAD)
-
-            # Poll for data
-            if page == 'hostname':
-                _wait_for_data('akam-single-kpi')
-            else:
-                _wait_for_data('table.cdk-table.akam-table')
-
-            # Check 'data' phase selectors after data loads
-            for selector, description, pg, phase, min_count in page_contracts:
-                if phase == 'data':
-                    _check_and_record(selector, description, pg, min_count, results)
+        # Launch sessions one at a time before running the pages
+        for session in sessions:
+            with use_session(session):
+                init_browser(STATE_FILE, AKAMAI_URL, headed=headed)
+        yield run
     finally:
-        close_browser()
+        for session in sessions:
+            with use_session(session):
+                close_browser()
 
-    return results
+
+def run_checks(run) -> list[dict]:  # pragma: no cover
+    """Run all contract checks against live Akamai with a runner from _open_sessions."""
+    return [r for results in run(_check_page) for r in results]
+
+
+def run_fingerprint(run) -> dict[str, str]:  # pragma: no cover
+    """Collect structural signatures for every CONTRACTS selector with a runner from _open_sessions."""
+    signatures: dict[str, str] = {}
+    for page_signatures in run(_fingerprint_page):
+        signatures.update(page_signatures)
+    return signatures
 
 
 def save_baseline(results: list[dict]) -> None:  # pragma: no cover
@@ -197,10 +419,38 @@ def main():  # pragma: no cover
     parser.add_argument('--headed', action='store_true', help='Run browser in headed mode')
     parser.add_argument('--save', action='store_true', help='Save results as baseline')
     parser.add_argument('--diff', action='store_true', help='Compare against saved baseline')
+    parser.add_argument('--serial', action='store_true', help='Check pages one after another in a single session')
+    parser.add_argument(
+        '--fingerprint', action='store_true', help='Skip the detailed check when the DOM structure is unchanged'
+    )
+    parser.add_argument('--from', dest='from_file', help='Check counts recorded by a report run (no browser)')
     args = parser.parse_args()
 
-    print('Running contract checks...\n')
-    results = run_checks(headed=args.headed)
+    fingerprint = None
+    if args.from_file:
+        print(f'Loading recorded contract counts from {args.from_file}...\n')
+        results = load_results(args.from_file)
+    else:
+        with _open_sessions(args.headed, args.serial) as run:
+            if args.fingerprint:
+                print('Computing DOM fingerprint...\n')
+                fingerprint = hash_signatures(run_fingerprint(run))
+                stored = load_fingerprint()
+                if stored and stored['hash'] == fingerprint['hash']:
+                    print(f'Fingerprint unchanged ({fingerprint["hash"]}) — skipping detailed check.')
+                    if args.save:
+                        save_fingerprint(fingerprint)
+                    return
+                if stored:
+                    print(f'Fingerprint changed ({stored["hash"]} -> {fingerprint["hash"]}):')
+                    for sel in diff_fingerprint(stored, fingerprint):
+                        print(f'  \u0394 {sel}')
+                else:
+                    print(f'No fingerprint found at {FINGERPRINT_PATH}.')
+                print()
+
+            print('Running contract checks...\n')
+            results = run_checks(run)
 
     passed = sum(1 for r in results if r['found'])
     total = len(results)
@@ -209,12 +459,14 @@ def main():  # pragma: no cover
     if args.save:
         save_baseline(results)
 
-    if args.diff:
-        exit_code = diff_baseline(results)
-        sys.exit(exit_code)
+    exit_code = diff_baseline(results) if args.diff else int(passed < total)
 
-    if passed < total:
-        sys.exit(1)
+    # Only trust the new structure once the detailed pass has confirmed it
+    if fingerprint and (args.save or (exit_code == 0 and passed == total)):
+        save_fingerprint(fingerprint)
+
+    if exit_code:
+        sys.exit(exit_code)
 
 
 if __name__ == '__main__':
@@ -1,16 +1,24 @@
 """CP code selection logic for Akamai report sidebar."""
 
-import time
+import subprocess
 
-from scripts.browser_helpers import ab_eval, run_ab
+from scripts.browser_helpers import RetryPolicy, TransientError, ab_eval, classify_failure, retry, run_ab
+from scripts.deadline import pause
 
 CP_EDITOR_ID = 'cpcodes-filter-editor'
+CP_SEARCH_INPUT = "input[placeholder='CP codes']"
+
+# Seconds for the CP code list to filter after typing a search
+SEARCH_SETTLE = 0.5
+
+# Clicking a searched CP code: backoff from 1 s while the list is still filtering
+CP_SEARCH_RETRY = RetryPolicy(attempts=4, base_delay=1.0)
 
 
 def scroll_to_cp_codes() -> None:
     """Scroll the CP codes section into view."""
     run_ab('scrollintoview', f'#{CP_EDITOR_ID}')
-    time.sleep(0.5)
+    pause(0.5)
 
 
 def _click_cp_action(action: str) -> None:
@@ -29,7 +37,7 @@ def _click_cp_action(action: str) -> None:
         return 'not_found';
     }})()
     """)
-    time.sleep(0.5)
+    pause(0.5)
 
 
 def deselect_all() -> None:
@@ -42,34 +50,34 @@ def select_all() -> None:
     _click_cp_action('Select')
 
 
-def search_and_select_cp_code(code: str, retries: int = 3) -> None:
+def search_and_select_cp_code(code: str, policy: RetryPolicy = CP_SEARCH_RETRY) -> None:
     """Search for a CP code and select its checkbox.
 
     Uses scoped selector to click within CP codes editor only,
-    avoiding ambiguity with the main data table.
+    avoiding ambiguity with the main data table. A click that fails while the
+    list is still filtering is retried with backoff.
     """
     scroll_to_cp_codes()
 
-    for attempt in range(retries):
+    def attempt() -> None:
         # Fill the CP codes search input
-        run_ab('fill', "input[placeholder='CP codes']", code)
-        time.sleep(2)
-
+        run_ab('fill', CP_SEARCH_INPUT, code)
+        pause(SEARCH_SETTLE)
         # Click within CP codes editor (scoped to avoid matching data table)
         try:
             run_ab('click', f'#{CP_EDITOR_ID} >> text=({code})')
-            break
-        except Exception:
-            if attempt < retries - 1:
-                run_ab('fill', "input[placeholder='CP codes']", '')
-                time.sleep(2)
-            else:
+        except subprocess.CalledProcessError as e:
+            if classify_failure(e) != 'transient':
                 raise
-    time.sleep(0.3)
+            run_ab('fill', CP_SEARCH_INPUT, '')
+            raise TransientError(f'CP code {code} not listed yet') from e
+
+    retry(attempt, policy)
+    pause(0.3)
 
     # Clear search
-    run_ab('fill', "input[placeholder='CP codes']", '')
-    time.sleep(0.5)
+    run_ab('fill', CP_SEARCH_INPUT, '')
+    pause(0.5)
 
 
 def select_cp_codes(config) -> None:
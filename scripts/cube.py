@@ -0,0 +1,279 @@
+"""Local rollup store of traffic bytes by day span, source, CP code, hostname, country and path.
+
+Every report run adds its results to a SQLite database (output/traffic.db) as
+additive byte facts. A fact covers an inclusive span of UTC+8 days: one day
+for chart or CloudWatch series, the whole report range for KPI and geography
+totals. Queries pick the non-overlapping facts inside the requested range that
+cover the most days (widest first), sum them per group and report the days
+nothing covers. Units are converted at read time.
+
+cp_code holds a report type's CP code selection (cp_code_key), not single CP
+codes: totals of several CP codes cannot be split, and the per-CP-code rows
+a batched run reads are not stored.
+
+Usage:
+    uv run python -m scripts.cube --import output/report_2026-01-25_2026-01-31.json
+"""
+
+import argparse
+import bisect
+import json
+import sqlite3
+from collections.abc import Iterable
+from dataclasses import astuple, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+from scripts.config import REPORT_TYPES, ReportConfig
+from scripts.data_extract import GEO_ALL, convert_unit
+
+CUBE_PATH = Path(__file__).resolve().parent.parent / 'output' / 'traffic.db'
+
+# Fact key columns, in primary-key order
+DIMENSIONS = ('source', 'cp_code', 'hostname', 'country', 'path', 'metric')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    source    TEXT NOT NULL,
+    cp_code   TEXT NOT NULL,
+    hostname  TEXT NOT NULL,
+    country   TEXT NOT NULL,
+    path      TEXT NOT NULL,
+    metric    TEXT NOT NULL,
+    day_start TEXT NOT NULL,
+    day_end   TEXT NOT NULL,
+    bytes     INTEGER NOT NULL,
+    PRIMARY KEY (source, cp_code, hostname, country, path, metric, day_start, day_end)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS facts_by_range
+    ON facts (metric, day_start, day_end, cp_code, country, hostname, path, source, bytes);
+"""
+
+
+@dataclass(frozen=True)
+class Fact:
+    source: str
+    cp_code: str
+    hostname: str
+    country: str
+    path: str
+    metric: str
+    day_start: str
+    day_end: str
+    bytes: int
+
+    @property
+    def series(self) -> tuple[str, ...]:
+        return self.source, self.cp_code, self.hostname, self.country, self.path, self.metric
+
+
+def connect(path: str | Path = CUBE_PATH) -> sqlite3.Connection:
+    """Open (and create if needed) the cube database."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def cp_code_key(cp_codes: list[str]) -> str:
+    """Key for a CP code selection: 'ALL' or the sorted codes joined by commas."""
+    return 'ALL' if cp_codes == ['ALL'] else ','.join(sorted(cp_codes))
+
+
+def add_facts(conn: sqlite3.Connection, facts: Iterable[Fact], accumulate: bool = False) -> int:
+    """Insert facts and commit, replacing earlier values for the same key and span.
+
+    With accumulate, bytes are added to an existing fact instead (incremental
+    log ingestion). Statements the caller issued since the last commit are
+    committed in the same transaction.
+    """
+    sql = 'INSERT INTO facts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    if accumulate:
+        sql += ' ON CONFLICT DO UPDATE SET bytes = bytes + excluded.bytes'
+    else:
+        sql = sql.replace('INSERT', 'INSERT OR REPLACE', 1)
+    with conn:
+        cur = conn.executemany(sql, map(astuple, facts))
+    return cur.rowcount
+
+
+def _daily_key_to_date(key: str, start_date: str) -> str:
+    """Convert a CloudFront "MM/DD" key to YYYY-MM-DD within a range starting at start_date."""
+    start = date.fromisoformat(start_date)
+    month, day = map(int, key.split('/'))
+    year = start.year + 1 if month < start.month else start.year
+    return date(year, month, day).isoformat()
+
+
+def facts_from_result(result: dict, config: ReportConfig | None = None) -> list[Fact]:
+    """Convert one report output dict into facts.
+
+    config is the report type's settings (None for CloudFront). Geography facts
+    are recorded for every configured country, with 0 bytes for countries absent
+    from the output, so a missing country reads as covered rather than unknown.
+    """
+    start, end = result['date_range']['start'], result['date_range']['end']
+    if result['type'] == 'cloudfront':
+        dist = result['distribution_id']
+        facts = []
+        for key, value in result['daily_bytes'].items():
+            day = _daily_key_to_date(key, start)
+            facts.append(Fact('cloudfront', dist, '', '', '', 'edge', day, day, int(value)))
+        return facts
+
+    cp_key = cp_code_key(config.cp_codes if config else ['ALL'])
+    facts = []
+    for metric, value in result.get('traffic', {}).items():
+        if metric != 'offload':
+            value = int(convert_unit(value, result['unit'], 'B'))
+            facts.append(Fact('akamai', cp_key, '', '', '', metric, start, end, value))
+    for day, values in result.get('daily', {}).items():
+        for metric, value in values.items():
+            facts.append(Fact('akamai', cp_key, '', '', '', metric, day, day, int(value)))
+    if config and config.geo_countries:
+        geography = result.get('geography', {})
+        countries = [c for c in config.geo_countries if c != GEO_ALL]
+        for country in dict.fromkeys([*countries, *geography]):
+            value = int(convert_unit(geography.get(country, 0.0), 'TB', 'B'))
+            facts.append(Fact('akamai', cp_key, '', country, '', 'edge', start, end, value))
+    return facts
+
+
+def store_results(results: list[dict], path: str | Path = CUBE_PATH) -> int:
+    """Add report outputs to the cube and return the number of facts written.
+
+    Report types no longer in settings are skipped (their CP codes are unknown).
+    """
+    facts = []
+    for result in results:
+        if result.get('type') == 'cloudfront':
+            facts.extend(facts_from_result(result))
+        elif result.get('type') in REPORT_TYPES:
+            facts.extend(facts_from_result(result, REPORT_TYPES[result['type']]))
+    conn = connect(path)
+    try:
+        return add_facts(conn, facts)
+    finally:
+        conn.close()
+
+
+def select_facts(conn: sqlite3.Connection, start_date: str, end_date: str, **filters: str) -> list[Fact]:
+    """Facts whose span lies inside [start_date, end_date], filtered by dimension values."""
+    unknown = set(filters) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f'Unknown dimensions: {sorted(unknown)}')
+    where = ['day_start >= ?', 'day_end <= ?'] + [f'{dim} = ?' for dim in filters]
+    sql = f'SELECT * FROM facts WHERE {" AND ".join(where)}'
+    return [Fact(*row) for row in conn.execute(sql, [start_date, end_date, *filters.values()])]
+
+
+def days_between(start_date: str, end_date: str) -> list[str]:
+    """Every YYYY-MM-DD day from start_date to end_date inclusive."""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+
+
+def day_ranges(days: Iterable[str]) -> list[tuple[str, str]]:
+    """Collapse days into sorted inclusive (start, end) runs."""
+    ranges: list[list[str]] = []
+    for day in sorted(days):
+        if ranges and date.fromisoformat(day) - date.fromisoformat(ranges[-1][1]) == timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [(a, b) for a, b in ranges]
+
+
+def resolve_coverage(facts: list[Fact], start_date: str, end_date: str) -> tuple[list[Fact], list[str]]:
+    """Pick non-overlapping facts of one series covering as many days as possible.
+
+    Among equal coverings the one with the fewest (widest) facts wins, so a
+    stored week total is kept over a single day inside it.
+    Returns (chosen facts, days in the range no chosen fact covers).
+    """
+    ordered = sorted(facts, key=lambda f: (f.day_end, f.day_start))
+    ends = [fact.day_end for fact in ordered]
+    # best[i]: (days covered, -facts used) of the best choice among the first i facts
+    best = [(0, 0)]
+    taken: list[int | None] = [None]
+    for i, fact in enumerate(ordered):
+        before = bisect.bisect_left(ends, fact.day_start, 0, i)
+        span = (date.fromisoformat(fact.day_end) - date.fromisoformat(fact.day_start)).days + 1
+        take = (best[before][0] + span, best[before][1] - 1)
+        if take > best[i]:
+            best.append(take)
+            taken.append(before)
+        else:
+            best.append(best[i])
+            taken.append(None)
+
+    chosen = []
+    i = len(ordered)
+    while i > 0:
+        if taken[i] is None:
+            i -= 1
+        else:
+            chosen.append(ordered[i - 1])
+            i = taken[i]
+    chosen.reverse()
+    covered = {day for fact in chosen for day in days_between(fact.day_start, fact.day_end)}
+    return chosen, [day for day in days_between(start_date, end_date) if day not in covered]
+
+
+def query(
+    conn: sqlite3.Connection,
+    start_date: str,
+    end_date: str,
+    group_by: Iterable[str] = ('metric',),
+    unit: str = 'B',
+    **filters: str,
+) -> dict:
+    """Sum bytes over a date range, grouped by dimensions.
+
+    Returns:
+        {"rows": [{<group dims>, "value": float, "unit": unit}, ...],
+         "missing": [{<series dims>, "ranges": [(start, end), ...]}, ...]}
+        where missing lists each stored series that does not cover the whole range.
+    """
+    group_by = tuple(group_by)
+    unknown = set(group_by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f'Unknown dimensions: {sorted(unknown)}')
+    series: dict[tuple[str, ...], list[Fact]] = {}
+    for fact in select_facts(conn, start_date, end_date, **filters):
+        series.setdefault(fact.series, []).append(fact)
+
+    totals: dict[tuple[str, ...], int] = {}
+    missing = []
+    for key, facts in sorted(series.items()):
+        chosen, gaps = resolve_coverage(facts, start_date, end_date)
+        dims = dict(zip(DIMENSIONS, key))
+        group = tuple(dims[d] for d in group_by)
+        totals[group] = totals.get(group, 0) + sum(f.bytes for f in chosen)
+        if gaps:
+            missing.append({**dims, 'ranges': day_ranges(gaps)})
+
+    rows = [
+        {**dict(zip(group_by, group)), 'value': convert_unit(total, 'B', unit), 'unit': unit}
+        for group, total in sorted(totals.items())
+    ]
+    return {'rows': rows, 'missing': missing}
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Local traffic rollup cube')
+    parser.add_argument('--import', dest='files', nargs='+', metavar='JSON', help='Add report output files')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    args = parser.parse_args()
+
+    if args.files:
+        results = []
+        for file in args.files:
+            data = json.loads(Path(file).read_text())
+            results.extend(data if isinstance(data, list) else [data])
+        print(f'Stored {store_results(results, args.db)} facts from {len(args.files)} file(s) in {args.db}')
+
+
+if __name__ == '__main__':
+    main()
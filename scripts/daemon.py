@@ -0,0 +1,238 @@
+"""Long-running report scheduler that keeps logged-in browser sessions warm.
+
+Each configured agent-browser session is opened once and served by its own
+worker thread, which runs scheduled report jobs as they come due and, between
+jobs, reloads the page and re-saves the state file (refresh_session._save_state)
+before the earliest cookie expires. Reports reuse the open browser, so no run
+pays for a cold start or a session check. Results go to the usual report JSON
+in output/ and to the traffic cube. Jobs are configured in the daemon section
+of settings.yaml; times are UTC+8.
+
+Usage:
+    uv run python -m scripts.daemon
+    uv run python -m scripts.daemon --list      # print the next run of each job
+"""
+
+import argparse
+import functools
+import json
+import queue
+import signal
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from scripts.akamai_report import OUTPUT_DIR, WAIT_BROWSER_INIT, _print_compact, run_reports, write_json_atomic
+from scripts.browser_helpers import close_browser, init_browser, page_state, run_ab, use_session
+from scripts.config import AKAMAI_URL, DAEMON_CONFIG, REPORT_TYPES, STATE_FILE, WEEKDAYS, DaemonConfig, ScheduledJob
+from scripts.cube import CUBE_PATH, store_results
+from scripts.deadline import deadline, pause
+from scripts.refresh_session import _check_logged_in, _save_state
+from scripts.sources import Resource
+
+UTC8 = timezone(timedelta(hours=8))
+
+# Refresh this long before the earliest cookie expiry
+REFRESH_MARGIN = 300
+
+# Seconds before a worker retries a failed browser start
+INIT_RETRY = 60
+
+# The state file is shared by all sessions
+_state_lock = threading.Lock()
+
+
+def report_range(job: ScheduledJob, run_at: datetime) -> tuple[str, str]:
+    """The job's date range for a run: its days ending the day before run_at (UTC+8)."""
+    end = run_at.astimezone(UTC8).date() - timedelta(days=1)
+    start = end - timedelta(days=job.days - 1)
+    return start.isoformat(), end.isoformat()
+
+
+def next_run(job: ScheduledJob, after: datetime) -> datetime:
+    """First time later than after at the job's HH:MM (UTC+8) on one of its weekdays."""
+    local = after.astimezone(UTC8)
+    hour, minute = map(int, job.at.split(':'))
+    candidate = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while WEEKDAYS[candidate.weekday()] not in job.weekdays:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class Schedule:
+    """Next run time of every job; due() hands out the jobs whose time has come."""
+
+    def __init__(self, jobs: list[ScheduledJob], now: datetime):
+        self._next = {job.name: (job, next_run(job, now)) for job in jobs}
+
+    def due(self, now: datetime) -> list[tuple[ScheduledJob, datetime]]:
+        """(job, scheduled time) for each job due at now; each is rescheduled after now."""
+        due = []
+        for name, (job, at) in self._next.items():
+            if at <= now:
+                due.append((job, at))
+                self._next[name] = (job, next_run(job, now))
+        return sorted(due, key=lambda item: item[1])
+
+    def upcoming(self) -> list[tuple[ScheduledJob, datetime]]:
+        return sorted(self._next.values(), key=lambda item: item[1])
+
+    def seconds_until_next(self, now: datetime) -> float:
+        return max(0.0, min((at - now).total_seconds() for _, at in self._next.values())) if self._next else 3600.0
+
+
+def refresh_time(cookies: list[dict], last_refresh: float, interval: float, margin: float = REFRESH_MARGIN) -> float:
+    """Epoch time of the next refresh: after interval, or margin before the earliest cookie expiry.
+
+    Cookies expiring within margin of the last refresh were not renewed by it and are ignored.
+    """
+    expiries = [cookie['expires'] for cookie in cookies if cookie.get('expires', -1) > last_refresh + margin]
+    due = last_refresh + interval
+    return min(due, min(expiries) - margin) if expiries else due
+
+
+def load_cookies(path: str = STATE_FILE) -> list[dict]:
+    """Cookies from a Playwright storage state file (empty if it is missing or unreadable)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('cookies', [])
+    except (OSError, ValueError):
+        return []
+
+
+def refresh(session: str) -> bool:  # pragma: no cover
+    """Reload the reports app in the current session and save its state; False if it is logged out."""
+    run_ab('open', AKAMAI_URL)
+    page_state().clear()
+    pause(WAIT_BROWSER_INIT)
+    if not _check_logged_in():
+        print(f'[daemon] {session}: logged out; run python -m scripts.refresh_session --force')
+        return False
+    with _state_lock:
+        _save_state()
+    return True
+
+
+def run_job(job: ScheduledJob, run_at: datetime, browser: Resource) -> list[dict]:  # pragma: no cover
+    """Run one scheduled job on an open browser and save its outputs like akamai_report does."""
+    start_date, end_date = report_range(job, run_at)
+    types = job.types or list(REPORT_TYPES) + ['cloudfront']
+    print(f'[daemon] {job.name}: {", ".join(types)} for {start_date} to {end_date}')
+    with deadline(job.deadline_minutes * 60):
+        results = run_reports(types, start_date, end_date, browser=browser, on_result=_print_compact)
+    if results:
+        output_path = OUTPUT_DIR / f'report_{start_date}_{end_date}.json'
+        write_json_atomic(output_path, results if len(results) > 1 else results[0])
+        print(f'[daemon] {job.name}: output saved to {output_path}; {store_results(results)} facts in {CUBE_PATH}')
+    return results
+
+
+class SessionWorker(threading.Thread):
+    """Keeps one browser session open and logged in, running tasks from a shared queue.
+
+    A task is a callable taking the session's browser Resource (see run_reports);
+    a failing task is reported and the worker moves on to the next one. If the
+    browser cannot be started or the session is logged out, the error is kept
+    in init_error and the start is retried every INIT_RETRY seconds (picking up
+    a state file saved by refresh_session --force); until then the worker takes
+    no tasks, so they go to the other sessions.
+    """
+
+    def __init__(self, session: str, tasks: queue.Queue, stop: threading.Event, refresh_interval: float):
+        super().__init__(name=f'daemon-{session}')
+        self.session = session
+        self.tasks = tasks
+        self.stop = stop
+        self.refresh_interval = refresh_interval
+        self.ready = threading.Event()
+        self.init_error: Exception | None = None
+
+    def run(self) -> None:  # pragma: no cover
+        with use_session(self.session):
+            browser = Resource('browser')
+            opened = False
+            next_refresh = 0.0
+            try:
+                while not self.stop.is_set():
+                    if not self.ready.is_set():
+                        try:
+                            init_browser(STATE_FILE, AKAMAI_URL)
+                            opened = True
+                            if not refresh(self.session):
+                                raise RuntimeError('session is logged out')
+                        except Exception as e:
+                            self.init_error = e
+                            print(f'[daemon] {self.session}: browser start failed ({e}); retrying in {INIT_RETRY}s')
+                            self.stop.wait(INIT_RETRY)
+                            continue
+                        self.init_error = None
+                        self.ready.set()
+                        next_refresh = refresh_time(load_cookies(), time.time(), self.refresh_interval)
+                    if time.time() >= next_refresh:
+                        try:
+                            logged_in = refresh(self.session)
+                        except Exception as e:
+                            print(f'[daemon] {self.session}: refresh failed: {e}')
+                            logged_in = True
+                        if not logged_in:
+                            # Take no tasks until a restart finds a logged-in state file
+                            self.ready.clear()
+                            continue
+                        next_refresh = refresh_time(load_cookies(), time.time(), self.refresh_interval)
+                    try:
+                        task = self.tasks.get(timeout=max(0.1, min(5.0, next_refresh - time.time())))
+                    except queue.Empty:
+                        continue
+                    try:
+                        task(browser)
+                    except Exception as e:
+                        print(f'[daemon] {self.session}: task failed: {e}')
+            finally:
+                if opened:
+                    close_browser()
+
+
+def serve(config: DaemonConfig) -> None:  # pragma: no cover
+    """Start one worker per session and feed them due jobs until SIGTERM or Ctrl-C."""
+    stop = threading.Event()
+    tasks: queue.Queue = queue.Queue()
+    workers = [SessionWorker(name, tasks, stop, config.refresh_minutes * 60) for name in config.sessions]
+    for worker in workers:
+        worker.start()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    schedule = Schedule(config.jobs, datetime.now(UTC8))
+    print(f'[daemon] {len(workers)} session(s), {len(config.jobs)} job(s)')
+    try:
+        while not stop.is_set():
+            now = datetime.now(UTC8)
+            for job, run_at in schedule.due(now):
+                tasks.put(functools.partial(run_job, job, run_at))
+            stop.wait(min(60.0, schedule.seconds_until_next(now)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Run scheduled CDN reports with warm browser sessions')
+    parser.add_argument('--list', action='store_true', help='Print the next run of each job and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for job, at in Schedule(DAEMON_CONFIG.jobs, datetime.now(UTC8)).upcoming():
+            start_date, end_date = report_range(job, at)
+            print(f'{job.name:<16} {at:%Y-%m-%d %H:%M} UTC+8  {start_date} to {end_date}')
+        return
+    if not DAEMON_CONFIG.jobs:
+        print('[daemon] No jobs configured (daemon.jobs in settings.yaml)')
+        return
+    serve(DAEMON_CONFIG)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,14 @@
 """Akamai report data extraction and parsing."""
 
+import csv
 import json
 import re
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
 
-from scripts.browser_helpers import ab_eval
+from scripts.browser_helpers import ab_eval, run_ab
+from scripts.cloudfront import UTC_PLUS_8
 
 UNIT_MAP = {
     'Terabytes': 'TB',
@@ -20,6 +25,33 @@ UNIT_BYTES = {
     'TB': 1e12,
 }
 
+# geo_countries value that requests every country in the geography table
+GEO_ALL = 'ALL'
+
+# Rows returned per ab_eval when draining the in-page geography buffer
+GEO_BATCH_SIZE = 500
+
+# Paginator controls of the geography table; pages are walked until next is
+# disabled, then the table is paged back to where it started
+GEO_NEXT_PAGE_SELECTOR = "button[aria-label='Next page']"
+GEO_PREV_PAGE_SELECTOR = "button[aria-label='Previous page']"
+GEO_MAX_PAGES = 200
+GEO_SETTLE_MS = 250
+
+# Export cells meaning "no data" (compared upper-cased, commas removed)
+CSV_EMPTY_VALUES = ('', '-', '\u2014', 'N/A', 'NA')
+
+# Report widget export controls: the download menu (if any) and its CSV action
+EXPORT_MENU_SELECTOR = "button[aria-label='Download']"
+EXPORT_CSV_SELECTOR = "a:has-text('Export CSV'), button:has-text('Export CSV')"
+
+# Per-CP-code breakdown table on the Traffic by Hostname page
+CP_BREAKDOWN_SELECTOR = 'app-cpcode-breakdown table'
+
+# Column headers of the geography table export
+GEO_CSV_KEY = 'Country/area'
+GEO_CSV_VALUE = 'Bytes'
+
 
 def parse_traffic_value(text: str) -> tuple[float, str]:
     """Parse traffic value string into (number, unit).
@@ -85,36 +117,332 @@ def extract_traffic_cards() -> dict:  # pragma: no cover
     return result
 
 
-def extract_geography_table(countries: list[str]) -> dict[str, float]:  # pragma: no cover
-    """Extract geography data from Traffic by Geography report table.
+def traffic_from_bytes(edge: float, origin: float, midgress: float, unit: str) -> dict:
+    """Build a report traffic dict from byte totals.
 
-    The table uses class 'cdk-table akam-table' with columns:
-    Country/area | Bytes. Empty separator rows exist between data rows.
+    Byte values are converted to unit; offload is (edge - origin) / edge in %,
+    matching the "Edge vs. Origin" card.
+    """
+    traffic = {
+        key: convert_unit(value, 'B', unit)
+        for key, value in (('edge', edge), ('origin', origin), ('midgress', midgress))
+    }
+    traffic['offload'] = round((edge - origin) / edge * 100, 2) if edge else 0.0
+    return traffic
+
+
+def extract_cp_code_breakdown() -> dict[str, dict[str, int]]:  # pragma: no cover
+    """Read the per-CP-code table of the hostname report.
+
+    Returns:
+        {"960172": {"edge": 100000000000000, "origin": ..., "midgress": ...}, ...} in bytes
+    """
+    js = f"""
+    (() => {{
+        const table = document.querySelector("{CP_BREAKDOWN_SELECTOR}");
+        if (!table) return null;
+        const rows = [];
+        for (const tr of table.querySelectorAll('tbody tr')) {{
+            const cells = [...tr.querySelectorAll('td')].map(td => td.textContent.trim());
+            if (cells.length >= 4) rows.push(cells.slice(0, 4));
+        }}
+        return rows;
+    }})()
+    """
+    rows = json.loads(ab_eval(js))
+    if rows is None:
+        raise RuntimeError(f'CP code breakdown table not found: {CP_BREAKDOWN_SELECTOR}')
+    return parse_cp_code_breakdown(rows)
+
+
+def parse_cp_code_breakdown(rows: list[list[str]]) -> dict[str, dict[str, int]]:
+    """Parse breakdown rows of [CP code, edge, origin, midgress] cell texts (bytes, comma-grouped).
+
+    Raises:
+        ValueError: if a row is not a numeric CP code followed by three integer byte counts,
+            e.g. because the selector matched another table or the cells carry units
+    """
+    breakdown = {}
+    for row in rows:
+        code, *values = row
+        if not code.isdigit() or not all(re.fullmatch(r'\d{1,3}(,\d{3})*|\d+', value) for value in values):
+            raise ValueError(f'Unexpected CP code breakdown row {row}: expected a CP code and byte counts')
+        edge, origin, midgress = (int(value.replace(',', '')) for value in values)
+        breakdown[code] = {'edge': edge, 'origin': origin, 'midgress': midgress}
+    return breakdown
+
+
+def traffic_for_cp_codes(breakdown: dict[str, dict[str, int]], cp_codes: list[str], unit: str) -> dict:
+    """Sum a CP code breakdown over cp_codes (or every row for ["ALL"]) into a traffic dict.
+
+    Raises:
+        KeyError: if a configured CP code is not in the breakdown
+    """
+    codes = list(breakdown) if cp_codes == ['ALL'] else cp_codes
+    missing = [code for code in codes if code not in breakdown]
+    if missing:
+        raise KeyError(f'CP codes not in breakdown: {missing}')
+    totals = {key: sum(breakdown[code][key] for code in codes) for key in ('edge', 'origin', 'midgress')}
+    return traffic_from_bytes(totals['edge'], totals['origin'], totals['midgress'], unit)
+
+
+# Traffic chart series names (lowercased) and the byte series they hold
+CHART_SERIES = {
+    'edge': 'edge',
+    'edge traffic': 'edge',
+    'edge bytes': 'edge',
+    'origin': 'origin',
+    'origin traffic': 'origin',
+    'origin bytes': 'origin',
+    'midgress': 'midgress',
+    'midgress traffic': 'midgress',
+    'midgress bytes': 'midgress',
+}
+
+
+def extract_chart_series() -> dict[str, list[list[float]]]:  # pragma: no cover
+    """Read the traffic chart's series from its in-page data model.
+
+    Uses the Highcharts chart registry (x = epoch ms); see chart_series_bytes
+    for how series names and y-axis units are interpreted.
+
+    Returns:
+        {"edge": [[1769270400000, 2.0e13], ...], "origin": [...]} in bytes; {} when no chart is rendered
     """
     js = """
     (() => {
-        const table = document.querySelector('table.cdk-table.akam-table');
-        if (!table) return {};
-        const data = {};
-        table.querySelectorAll('tbody tr').forEach(row => {
-            const cells = row.querySelectorAll('td');
-            if (cells.length >= 2) {
-                const country = cells[0]?.textContent?.trim();
-                const bytes_val = cells[1]?.textContent?.trim();
-                if (country && bytes_val) data[country] = bytes_val;
+        const charts = (window.Highcharts && window.Highcharts.charts || []).filter(Boolean);
+        const result = [];
+        for (const chart of charts) {
+            for (const s of chart.series || []) {
+                const xs = s.xData || (s.points || []).map(p => p.x);
+                const ys = s.yData || (s.points || []).map(p => p.y);
+                const axis = s.yAxis && s.yAxis.options && s.yAxis.options.title;
+                const unit = (axis && axis.text) || (s.tooltipOptions && s.tooltipOptions.valueSuffix) || '';
+                result.push({name: s.name || '', unit: String(unit), points: xs.map((x, i) => [x, ys[i]])});
             }
-        });
-        return data;
+        }
+        return result;
     })()
     """
-    raw = ab_eval(js)
-    data = json.loads(raw)
-    result = {}
-    for country in countries:
-        if country in data:
-            raw_bytes = int(data[country].replace(',', ''))
-            result[country] = bytes_to_tb(raw_bytes)
-    return result
+    return chart_series_bytes(json.loads(ab_eval(js)))
+
+
+def _chart_unit(label: str) -> str:
+    """Byte unit of a y-axis label such as "Traffic (TB)", "Terabytes" or "" (unlabelled: bytes)."""
+    match = re.search(r'\(([^)]*)\)', label)
+    unit = (match.group(1) if match else label).strip()
+    unit = UNIT_MAP.get(unit, unit)
+    return 'B' if unit.lower() in ('', 'bytes') else unit
+
+
+def chart_series_bytes(raw: list[dict]) -> dict[str, list[list[float]]]:
+    """Map raw chart series ({"name", "unit", "points"}) to edge/origin/midgress byte series.
+
+    Series names must be known (CHART_SERIES) and the y-axis unit a byte unit;
+    values are scaled to bytes. An unlabelled axis is assumed to be in bytes.
+    Other series (unknown names, rates such as bps, percentages) are dropped
+    with a warning, so they never reach the cube as new metrics.
+    """
+    series = {}
+    for entry in raw:
+        name = entry['name'].strip()
+        metric = CHART_SERIES.get(name.lower())
+        unit = _chart_unit(entry.get('unit', ''))
+        if metric is None or unit not in UNIT_BYTES:
+            print(f'[chart] Ignoring series {name!r} ({entry.get("unit") or "no unit"}): not a known byte series')
+            continue
+        scale = UNIT_BYTES[unit]
+        series[metric] = [[x, None if y is None else y * scale] for x, y in entry['points']]
+    return series
+
+
+def aggregate_series_daily(series: dict[str, list[list[float]]]) -> dict[str, dict[str, int]]:
+    """Sum chart points into UTC+8 days.
+
+    Returns:
+        {"2026-01-25": {"edge": 20000000000000, "origin": ...}, ...} sorted by day
+    """
+    daily: dict[str, dict[str, float]] = {}
+    for name, points in series.items():
+        for x, y in points:
+            if y is None:
+                continue
+            day = datetime.fromtimestamp(x / 1000, UTC).astimezone(UTC_PLUS_8).strftime('%Y-%m-%d')
+            bucket = daily.setdefault(day, {})
+            bucket[name] = bucket.get(name, 0) + y
+    return {day: {name: int(v) for name, v in values.items()} for day, values in sorted(daily.items())}
+
+
+def total_for_range(daily: dict[str, dict[str, int]], start_date: str, end_date: str) -> dict[str, int]:
+    """Sum a stored daily series over an inclusive YYYY-MM-DD sub-range."""
+    totals: dict[str, int] = {}
+    for day, values in daily.items():
+        if start_date <= day <= end_date:
+            for name, value in values.items():
+                totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def _collect_geography_rows(countries: list[str] | None) -> int:  # pragma: no cover
+    """Gather geography rows into an in-page buffer and return the row count.
+
+    Runs inside the page: reads the rendered rows, then walks a virtual-scroll
+    viewport and the paginator so rows beyond the first page are included.
+    With countries, only those rows are kept and the walk stops once all are found.
+    Afterwards the table is paged and scrolled back to where it started, so
+    screenshots and later extractions in a warm session see what the user would.
+    """
+    js = f"""
+    (async () => {{
+        const wanted = {json.dumps(countries)};
+        const table = () => document.querySelector('table.cdk-table.akam-table');
+        const body = () => table()?.querySelector('tbody')?.textContent || '';
+        const settle = () => new Promise(r => setTimeout(r, {GEO_SETTLE_MS}));
+        const rows = new Map();
+        const collect = () => {{
+            table()?.querySelectorAll('tbody tr').forEach(row => {{
+                const cells = row.querySelectorAll('td');
+                if (cells.length >= 2) {{
+                    const country = cells[0]?.textContent?.trim();
+                    const bytes_val = cells[1]?.textContent?.trim();
+                    if (country && bytes_val && (!wanted || wanted.includes(country))) rows.set(country, bytes_val);
+                }}
+            }});
+        }};
+        const done = () => wanted && wanted.every(c => rows.has(c));
+        const enabled = (el) => el && !el.disabled && el.getAttribute('aria-disabled') !== 'true';
+        const turn = async (selector) => {{
+            const button = document.querySelector(selector);
+            if (!enabled(button)) return false;
+            const before = body();
+            button.click();
+            for (let i = 0; i < 20 && body() === before; i++) await settle();
+            return true;
+        }};
+
+        collect();
+        const viewport = document.querySelector('cdk-virtual-scroll-viewport');
+        const top = viewport?.scrollTop;
+        if (viewport) {{
+            let last = -1;
+            while (!done() && viewport.scrollTop !== last) {{
+                last = viewport.scrollTop;
+                viewport.scrollTop += viewport.clientHeight;
+                await settle();
+                collect();
+            }}
+        }}
+        let turned = 0;
+        while (turned < {GEO_MAX_PAGES} - 1 && !done() && await turn("{GEO_NEXT_PAGE_SELECTOR}")) {{
+            turned++;
+            collect();
+        }}
+        while (turned > 0 && await turn("{GEO_PREV_PAGE_SELECTOR}")) turned--;
+        if (viewport) viewport.scrollTop = top;
+        window.__cdnGeoRows = Array.from(rows.entries());
+        return window.__cdnGeoRows.length;
+    }})()
+    """
+    return int(ab_eval(js))
+
+
+def iter_geography_rows(
+    countries: list[str] | None = None, batch_size: int = GEO_BATCH_SIZE
+) -> Iterator[tuple[str, int]]:
+    """Yield (country, raw_bytes) from the geography table in bounded batches.
+
+    Filtering and pagination happen inside the page; rows then come back at most
+    batch_size per ab_eval instead of as one large stdout payload.
+
+    Args:
+        countries: country codes to keep, or None for every country
+    """
+    remaining = _collect_geography_rows(countries)
+    while remaining > 0:
+        batch = json.loads(ab_eval(f'window.__cdnGeoRows.splice(0, {batch_size})'))
+        if not batch:
+            break
+        remaining -= len(batch)
+        for country, bytes_val in batch:
+            yield country, int(bytes_val.replace(',', ''))
+
+
+def select_geography(rows: dict[str, int], countries: list[str]) -> dict[str, float]:
+    """Convert raw geography bytes to TB for the configured countries.
+
+    Countries keep their configured order; [GEO_ALL] keeps every row in table order.
+    """
+    if countries == [GEO_ALL]:
+        return {country: bytes_to_tb(raw) for country, raw in rows.items()}
+    return {country: bytes_to_tb(rows[country]) for country in countries if country in rows}
+
+
+def extract_geography_table(countries: list[str]) -> dict[str, float]:  # pragma: no cover
+    """Extract geography data from Traffic by Geography report table.
+
+    The table uses class 'cdk-table akam-table' with columns:
+    Country/area | Bytes. Empty separator rows exist between data rows.
+    Pass [GEO_ALL] to walk every page and return the full per-country breakdown.
+    """
+    wanted = None if countries == [GEO_ALL] else countries
+    return select_geography(dict(iter_geography_rows(wanted)), countries)
+
+
+def export_table_csv(path: str | Path) -> Path:  # pragma: no cover
+    """Trigger the report widget's CSV export and save the download to path.
+
+    Uses agent-browser's download handling, so the full table is exported
+    regardless of how many rows the page has rendered.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ab_eval(f'document.querySelector("{EXPORT_MENU_SELECTOR}")?.click()')
+    run_ab('download', EXPORT_CSV_SELECTOR, str(path))
+    return path
+
+
+def parse_csv_table(lines: Iterable[str], key_column: str, value_column: str) -> Iterator[tuple[str, int]]:
+    """Stream (key, value) pairs from an exported report CSV.
+
+    Exports may start with preamble lines (report name, date range) before the
+    header row; everything up to the row naming both columns is skipped.
+    Column names match case-insensitively; rows with an empty key or a
+    placeholder value ('', '-', 'N/A') are skipped. Values are whole byte
+    counts, optionally comma-grouped, parsed as int so large counts stay exact.
+
+    Raises:
+        ValueError: if no header row contains both columns, or a value is not a byte count
+    """
+    key_col, value_col = key_column.lower(), value_column.lower()
+    key_idx = value_idx = None
+    for row in csv.reader(lines):
+        if key_idx is None:
+            names = [cell.strip().lower() for cell in row]
+            if key_col in names and value_col in names:
+                key_idx, value_idx = names.index(key_col), names.index(value_col)
+            continue
+        if len(row) <= max(key_idx, value_idx):
+            continue
+        key, value = row[key_idx].strip(), row[value_idx].strip().replace(',', '')
+        if not key or value.upper() in CSV_EMPTY_VALUES:
+            continue
+        if not (value.isascii() and value.isdigit()):
+            raise ValueError(f'Unexpected {value_column} value in CSV row {row!r}')
+        yield key, int(value)
+    if key_idx is None:
+        raise ValueError(f'CSV header with columns {key_column!r} and {value_column!r} not found')
+
+
+def read_geography_csv(path: str | Path, countries: list[str]) -> dict[str, float]:
+    """Read an exported geography CSV into {country: TB} for the configured countries.
+
+    Rows are streamed from disk; only wanted countries are kept unless countries is [GEO_ALL].
+    """
+    wanted = None if countries == [GEO_ALL] else set(countries)
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = {k: v for k, v in parse_csv_table(f, GEO_CSV_KEY, GEO_CSV_VALUE) if wanted is None or k in wanted}
+    return select_geography(rows, countries)
 
 
 def build_report_output(
@@ -125,8 +453,12 @@ def build_report_output(
     traffic: dict,
     unit: str,
     geography: dict | None = None,
+    daily: dict | None = None,
 ) -> dict:
-    """Build structured output dict for a report."""
+    """Build structured output dict for a report.
+
+    daily holds per-day bytes by series ({"YYYY-MM-DD": {"edge": ..., ...}}) when available.
+    """
     output = {
         'date_range': {'start': start_date, 'end': end_date},
         'type': report_type,
@@ -136,4 +468,6 @@ def build_report_output(
     }
     if geography:
         output['geography'] = geography
+    if daily:
+        output['daily'] = daily
     return output
@@ -0,0 +1,232 @@
+"""Akamai DataStream 2 log ingestion into the traffic cube, and reports built from it.
+
+DataStream 2 delivers JSON-lines records (one request per line) with the CP
+code, hostname, country, bytes served and cache status. Files are parsed one
+per worker process. Plain files are read from a saved byte offset and only
+complete lines are consumed, so files still being written are picked up where
+the last run stopped; a file that shrinks below its offset (truncated or
+rotated) is read again from the start. Gzipped files cannot be resumed by
+offset, so they are read whole, and one that is still being written is skipped
+until a later run finds it complete. Per-group totals and the new offsets are
+committed in one transaction.
+
+Edge bytes are totalBytes; origin bytes are estimated as the bytes of cache
+misses (cacheStatus 0). The logs carry no midgress figure, so it is 0.
+
+Usage:
+    uv run python -m scripts.datastream --start 2026-01-25 --end 2026-01-31
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+
+from scripts.config import DATASTREAM_CONFIG, REPORT_TYPES
+from scripts.cube import CUBE_PATH, Fact, add_facts, connect, days_between, select_facts
+from scripts.data_extract import GEO_ALL, build_report_output, select_geography, traffic_from_bytes
+
+# Cube source name for DataStream facts
+DS_SOURCE = 'datastream'
+
+OFFSETS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    position INTEGER NOT NULL
+);
+"""
+
+# Seconds added to epoch times to land on UTC+8 days
+UTC8_SECONDS = 8 * 3600
+
+# {(day, cp_code, hostname, country): [edge bytes, cache-miss bytes]}
+Groups = dict[tuple[str, str, str, str], list[int]]
+
+
+def parse_records(lines, groups: Groups | None = None) -> tuple[Groups, int]:
+    """Aggregate complete JSON lines (bytes) into groups; returns (groups, bytes consumed).
+
+    A trailing line without a newline is left unconsumed; malformed records are skipped.
+    """
+    groups = {} if groups is None else groups
+    days: dict[int, str] = {}
+    consumed = 0
+    for raw in lines:
+        if not raw.endswith(b'\n'):
+            break
+        consumed += len(raw)
+        try:
+            rec = json.loads(raw)
+            day_index = (int(float(rec['reqTimeSec'])) + UTC8_SECONDS) // 86400
+            size = int(rec['totalBytes'])
+        except (ValueError, KeyError, TypeError):
+            continue
+        if day_index not in days:
+            days[day_index] = datetime.fromtimestamp(day_index * 86400, UTC).strftime('%Y-%m-%d')
+        country = rec.get('country') or ''
+        key = (days[day_index], str(rec.get('cp', '')), rec.get('reqHost') or '', '' if country == '-' else country)
+        totals = groups.setdefault(key, [0, 0])
+        totals[0] += size
+        if str(rec.get('cacheStatus')) == '0':
+            totals[1] += size
+    return groups, consumed
+
+
+def parse_file(path: str, offset: int = 0) -> tuple[str, Groups, int | None]:
+    """Parse a log file from offset; returns (path, groups, new offset).
+
+    Gzipped files are always read whole (offset is ignored); one that ends
+    early because it is still being written gives no groups and offset None.
+    """
+    if path.endswith('.gz'):
+        try:
+            with gzip.open(path, 'rb') as f:
+                groups, _ = parse_records(f)
+        except EOFError:
+            return path, {}, None
+        return path, groups, 0
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        groups, consumed = parse_records(f)
+    return path, groups, offset + consumed
+
+
+def pending_files(conn: sqlite3.Connection, directory: str | Path) -> list[tuple[str, int, int]]:
+    """Log files whose size changed since their last ingest: (path, size, offset to resume from).
+
+    Gzipped files and plain files now shorter than their offset start from 0.
+    """
+    conn.executescript(OFFSETS_SCHEMA)
+    known = {path: (size, offset) for path, size, offset in conn.execute('SELECT * FROM ingest_offsets')}
+    pending = []
+    for file in sorted(Path(directory).rglob('*')):
+        if not file.is_file() or file.name.startswith('.'):
+            continue
+        path, size = str(file), file.stat().st_size
+        last_size, offset = known.get(path, (None, 0))
+        if size != last_size:
+            pending.append((path, size, 0 if path.endswith('.gz') or size < offset else offset))
+    return pending
+
+
+def facts_from_groups(groups: Groups) -> list[Fact]:
+    """One-day edge and origin facts per (day, CP code, hostname, country)."""
+    facts = []
+    for (day, cp_code, hostname, country), (edge, origin) in sorted(groups.items()):
+        facts.append(Fact(DS_SOURCE, cp_code, hostname, country, '', 'edge', day, day, edge))
+        facts.append(Fact(DS_SOURCE, cp_code, hostname, country, '', 'origin', day, day, origin))
+    return facts
+
+
+def ingest(conn: sqlite3.Connection, directory: str | Path, workers: int | None = None) -> int:
+    """Ingest new log data under directory into the cube; returns the number of files read."""
+    pending = pending_files(conn, directory)
+    if not pending:
+        return 0
+    groups: Groups = {}
+    offsets = []
+    workers = workers or min(len(pending), os.cpu_count() or 1)
+    sizes = {path: size for path, size, _ in pending}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, part, offset in pool.map(parse_file, [p for p, _, _ in pending], [o for _, _, o in pending]):
+            if offset is None:
+                print(f'[datastream] {path}: incomplete gzip file, skipped until it is complete')
+                continue
+            for key, (edge, origin) in part.items():
+                totals = groups.setdefault(key, [0, 0])
+                totals[0] += edge
+                totals[1] += origin
+            offsets.append((path, sizes[path], offset))
+    conn.executemany('INSERT OR REPLACE INTO ingest_offsets VALUES (?, ?, ?)', offsets)
+    add_facts(conn, facts_from_groups(groups), accumulate=True)
+    return len(pending)
+
+
+def _selected_facts(conn: sqlite3.Connection, cp_codes: list[str], start_date: str, end_date: str) -> list[Fact]:
+    """DataStream facts for the CP codes; raises LookupError unless every day has data."""
+    facts = [
+        fact
+        for fact in select_facts(conn, start_date, end_date, source=DS_SOURCE)
+        if cp_codes == ['ALL'] or fact.cp_code in cp_codes
+    ]
+    missing = set(days_between(start_date, end_date)) - {fact.day_start for fact in facts}
+    if missing:
+        raise LookupError(f'no DataStream records for {len(missing)} day(s) from {min(missing)}')
+    return facts
+
+
+def hostname_report(conn: sqlite3.Connection, report_type: str, start_date: str, end_date: str) -> dict:
+    """Hostname report output (with daily bytes) from DataStream facts."""
+    config = REPORT_TYPES[report_type]
+    daily: dict[str, dict[str, int]] = {}
+    for fact in _selected_facts(conn, config.cp_codes, start_date, end_date):
+        values = daily.setdefault(fact.day_start, {})
+        values[fact.metric] = values.get(fact.metric, 0) + fact.bytes
+    edge = sum(v.get('edge', 0) for v in daily.values())
+    origin = sum(v.get('origin', 0) for v in daily.values())
+    return build_report_output(
+        report_type=report_type,
+        label=config.label,
+        start_date=start_date,
+        end_date=end_date,
+        traffic=traffic_from_bytes(edge, origin, 0, config.unit),
+        unit=config.unit,
+        daily=dict(sorted(daily.items())),
+    )
+
+
+def geography_report(conn: sqlite3.Connection, start_date: str, end_date: str) -> dict:
+    """Geography report output from DataStream facts."""
+    config = REPORT_TYPES['geography']
+    rows: dict[str, int] = {}
+    for fact in _selected_facts(conn, config.cp_codes, start_date, end_date):
+        if fact.metric == 'edge' and fact.country:
+            rows[fact.country] = rows.get(fact.country, 0) + fact.bytes
+    if config.geo_countries == [GEO_ALL]:
+        rows = dict(sorted(rows.items(), key=lambda item: item[1], reverse=True))
+    return build_report_output(
+        report_type='geography',
+        label=config.label,
+        start_date=start_date,
+        end_date=end_date,
+        traffic={},
+        unit=config.unit,
+        geography=select_geography(rows, config.geo_countries),
+    )
+
+
+def offload_by_cp_code(conn: sqlite3.Connection, start_date: str, end_date: str) -> dict[str, float]:
+    """Estimated offload % per CP code over a date range."""
+    totals: dict[str, list[int]] = {}
+    for fact in select_facts(conn, start_date, end_date, source=DS_SOURCE):
+        edge_origin = totals.setdefault(fact.cp_code, [0, 0])
+        edge_origin[fact.metric == 'origin'] += fact.bytes
+    return {cp: traffic_from_bytes(edge, origin, 0, 'B')['offload'] for cp, (edge, origin) in sorted(totals.items())}
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Ingest Akamai DataStream 2 logs')
+    parser.add_argument('--dir', default=DATASTREAM_CONFIG.log_dir, help='Log directory (searched recursively)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--start', help='Print offload per CP code from this date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='... to this date')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        print(f'Ingested {ingest(conn, args.dir, args.workers)} new or grown file(s) from {args.dir}')
+        if args.start and args.end:
+            for cp_code, offload in offload_by_cp_code(conn, args.start, args.end).items():
+                print(f'  {cp_code:<10} offload {offload:6.2f}%')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
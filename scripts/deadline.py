@@ -0,0 +1,78 @@
+"""Time budgets for report runs, carried in a context variable.
+
+A run or a single report sets a budget with deadline(); nested budgets keep the
+earlier end. Subprocess timeouts, polls and fixed waits ask remaining() or
+pause() instead of using their full length, and raise DeadlineExceeded once
+the budget is spent, so one slow report cannot stall the whole run.
+"""
+
+import contextlib
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+
+# Monotonic time at which the current budget runs out (None = unlimited)
+_deadline: ContextVar[float | None] = ContextVar('deadline', default=None)
+
+# Set while a cassette replays browser commands offline (see browser_helpers.start_replay)
+_skip_waits = False
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run or report used up its time budget."""
+
+
+@contextlib.contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """Limit work in this context to seconds from now (None leaves the current budget)."""
+    if seconds is None:
+        yield
+        return
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def no_deadline() -> Iterator[None]:
+    """Lift the budget for cleanup that must run even after it is spent."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(limit: float) -> float:
+    """limit, trimmed to the time left in the budget.
+
+    Raises:
+        DeadlineExceeded: when the budget is already spent
+    """
+    end = _deadline.get()
+    if end is None:
+        return limit
+    left = end - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded('time budget exhausted')
+    return min(limit, left)
+
+
+def skip_waits(enabled: bool) -> None:
+    """Make pause() return at once (offline replay, nothing to wait for), or restore it."""
+    global _skip_waits
+    _skip_waits = enabled
+
+
+def pause(seconds: float) -> None:
+    """Sleep for seconds, or until the budget runs out (then raise DeadlineExceeded)."""
+    wait = remaining(seconds)
+    if _skip_waits:
+        return
+    time.sleep(wait)
+    if wait < seconds:
+        raise DeadlineExceeded('time budget exhausted')
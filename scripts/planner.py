@@ -0,0 +1,136 @@
+"""Order browser report work to minimise page transitions and filter changes.
+
+Each browser report needs the right page, date range and CP code set applied
+before extraction. The filter state left by the previous report decides which
+of those steps can be skipped, so the run order changes the total browser time.
+The cost model estimates seconds per step; plan_reports picks the order with
+the lowest modelled cost.
+"""
+
+import itertools
+from dataclasses import dataclass
+
+# Estimated seconds per browser step
+STEP_COSTS = {
+    'navigate': 4.0,
+    'open_filters': 1.0,
+    'date_range': 5.0,
+    'cp_codes': 3.0,
+    'apply': 10.0,
+    'extract': 1.0,
+    'screenshot': 1.0,
+}
+
+# Extra seconds per CP code searched and selected
+CP_CODE_COST = 1.5
+
+# Up to this many reports every order is evaluated; beyond it a greedy order is used
+EXHAUSTIVE_LIMIT = 7
+
+
+@dataclass(frozen=True)
+class FilterState:
+    """Report page and filters applied in the browser (None = unknown)."""
+
+    page: str | None = None
+    dates: tuple[str, str] | None = None
+    cp_codes: frozenset[str] | None = None
+
+
+@dataclass(frozen=True)
+class PendingReport:
+    report_type: str
+    page: str
+    cp_codes: tuple[str, ...]
+    screenshot: bool = True
+
+
+@dataclass
+class PlannedReport:
+    report: PendingReport
+    steps: list[str]
+    cost: float
+
+
+def report_steps(state: FilterState, report: PendingReport, dates: tuple[str, str]) -> list[str]:
+    """Browser steps needed to run report from state.
+
+    Filters are assumed to reset on a page change. When page, dates and CP codes
+    already match, the filter panel is not opened and Apply is skipped.
+    """
+    same_page = state.page == report.page
+    steps = [] if same_page else ['navigate']
+    filters = []
+    if not same_page or state.dates != dates:
+        filters.append('date_range')
+    if not same_page or state.cp_codes != frozenset(report.cp_codes):
+        filters.append('cp_codes')
+    if filters:
+        steps += ['open_filters', *filters, 'apply']
+    steps.append('extract')
+    if report.screenshot:
+        steps.append('screenshot')
+    return steps
+
+
+def steps_cost(steps: list[str], report: PendingReport) -> float:
+    cost = sum(STEP_COSTS[step] for step in steps)
+    if 'cp_codes' in steps:
+        cost += CP_CODE_COST * len(report.cp_codes)
+    return cost
+
+
+def apply_report(state: FilterState, report: PendingReport, dates: tuple[str, str]) -> FilterState:
+    """Filter state after running report."""
+    return FilterState(page=report.page, dates=dates, cp_codes=frozenset(report.cp_codes))
+
+
+def plan_in_order(
+    order: list[PendingReport], dates: tuple[str, str], state: FilterState | None = None
+) -> list[PlannedReport]:
+    """Plan reports in the given order."""
+    state = state or FilterState()
+    plan = []
+    for report in order:
+        steps = report_steps(state, report, dates)
+        plan.append(PlannedReport(report, steps, steps_cost(steps, report)))
+        state = apply_report(state, report, dates)
+    return plan
+
+
+def plan_cost(plan: list[PlannedReport]) -> float:
+    return sum(item.cost for item in plan)
+
+
+def plan_reports(
+    reports: list[PendingReport], dates: tuple[str, str], state: FilterState | None = None
+) -> list[PlannedReport]:
+    """Choose the report order with the lowest modelled browser time.
+
+    Small runs try every order (ties keep the given order); larger runs pick the
+    cheapest next report greedily.
+    """
+    state = state or FilterState()
+    if len(reports) <= EXHAUSTIVE_LIMIT:
+        plans = (plan_in_order(order, dates, state) for order in itertools.permutations(reports))
+        return min(plans, key=plan_cost, default=[])
+
+    remaining, order, current = list(reports), [], state
+    while remaining:
+        best = min(remaining, key=lambda r: steps_cost(report_steps(current, r, dates), r))
+        remaining.remove(best)
+        order.append(best)
+        current = apply_report(current, best, dates)
+    return plan_in_order(order, dates, state)
+
+
+def format_plan(plan: list[PlannedReport], baseline: list[PlannedReport] | None = None) -> str:
+    """Render the plan with per-report steps and estimated seconds."""
+    lines = ['Run plan (estimated browser time):']
+    for i, item in enumerate(plan, 1):
+        lines.append(f'  {i}. {item.report.report_type:<16} {item.cost:6.1f}s  {" → ".join(item.steps)}')
+    total = plan_cost(plan)
+    lines.append(f'  Total: {total:.1f}s')
+    if baseline is not None:
+        lines.append(f'  Configured order: {plan_cost(baseline):.1f}s')
+    return '\n'.join(lines)
@@ -0,0 +1,250 @@
+"""Answer report requests from the local traffic cube, fetching only what is missing.
+
+Outputs use the same JSON format as akamai_report. Report types whose range is
+not fully covered by stored facts are listed with their missing days; with
+--fill those days are fetched through the normal report runners, stored, and
+the query is answered again.
+
+Reports come from the Akamai UI/API and CloudWatch facts. When those leave
+days uncovered, ingested logs answer instead if they cover the whole range:
+DataStream facts for Akamai report types (origin bytes estimated, no
+midgress; see datastream) and access-log facts for CloudFront. One report is
+never stitched together from both kinds of facts.
+
+Usage:
+    uv run python -m scripts.query --start 2026-01-01 --end 2026-01-31
+    uv run python -m scripts.query --start 2026-01-01 --end 2026-01-31 --type geography --fill
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+
+from scripts.akamai_report import run_reports, write_json_atomic
+from scripts.browser_helpers import stop_cassette
+from scripts.cloudfront_logs import LOG_SOURCE
+from scripts.config import CLOUDFRONT_CONFIG, REPORT_TYPES
+from scripts.cube import CUBE_PATH, connect, cp_code_key, day_ranges, days_between, query, select_facts, store_results
+from scripts.data_extract import GEO_ALL, build_report_output, select_geography, traffic_from_bytes
+from scripts.datastream import geography_report as datastream_geography
+from scripts.datastream import hostname_report as datastream_hostname
+
+# Byte series a hostname report needs
+HOSTNAME_METRICS = ('edge', 'origin', 'midgress')
+
+
+def _uncovered(result: dict, start_date: str, end_date: str, present: set[str], wanted: list[str], dim: str) -> set:
+    """Days missing from a query result: gaps in stored series plus the whole range for absent ones."""
+    days = {
+        day
+        for item in result['missing']
+        if item[dim] in wanted
+        for a, b in item['ranges']
+        for day in days_between(a, b)
+    }
+    if any(key not in present for key in wanted):
+        days.update(days_between(start_date, end_date))
+    return days
+
+
+def hostname_from_cube(conn: sqlite3.Connection, report_type: str, start_date: str, end_date: str) -> tuple[dict, set]:
+    """Build a hostname report output from the cube; returns (output, missing days)."""
+    config = REPORT_TYPES[report_type]
+    filters = {'source': 'akamai', 'cp_code': cp_code_key(config.cp_codes), 'hostname': '', 'country': '', 'path': ''}
+    result = query(conn, start_date, end_date, group_by=['metric'], **filters)
+    totals = {row['metric']: row['value'] for row in result['rows']}
+    missing = _uncovered(result, start_date, end_date, set(totals), list(HOSTNAME_METRICS), 'metric')
+    if missing:
+        return {}, missing
+
+    daily: dict[str, dict[str, int]] = {}
+    for fact in select_facts(conn, start_date, end_date, **filters):
+        if fact.day_start == fact.day_end:
+            daily.setdefault(fact.day_start, {})[fact.metric] = fact.bytes
+    if len(daily) < len(days_between(start_date, end_date)):
+        daily = {}
+    output = build_report_output(
+        report_type=report_type,
+        label=config.label,
+        start_date=start_date,
+        end_date=end_date,
+        traffic=traffic_from_bytes(*(totals[m] for m in HOSTNAME_METRICS), config.unit),
+        unit=config.unit,
+        daily=dict(sorted(daily.items())),
+    )
+    return output, set()
+
+
+def geography_from_cube(conn: sqlite3.Connection, start_date: str, end_date: str) -> tuple[dict, set]:
+    """Build the geography report output from the cube; returns (output, missing days)."""
+    config = REPORT_TYPES['geography']
+    filters = {
+        'source': 'akamai',
+        'cp_code': cp_code_key(config.cp_codes),
+        'hostname': '',
+        'path': '',
+        'metric': 'edge',
+    }
+    result = query(conn, start_date, end_date, group_by=['country'], **filters)
+    rows = {row['country']: row['value'] for row in result['rows'] if row['country']}
+    wanted = list(rows) if config.geo_countries == [GEO_ALL] else config.geo_countries
+    missing = _uncovered(result, start_date, end_date, set(rows), wanted, 'country')
+    if not rows:
+        missing.update(days_between(start_date, end_date))
+    if missing:
+        return {}, missing
+    output = build_report_output(
+        report_type='geography',
+        label=config.label,
+        start_date=start_date,
+        end_date=end_date,
+        traffic={},
+        unit=config.unit,
+        geography=select_geography(rows, config.geo_countries),
+    )
+    return output, set()
+
+
+def _cloudfront_output(dist: str, start_date: str, end_date: str, daily: dict[str, int]) -> dict:
+    return {
+        'date_range': {'start': start_date, 'end': end_date},
+        'type': 'cloudfront',
+        'label': 'CloudFront',
+        'distribution_id': dist,
+        'daily_bytes': {f'{day[5:7]}/{day[8:10]}': value for day, value in sorted(daily.items())},
+    }
+
+
+def cloudfront_from_cube(conn: sqlite3.Connection, start_date: str, end_date: str) -> tuple[dict, set]:
+    """Build the CloudFront output from the cube; returns (output, missing days)."""
+    dist = CLOUDFRONT_CONFIG.distribution_id
+    facts = select_facts(conn, start_date, end_date, source='cloudfront', cp_code=dist, metric='edge')
+    daily = {fact.day_start: fact.bytes for fact in facts if fact.day_start == fact.day_end}
+    missing = set(days_between(start_date, end_date)) - set(daily)
+    if missing:
+        return {}, missing
+    return _cloudfront_output(dist, start_date, end_date, daily), set()
+
+
+def cloudfront_logs_from_cube(conn: sqlite3.Connection, start_date: str, end_date: str) -> dict:
+    """Build the CloudFront output from ingested access-log facts (summed over countries and prefixes).
+
+    Raises:
+        LookupError: unless every day has log data
+    """
+    dist = CLOUDFRONT_CONFIG.distribution_id
+    daily: dict[str, int] = {}
+    for fact in select_facts(conn, start_date, end_date, source=LOG_SOURCE, cp_code=dist, metric='edge'):
+        daily[fact.day_start] = daily.get(fact.day_start, 0) + fact.bytes
+    if missing := set(days_between(start_date, end_date)) - set(daily):
+        raise LookupError(f'no CloudFront log records for {len(missing)} day(s) from {min(missing)}')
+    return _cloudfront_output(dist, start_date, end_date, daily)
+
+
+def logs_from_cube(conn: sqlite3.Connection, report_type: str, start_date: str, end_date: str) -> dict | None:
+    """Build one report type's output from ingested logs; None unless they cover every day."""
+    try:
+        if report_type == 'cloudfront':
+            return cloudfront_logs_from_cube(conn, start_date, end_date)
+        if report_type == 'geography':
+            return datastream_geography(conn, start_date, end_date)
+        return datastream_hostname(conn, report_type, start_date, end_date)
+    except LookupError:
+        return None
+
+
+def report_from_cube(conn: sqlite3.Connection, report_type: str, start_date: str, end_date: str) -> tuple[dict, set]:
+    """Build one report type's output from the cube; returns (output or {}, missing days).
+
+    Days the report facts miss are answered from ingested logs when the logs
+    cover the whole range (see logs_from_cube).
+    """
+    if report_type == 'cloudfront':
+        output, missing = cloudfront_from_cube(conn, start_date, end_date)
+    elif report_type == 'geography':
+        output, missing = geography_from_cube(conn, start_date, end_date)
+    else:
+        output, missing = hostname_from_cube(conn, report_type, start_date, end_date)
+    if missing and (logs := logs_from_cube(conn, report_type, start_date, end_date)):
+        return logs, set()
+    return output, missing
+
+
+def answer(
+    conn: sqlite3.Connection, report_types: list[str], start_date: str, end_date: str
+) -> tuple[list[dict], dict[str, list[tuple[str, str]]]]:
+    """Answer report types from the cube; returns (outputs, {type: missing day ranges})."""
+    results, missing = [], {}
+    for report_type in report_types:
+        output, days = report_from_cube(conn, report_type, start_date, end_date)
+        if days:
+            missing[report_type] = day_ranges(days)
+        else:
+            results.append(output)
+    return results, missing
+
+
+def fill_plan(missing: dict[str, list[tuple[str, str]]]) -> dict[tuple[str, str], list[str]]:
+    """Group missing ranges into runs: {(start, end): [report types]}."""
+    runs: dict[tuple[str, str], list[str]] = {}
+    for report_type, ranges in missing.items():
+        for day_range in ranges:
+            runs.setdefault(day_range, []).append(report_type)
+    return dict(sorted(runs.items()))
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Answer Akamai + CloudFront reports from local data')
+    parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument(
+        '--type',
+        choices=list(REPORT_TYPES.keys()) + ['cloudfront'],
+        help='Report type (omit for all)',
+    )
+    parser.add_argument(
+        '--fill',
+        action='store_true',
+        help='Fetch days neither reports nor ingested logs cover through the report runners',
+    )
+    parser.add_argument('--headed', action='store_true', help='Run browser in headed mode (with --fill)')
+    parser.add_argument('--edgegrid', action='store_true', help='Try the EdgeGrid Reporting API first (with --fill)')
+    parser.add_argument('--api', action='store_true', help="Try the reports app's JSON endpoints first (with --fill)")
+    parser.add_argument('--output', help='Output JSON file path')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    args = parser.parse_args()
+
+    report_types = [args.type] if args.type else list(REPORT_TYPES.keys()) + ['cloudfront']
+    conn = connect(args.db)
+    try:
+        results, missing = answer(conn, report_types, args.start, args.end)
+        if missing and args.fill:
+            try:
+                for (start, end), types in fill_plan(missing).items():
+                    print(f'Filling {start} → {end}: {", ".join(types)}')
+                    fetched = run_reports(types, start, end, api=args.api, edgegrid=args.edgegrid, headed=args.headed)
+                    store_results(fetched, args.db)
+            finally:
+                stop_cassette()
+            results, missing = answer(conn, report_types, args.start, args.end)
+    finally:
+        conn.close()
+
+    for report_type, ranges in missing.items():
+        print(f'[{report_type}] missing: {", ".join(a if a == b else f"{a} → {b}" for a, b in ranges)}')
+    if results:
+        data = results if len(results) > 1 else results[0]
+        if args.output:
+            write_json_atomic(args.output, data)
+            print(f'Output saved: {args.output}')
+        else:
+            print(json.dumps(data, ensure_ascii=False, indent=2))
+    if missing:
+        print(f'{len(missing)} report type(s) incomplete; rerun with --fill to fetch the missing days')
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
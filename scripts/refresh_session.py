@@ -11,6 +11,7 @@ import json
 import os
 import subprocess
 import sys
+import tempfile
 import time
 
 from scripts.browser_helpers import exec_ab
@@ -45,9 +46,15 @@ def _save_state() -> None:
         ],
     }
 
-    with open(STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
-    os.chmod(STATE_FILE, 0o600)
+    # Written aside and renamed into place: other sessions may be loading the file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(STATE_FILE)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, STATE_FILE)
+    except BaseException:
+        os.unlink(tmp)
+        raise
     print(f'[session] State saved to {STATE_FILE} ({len(cookies)} cookies)')
 
 
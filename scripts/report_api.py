@@ -0,0 +1,96 @@
+"""Fetch report data from the reports app's JSON endpoints inside the logged-in page.
+
+The Akamai reports SPA loads its widgets from Reporting API style endpoints on
+the same origin. Calling them with fetch() from the authenticated page reuses
+the session cookies and skips the filter UI (calendar, CP code search, Apply);
+all report types of a run are fetched with one Promise.all in a single eval.
+"""
+
+import json
+from urllib.parse import urlencode
+
+from scripts.browser_helpers import ab_eval
+from scripts.cloudfront import convert_dates_to_utc
+from scripts.config import ReportConfig
+from scripts.data_extract import GEO_ALL, select_geography, traffic_from_bytes
+
+# Same-origin endpoint the reports app calls for widget data
+REPORT_ENDPOINT = '/reporting-api/v1/reports/{report}/versions/1/report-data'
+
+# Report name, metrics and row dimension requested for each report page
+REPORT_QUERIES = {
+    'hostname': ('hostname-traffic', ['edgeBytesSum', 'originBytesSum', 'midgressBytesSum'], 'hostname'),
+    'geography': ('geography-traffic', ['edgeBytesSum'], 'country'),
+}
+
+# Traffic card key for each hostname metric
+TRAFFIC_METRICS = {'edge': 'edgeBytesSum', 'origin': 'originBytesSum', 'midgress': 'midgressBytesSum'}
+
+
+def build_report_url(page: str, config: ReportConfig, start_date: str, end_date: str) -> str:
+    """Build the report-data URL for a report page, date range and CP codes.
+
+    Dates are UTC+8 days like the UI date picker; the end date is inclusive.
+    """
+    report, metrics, _ = REPORT_QUERIES[page]
+    start, end = convert_dates_to_utc(start_date, end_date)
+    params = {'start': start, 'end': end, 'metrics': ','.join(metrics)}
+    if config.cp_codes == ['ALL']:
+        params['allObjectIds'] = 'true'
+    else:
+        params['objectIds'] = ','.join(config.cp_codes)
+    return f'{REPORT_ENDPOINT.format(report=report)}?{urlencode(params, safe=",:")}'
+
+
+def fetch_reports(urls: dict[str, str]) -> dict[str, dict | None]:
+    """Fetch all URLs concurrently from the page and return {key: JSON body}.
+
+    A key maps to None when its request failed (network error or non-2xx status),
+    so callers can fall back to the UI flow for just that report.
+    """
+    js = f"""
+    (async () => {{
+        const urls = {json.dumps(urls)};
+        const entries = await Promise.all(Object.entries(urls).map(async ([key, url]) => {{
+            try {{
+                const resp = await fetch(url, {{credentials: 'include', headers: {{Accept: 'application/json'}}}});
+                if (!resp.ok) return [key, {{status: resp.status}}];
+                return [key, {{status: resp.status, body: await resp.json()}}];
+            }} catch (e) {{
+                return [key, {{status: 0, error: String(e)}}];
+            }}
+        }}));
+        return Object.fromEntries(entries);
+    }})()
+    """
+    results = json.loads(ab_eval(js))
+    docs = {}
+    for key in urls:
+        entry = results.get(key) or {}
+        if 'body' not in entry:
+            print(f'[api] {key}: request failed (status {entry.get("status")}) {entry.get("error", "")}'.rstrip())
+        docs[key] = entry.get('body')
+    return docs
+
+
+def sum_metrics(rows: list[dict], metrics: list[str]) -> dict[str, float]:
+    """Sum metric columns over report rows; missing or empty values count as 0."""
+    return {m: sum(float(row.get(m) or 0) for row in rows) for m in metrics}
+
+
+def traffic_from_response(doc: dict, unit: str) -> dict:
+    """Convert a hostname report-data response into the report's traffic dict."""
+    totals = sum_metrics(doc['data'], list(TRAFFIC_METRICS.values()))
+    return traffic_from_bytes(totals['edgeBytesSum'], totals['originBytesSum'], totals['midgressBytesSum'], unit)
+
+
+def geography_from_response(doc: dict, countries: list[str]) -> dict[str, float]:
+    """Convert a geography report-data response into {country: TB} for the configured countries."""
+    _, metrics, dimension = REPORT_QUERIES['geography']
+    wanted = None if countries == [GEO_ALL] else set(countries)
+    rows = {}
+    for row in doc['data']:
+        country = row.get(dimension)
+        if country and (wanted is None or country in wanted):
+            rows[country] = rows.get(country, 0) + float(row.get(metrics[0]) or 0)
+    return select_geography(rows, countries)
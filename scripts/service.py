@@ -0,0 +1,277 @@
+"""Local HTTP report service in front of the report runners.
+
+Requests are answered from the traffic cube when it covers them, without
+touching a browser. Otherwise the missing days are fetched on a pool of warm
+browser sessions (daemon.SessionWorker) and the request is answered again from
+the cube. Identical requests that arrive while one is being fetched wait for
+that fetch instead of starting their own; distinct requests queue for the next
+free session, so concurrent callers no longer collide on one agent-browser
+session.
+
+Endpoints:
+    GET /report?start=YYYY-MM-DD&end=YYYY-MM-DD[&type=a,b][&timeout=SECONDS]
+        {"results": [...], "missing": {type: [[start, end], ...]}, "cached": bool}
+        504 when the fetch does not finish within the timeout
+    GET /stats
+        queue depth, in-flight fetches, cache hits, coalesced requests and latency
+
+Usage:
+    uv run python -m scripts.service --port 8765 --sessions 2 --timeout 900
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from scripts.akamai_report import run_reports
+from scripts.config import DAEMON_CONFIG, REPORT_TYPES, SESSION
+from scripts.cube import CUBE_PATH, connect, store_results
+from scripts.daemon import SessionWorker
+from scripts.deadline import deadline
+from scripts.query import answer, fill_plan
+from scripts.sources import Resource
+
+# Latency samples kept for the stats percentiles
+LATENCY_SAMPLES = 1000
+
+# Seconds a request waits for its fetch unless it asks for less or more
+DEFAULT_TIMEOUT = 900
+
+# (report types, start, end, browser) -> outputs
+Fetch = Callable[[list[str], str, str, Resource], list[dict]]
+
+
+def _run_reports(types: list[str], start_date: str, end_date: str, browser: Resource) -> list[dict]:  # pragma: no cover
+    return run_reports(types, start_date, end_date, browser=browser, on_result=lambda result: None)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of samples (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def check_request(types: list[str], start_date: str, end_date: str) -> list[str]:
+    """Validate a report request; returns its report types (every type when empty).
+
+    Raises:
+        ValueError: for missing or malformed dates and unknown report types
+    """
+    try:
+        if date.fromisoformat(start_date) > date.fromisoformat(end_date):
+            raise ValueError(f'start {start_date} is after end {end_date}')
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'start and end must be YYYY-MM-DD dates: {e}') from e
+    known = list(REPORT_TYPES) + ['cloudfront']
+    types = types or known
+    if unknown := [t for t in types if t not in known]:
+        raise ValueError(f'Unknown report types: {", ".join(map(str, unknown))}')
+    return types
+
+
+def parse_request(query: str) -> tuple[list[str], str, str]:
+    """Report types, start and end from a /report query string (see check_request)."""
+    params = parse_qs(query)
+    start_date, end_date = params.get('start', [''])[0], params.get('end', [''])[0]
+    types = [t for value in params.get('type', []) for t in value.split(',') if t]
+    return check_request(types, start_date, end_date), start_date, end_date
+
+
+class ReportService:
+    """Answers report requests from the cube, coalescing and queueing the fetches of missing days.
+
+    submit hands a task (a callable taking a browser Resource) to the session
+    pool; fetch runs report types for one range on that browser. A request
+    waits at most timeout seconds for its fetch, which runs under the same
+    deadline counted from when it was queued.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Callable[[Resource], None]], None],
+        db: str = str(CUBE_PATH),
+        fetch: Fetch = _run_reports,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.submit = submit
+        self.timeout = timeout
+        self.db = db
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple, Future] = {}
+        self._latency: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._counts = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'fetches': 0, 'errors': 0}
+        self._queued = 0
+
+    def _answer(self, types: list[str], start_date: str, end_date: str) -> tuple[list[dict], dict]:
+        conn = connect(self.db)
+        try:
+            return answer(conn, types, start_date, end_date)
+        finally:
+            conn.close()
+
+    def _fill(self, missing: dict, done: Future, expires: float, browser: Resource) -> None:
+        with self._lock:
+            self._queued -= 1
+        try:
+            with deadline(expires - time.monotonic()):
+                for (start_date, end_date), types in fill_plan(missing).items():
+                    store_results(self.fetch(types, start_date, end_date, browser), self.db)
+        except Exception as e:
+            done.set_exception(e)
+        else:
+            done.set_result(None)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def request(self, types: list[str], start_date: str, end_date: str, timeout: float | None = None) -> dict:
+        """Outputs for the report types, fetching missing days first.
+
+        Raises:
+            TimeoutError: when the fetch does not finish within timeout (default: the service's)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        self._count('requests')
+        try:
+            results, missing = self._answer(types, start_date, end_date)
+            cached = not missing
+            if missing:
+                key = (tuple(sorted(set(types))), start_date, end_date)
+                with self._lock:
+                    done = self._inflight.get(key)
+                    owner = done is None
+                    if owner:
+                        done = self._inflight[key] = Future()
+                        self._counts['fetches'] += 1
+                        self._queued += 1
+                    else:
+                        self._counts['coalesced'] += 1
+                if owner:
+                    done.add_done_callback(lambda _: self._release(key))
+                    expires = started + timeout
+                    self.submit(lambda browser: self._fill(missing, done, expires, browser))
+                try:
+                    done.result(timeout=max(0.0, timeout - (time.monotonic() - started)))
+                except FutureTimeoutError as e:
+                    raise TimeoutError(f'fetch did not finish within {timeout:g}s') from e
+                results, missing = self._answer(types, start_date, end_date)
+            else:
+                self._count('cache_hits')
+        except Exception:
+            self._count('errors')
+            raise
+        finally:
+            with self._lock:
+                self._latency.append(time.monotonic() - started)
+        return {'results': results, 'missing': missing, 'cached': cached}
+
+    def _release(self, key: tuple) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight fetches, request counters and latency percentiles (seconds)."""
+        with self._lock:
+            samples = list(self._latency)
+            return {
+                **self._counts,
+                'queued': self._queued,
+                'in_flight': len(self._inflight),
+                'latency': {
+                    'p50': round(percentile(samples, 50), 3),
+                    'p95': round(percentile(samples, 95), 3),
+                    'max': round(max(samples, default=0.0), 3),
+                },
+            }
+
+
+def make_handler(service: ReportService) -> type[BaseHTTPRequestHandler]:
+    """Request handler class serving /report and /stats for a service."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: HTTPStatus, body: dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path == '/stats':
+                self._send(HTTPStatus.OK, service.stats())
+                return
+            if url.path != '/report':
+                self._send(HTTPStatus.NOT_FOUND, {'error': f'unknown path {url.path}'})
+                return
+            try:
+                types, start_date, end_date = parse_request(url.query)
+                timeout = parse_qs(url.query).get('timeout')
+                timeout = float(timeout[0]) if timeout else None
+            except ValueError as e:
+                self._send(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+                return
+            try:
+                self._send(HTTPStatus.OK, service.request(types, start_date, end_date, timeout))
+            except TimeoutError as e:
+                self._send(HTTPStatus.GATEWAY_TIMEOUT, {'error': str(e)})
+            except Exception as e:
+                self._send(HTTPStatus.BAD_GATEWAY, {'error': f'{type(e).__name__}: {e}'})
+
+        def log_message(self, format: str, *args) -> None:
+            print(f'[service] {self.address_string()} {format % args}')
+
+    return Handler
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Serve CDN reports over local HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--sessions', type=int, default=1, help='Browser sessions fetching in parallel')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    parser.add_argument(
+        '--timeout', type=float, default=DEFAULT_TIMEOUT, help='Seconds a request waits for missing days to be fetched'
+    )
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    tasks: queue.Queue = queue.Queue()
+    workers = [
+        SessionWorker(f'{SESSION}-service-{i + 1}', tasks, stop, DAEMON_CONFIG.refresh_minutes * 60)
+        for i in range(args.sessions)
+    ]
+    for worker in workers:
+        worker.start()
+    service = ReportService(tasks.put, args.db, timeout=args.timeout)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f'[service] Listening on http://{args.host}:{args.port} with {args.sessions} session(s)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == '__main__':
+    main()
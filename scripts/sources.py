@@ -0,0 +1,184 @@
+"""Pluggable report data sources and a resource-aware concurrent executor.
+
+A Source produces report outputs for report types and declares the shared
+resources it needs (a browser session, an API client, AWS credentials). Each
+job names a report type and a chain of sources to try in order; the executor
+runs independent jobs concurrently, never holding more of a resource than its
+capacity allows.
+"""
+
+import contextvars
+import heapq
+import itertools
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from scripts.deadline import DeadlineExceeded, deadline
+
+
+class SourceError(RuntimeError):
+    """A source cannot produce this report; the next source in the chain is tried."""
+
+
+class Source:
+    """Backend producing report outputs.
+
+    Subclasses set name and resources and implement fetch. start runs once,
+    with every report type routed to the source, before its first fetch (under
+    its resources); stop runs after all jobs finish if the source was started.
+    """
+
+    name = ''
+    resources: tuple[str, ...] = ()
+
+    def start(self, report_types: list[str], start_date: str, end_date: str) -> None:
+        pass
+
+    def fetch(self, report_type: str, start_date: str, end_date: str) -> dict:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+@dataclass
+class Resource:
+    """Shared resource with a concurrency limit and optional lazy open/close.
+
+    Waiting callers are granted slots lowest priority first, so jobs queued on
+    a single-slot resource (the browser) run in plan order.
+    """
+
+    name: str
+    capacity: int = 1
+    open: Callable[[], None] | None = None
+    close: Callable[[], None] | None = None
+    _cond: threading.Condition = field(init=False, repr=False, default_factory=threading.Condition)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+    _waiting: list = field(init=False, repr=False, default_factory=list)
+    _seq: itertools.count = field(init=False, repr=False, default_factory=itertools.count)
+    _free: int = field(init=False, default=0)
+    _opened: bool = field(init=False, default=False)
+
+    def __post_init__(self):
+        self._free = self.capacity
+
+    def acquire(self, priority: int = 0) -> None:
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiting, entry)
+            self._cond.wait_for(lambda: self._free > 0 and self._waiting[0] == entry)
+            heapq.heappop(self._waiting)
+            self._free -= 1
+            self._cond.notify_all()
+        with self._lock:
+            if not self._opened:
+                if self.open:
+                    try:
+                        self.open()
+                    except BaseException:
+                        # Give the slot back so waiting jobs are not stuck behind a failed open
+                        self.release()
+                        raise
+                self._opened = True
+
+    def release(self) -> None:
+        with self._cond:
+            self._free += 1
+            self._cond.notify_all()
+
+    def shutdown(self) -> None:
+        if self._opened and self.close:
+            self.close()
+        self._opened = False
+
+
+@dataclass
+class Job:
+    report_type: str
+    sources: list[Source]
+
+
+def run_jobs(
+    jobs: list[Job],
+    resources: dict[str, Resource],
+    start_date: str,
+    end_date: str,
+    on_result: Callable[[dict], None] | None = None,
+    job_timeout: float | None = None,
+) -> list[dict]:
+    """Run jobs concurrently within resource limits and return outputs in job order.
+
+    Jobs waiting on the same resource are served in list order.
+    Each job tries its sources in order; a SourceError moves on to the next one.
+    Any other exception, or a SourceError from the last source, is raised after
+    all jobs finish. on_result is called with each output as it completes.
+
+    Jobs run in copies of the caller's context, so a run deadline applies to
+    them. job_timeout budgets each source attempt from when it holds its
+    resources; a job that exceeds its budget (or the run's) is reported and
+    left out of the outputs while the other jobs complete.
+    """
+    routed: dict[int, list[str]] = {}
+    for job in jobs:
+        for source in job.sources:
+            routed.setdefault(id(source), []).append(job.report_type)
+    started: list[Source] = []
+    start_errors: dict[int, Exception] = {}
+    start_locks = {key: threading.Lock() for key in routed}
+    result_lock = threading.Lock()
+
+    def run_source(source: Source, report_type: str, priority: int) -> dict:
+        held: list[Resource] = []
+        try:
+            for name in sorted(source.resources):
+                resources[name].acquire(priority)
+                held.append(resources[name])
+            with start_locks[id(source)]:
+                if id(source) in start_errors:
+                    raise start_errors[id(source)]
+                if source not in started:
+                    try:
+                        with deadline(job_timeout):
+                            source.start(routed[id(source)], start_date, end_date)
+                    except Exception as e:
+                        # Cached so later jobs skip a failed start instead of repeating it
+                        start_errors[id(source)] = e
+                        raise
+                    started.append(source)
+            with deadline(job_timeout):
+                return source.fetch(report_type, start_date, end_date)
+        finally:
+            for resource in reversed(held):
+                resource.release()
+
+    def run_job(priority: int, job: Job) -> dict | None:
+        for i, source in enumerate(job.sources):
+            try:
+                result = run_source(source, job.report_type, priority)
+            except DeadlineExceeded as e:
+                print(f'[{job.report_type}] Failed: {e}')
+                return None
+            except SourceError as e:
+                if i == len(job.sources) - 1:
+                    raise
+                print(f'[{job.report_type}] {source.name} unavailable ({e}), trying {job.sources[i + 1].name}')
+                continue
+            if on_result:
+                with result_lock:
+                    on_result(result)
+            return result
+        raise SourceError(f'No source for {job.report_type}')
+
+    workers = max(1, min(len(jobs), sum(r.capacity for r in resources.values())))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, run_job, i, job) for i, job in enumerate(jobs)]
+        return [result for future in futures if (result := future.result()) is not None]
+    finally:
+        for source in started:
+            source.stop()
+        for resource in resources.values():
+            resource.shutdown()
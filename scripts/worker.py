@@ -0,0 +1,119 @@
+"""Persistent report worker speaking JSON lines over stdin/stdout.
+
+One process serves many requests: imports and config are loaded once, and
+the browser is opened on the first request that needs it and kept open until
+the worker exits. Requests are answered from the
+traffic cube, fetching only the missing days (see service.ReportService).
+
+Each request is one JSON object per line on stdin; each response is one line
+on stdout with the same id. Progress output goes to stderr.
+
+    {"id": 1, "start": "2026-01-25", "end": "2026-01-31", "type": "geography", "timeout": 600}
+    {"id": 1, "ok": true, "results": [...], "missing": {}, "cached": false}
+    {"id": 2, "op": "shutdown"}
+
+type may be a name, a list of names, or omitted for every report type;
+timeout (seconds) is optional. The worker prints {"ready": true, ...} once at
+startup and exits on "shutdown" or end of input.
+
+Usage:
+    uv run python -m scripts.worker [--headed]
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+from typing import TextIO
+
+from scripts.akamai_report import _open_browser
+from scripts.browser_helpers import close_browser
+from scripts.config import REPORT_TYPES
+from scripts.cube import CUBE_PATH
+from scripts.deadline import deadline
+from scripts.service import ReportService, check_request
+from scripts.sources import Resource
+
+
+class WarmBrowser:
+    """Opens the browser on first use and keeps it open across report runs."""
+
+    def __init__(self, headed: bool = False):
+        self.headed = headed
+        self.opened = False
+        # No close: run_jobs shuts resources down after every run
+        self.resource = Resource('browser', open=self.open)
+
+    def open(self) -> None:  # pragma: no cover
+        if not self.opened:
+            _open_browser(self.headed)
+            self.opened = True
+
+    def close(self) -> None:  # pragma: no cover
+        if self.opened:
+            close_browser()
+            self.opened = False
+
+
+def handle(service: ReportService, line: str) -> dict:
+    """Response to one request line; errors become {"ok": false, "error": ...}."""
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError('request must be a JSON object')
+    except ValueError as e:
+        return {'id': None, 'ok': False, 'error': f'bad request: {e}'}
+    response = {'id': request.get('id')}
+    op = request.get('op', 'report')
+    try:
+        if op == 'shutdown':
+            return {**response, 'ok': True, 'shutdown': True}
+        if op == 'stats':
+            return {**response, 'ok': True, 'stats': service.stats()}
+        if op != 'report':
+            raise ValueError(f'unknown op {op!r}')
+        types = request.get('type') or []
+        types = check_request([types] if isinstance(types, str) else types, request.get('start'), request.get('end'))
+        with deadline(request.get('timeout')):
+            return {**response, 'ok': True, **service.request(types, request['start'], request['end'])}
+    except Exception as e:
+        return {**response, 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+
+
+def serve(service: ReportService, stdin: TextIO, stdout: TextIO) -> None:
+    """Answer request lines from stdin on stdout until shutdown or end of input."""
+
+    def reply(message: dict) -> None:
+        stdout.write(json.dumps(message, ensure_ascii=False) + '\n')
+        stdout.flush()
+
+    reply({'ready': True, 'types': list(REPORT_TYPES) + ['cloudfront']})
+    for line in stdin:
+        if not line.strip():
+            continue
+        # Report runners print progress; keep stdout for responses only
+        with contextlib.redirect_stdout(sys.stderr):
+            response = handle(service, line)
+        reply(response)
+        if response.get('shutdown'):
+            break
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Serve CDN report requests as JSON lines over stdin/stdout')
+    parser.add_argument('--headed', action='store_true', help='Run browser in headed mode')
+    parser.add_argument('--db', default=str(CUBE_PATH), help='Cube database path')
+    args = parser.parse_args()
+
+    # Fetches run inline on the one warm browser, so requests are served in order
+    browser = WarmBrowser(args.headed)
+    service = ReportService(lambda task: task(browser.resource), args.db)
+    try:
+        serve(service, sys.stdin, sys.stdout)
+    finally:
+        with contextlib.redirect_stdout(sys.stderr):
+            browser.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""End-to-end report benchmark against the local mock site.
+
+Serves `tests/mock_site` over a local HTTP server and drives the real
+`run_akamai_report` / `run_geography_report` flow through agent-browser,
+recording total and per-phase wall time for a matrix of report-type counts,
+CP codes per report and date spans.
+
+Usage:
+    uv run python -m tests.benchmarks.e2e --output bench_e2e.json
+    uv run python -m tests.benchmarks.e2e --types 1 3 --cp-codes 1 4 --spans 7 31 --geography
+    uv run python -m tests.benchmarks.e2e --wait-scale 0.1     # shrink fixed report waits
+    uv run python -m tests.benchmarks.e2e --record bench.cassette.jsonl
+    uv run python -m tests.benchmarks.e2e --replay bench.cassette.jsonl   # offline, no fixed waits
+
+Requires: agent-browser binary available on PATH or configured in settings.yaml
+(except with --replay, which serves recorded browser responses).
+"""
+
+import argparse
+import contextlib
+import functools
+import itertools
+import json
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from datetime import UTC, datetime, timedelta
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+from threading import Thread
+from unittest import mock
+
+from scripts import akamai_report
+from scripts.browser_helpers import start_recording, start_replay, stop_cassette
+from scripts.config import ReportConfig
+
+MOCK_SITE_DIR = Path(__file__).resolve().parent.parent / 'mock_site'
+EMPTY_STATE = MOCK_SITE_DIR / 'empty_state.json'
+
+# CP codes rendered by mock_site/mock_data.js
+MOCK_CP_CODES = ['960172', '578716', '1415558', '1421896']
+
+# The mock calendar opens on January 2026
+BENCH_START = datetime(2026, 1, 5)
+
+# Functions in scripts.akamai_report wrapped to attribute time to a phase
+PHASES = {
+    'init_browser': 'browser_init',
+    'navigate_to_report': 'navigate',
+    'set_date_range': 'date_range',
+    'select_cp_codes': 'cp_codes',
+    'extract_traffic_cards': 'extract',
+    'extract_chart_series': 'extract',
+    'extract_geography_table': 'extract',
+    'ab_screenshot': 'screenshot',
+    'close_browser': 'browser_close',
+}
+
+WAIT_CONSTANTS = ['WAIT_UI_UPDATE', 'WAIT_REPORT_LOAD', 'WAIT_BROWSER_INIT']
+
+
+class PhaseTimer:
+    """Accumulate wall time per phase for wrapped callables."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = defaultdict(float)
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.phases[phase] += time.perf_counter() - t0
+
+        return wrapper
+
+    def snapshot(self) -> dict[str, float]:
+        return dict(self.phases)
+
+
+def synthetic_report_types(n_types: int, n_cp_codes: int) -> dict[str, ReportConfig]:
+    """Build hostname report configs using the mock site's CP codes, plus geography."""
+    n_cp_codes = min(n_cp_codes, len(MOCK_CP_CODES))
+    types = {}
+    for i in range(n_types):
+        codes = [MOCK_CP_CODES[(i + j) % len(MOCK_CP_CODES)] for j in range(n_cp_codes)]
+        types[f'bench_{i + 1}'] = ReportConfig(label=f'Bench {i + 1}', cp_codes=codes, unit='TB')
+    types['geography'] = ReportConfig(label='Bench Geography', cp_codes=['ALL'], unit='TB', geo_countries=['ID', 'TW'])
+    return types
+
+
+def date_range_for_span(span_days: int) -> tuple[str, str]:
+    """Return (start, end) covering `span_days` days from BENCH_START."""
+    end = BENCH_START + timedelta(days=span_days - 1)
+    return BENCH_START.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def phase_delta(before: dict[str, float], after: dict[str, float]) -> dict[str, float]:
+    """Per-phase time spent between two snapshots."""
+    return {k: round(v - before.get(k, 0.0), 4) for k, v in after.items() if v - before.get(k, 0.0) > 0}
+
+
+@contextlib.contextmanager
+def serve_mock_site() -> Iterator[str]:
+    """Serve mock site files on an ephemeral local port."""
+    handler = partial(SimpleHTTPRequestHandler, directory=str(MOCK_SITE_DIR))
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+
+
+@contextlib.contextmanager
+def instrumented(timer: PhaseTimer, report_types: dict[str, ReportConfig], output_dir: Path, wait_scale: float):
+    """Patch scripts.akamai_report with phase timers, synthetic configs and scaled waits."""
+    with contextlib.ExitStack() as stack:
+        for name, phase in PHASES.items():
+            stack.enter_context(mock.patch.object(akamai_report, name, timer.wrap(phase, getattr(akamai_report, name))))
+        stack.enter_context(mock.patch.object(akamai_report, 'REPORT_TYPES', report_types))
+        stack.enter_context(mock.patch.object(akamai_report, 'OUTPUT_DIR', output_dir))
+        for const in WAIT_CONSTANTS:
+            stack.enter_context(mock.patch.object(akamai_report, const, getattr(akamai_report, const) * wait_scale))
+        yield
+
+
+def run_case(url: str, n_types: int, n_cp_codes: int, span_days: int, geography: bool, wait_scale: float) -> dict:
+    """Run one benchmark case in a fresh browser session and return its timings."""
+    report_types = synthetic_report_types(n_types, n_cp_codes)
+    start, end = date_range_for_span(span_days)
+    timer = PhaseTimer()
+    reports = []
+
+    with tempfile.TemporaryDirectory() as tmp, instrumented(timer, report_types, Path(tmp), wait_scale):
+        t_case = time.perf_counter()
+        akamai_report.init_browser(str(EMPTY_STATE), url)
+        time.sleep(akamai_report.WAIT_BROWSER_INIT)
+        try:
+            jobs = [
+                partial(akamai_report.run_akamai_report, name, start, end)
+                for name in report_types
+                if name != 'geography'
+            ]
+            if geography:
+                jobs.append(partial(akamai_report.run_geography_report, start, end))
+            for job in jobs:
+                before = timer.snapshot()
+                t0 = time.perf_counter()
+                result = job()
+                total = time.perf_counter() - t0
+                phases = phase_delta(before, timer.snapshot())
+                phases['other'] = round(total - sum(phases.values()), 4)
+                reports.append({'type': result['type'], 'total_s': round(total, 4), 'phases': phases})
+        finally:
+            akamai_report.close_browser()
+        case_total = time.perf_counter() - t_case
+
+    return {
+        'report_types': n_types,
+        'cp_codes': min(n_cp_codes, len(MOCK_CP_CODES)),
+        'span_days': span_days,
+        'geography': geography,
+        'total_s': round(case_total, 4),
+        'reports_per_min': round(len(reports) / case_total * 60, 3) if case_total else 0.0,
+        'phases': {k: round(v, 4) for k, v in timer.snapshot().items()},
+        'reports': reports,
+    }
+
+
+def main():  # pragma: no cover
+    parser = argparse.ArgumentParser(description='End-to-end report benchmark against the local mock site')
+    parser.add_argument('--types', type=int, nargs='+', default=[1, 3], help='Hostname report type counts')
+    parser.add_argument('--cp-codes', type=int, nargs='+', default=[1], help='CP codes per report (max 4)')
+    parser.add_argument('--spans', type=int, nargs='+', default=[7], help='Date span lengths in days')
+    parser.add_argument('--geography', action='store_true', help='Also run the geography report in each case')
+    parser.add_argument('--wait-scale', type=float, default=1.0, help='Multiplier for fixed report waits')
+    parser.add_argument('--output', help='Write results JSON to this path')
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='PATH', help='Record browser commands of all cases to a cassette')
+    cassette.add_argument('--replay', metavar='PATH', help='Replay browser commands from a cassette')
+    parser.add_argument('--realtime', action='store_true', help='With --replay, reproduce recorded command timings')
+    args = parser.parse_args()
+
+    if args.record:
+        start_recording(args.record)
+    elif args.replay:
+        start_replay(args.replay, realtime=args.realtime)
+
+    cases = []
+    try:
+        with serve_mock_site() as url:
+            for n_types, n_cp, span in itertools.product(args.types, args.cp_codes, args.spans):
+                print(f'[bench] types={n_types} cp_codes={n_cp} span={span}d ...')
+                case = run_case(url, n_types, n_cp, span, args.geography, args.wait_scale)
+                print(f'[bench]   total={case["total_s"]:.2f}s  ({case["reports_per_min"]:.2f} reports/min)')
+                cases.append(case)
+    finally:
+        stop_cassette()
+
+    doc = {
+        'timestamp': datetime.now(UTC).isoformat(),
+        'wait_scale': args.wait_scale,
+        'cases': cases,
+    }
+    text = json.dumps(doc, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+        print(f'\nResults saved: {args.output}')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
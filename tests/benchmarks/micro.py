@@ -0,0 +1,281 @@
+"""Microbenchmarks for the pure-Python hot paths.
+
+Runs each pure function against synthetic inputs at a realistic size (one
+weekly report) or a large size (a year of minute data, thousands of KPI
+strings, baselines with thousands of selectors).
+
+Usage:
+    uv run python -m tests.benchmarks.micro                          # run and print
+    uv run python -m tests.benchmarks.micro --size large --output bench.json
+    uv run python -m tests.benchmarks.micro --save                   # save baseline
+    uv run python -m tests.benchmarks.micro --diff --threshold 0.25  # compare to baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from scripts.calendar_nav import MONTH_NAMES, _parse_month_str, calculate_nav_clicks
+from scripts.cloudfront import aggregate_hourly_to_daily, convert_dates_to_utc
+from scripts.contract_check import diff_baseline
+from scripts.data_extract import convert_unit, parse_traffic_value
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+DEFAULT_THRESHOLD = 0.25
+
+# Item counts per benchmark for each size preset
+SIZES = {
+    'realistic': {
+        'series_minutes': 7 * 24 * 60,
+        'kpi_strings': 100,
+        'unit_pairs': 100,
+        'month_strings': 100,
+        'date_pairs': 100,
+        'selectors': 10,
+    },
+    'large': {
+        'series_minutes': 365 * 24 * 60,
+        'kpi_strings': 10_000,
+        'unit_pairs': 10_000,
+        'month_strings': 10_000,
+        'date_pairs': 10_000,
+        'selectors': 5_000,
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+def minute_series(minutes: int, start: datetime | None = None) -> tuple[list[str], list[float]]:
+    """Build CloudWatch-style (timestamps, values) at one-minute resolution."""
+    start = start or datetime(2026, 1, 1, tzinfo=UTC)
+    timestamps = [(start + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%S+00:00') for i in range(minutes)]
+    values = [float(1_000_000 + (i % 1440) * 997) for i in range(minutes)]
+    return timestamps, values
+
+
+def kpi_strings(count: int) -> list[str]:
+    """Build KPI card texts like '1,234.56 Terabytes' cycling through all units."""
+    units = ['Terabytes', 'Gigabytes', 'Megabytes', 'Bytes', '%']
+    return [f'{(i * 7919) % 100_000:,}.{i % 100:02d} {units[i % len(units)]}' for i in range(count)]
+
+
+def unit_pairs(count: int) -> list[tuple[float, str, str]]:
+    """Build (value, from_unit, to_unit) triples across all byte units."""
+    units = ['B', 'MB', 'GB', 'TB']
+    return [(float(i), units[i % 4], units[(i // 4) % 4]) for i in range(count)]
+
+
+def month_strings(count: int) -> list[str]:
+    """Build month strings alternating full and abbreviated names."""
+    out = []
+    for i in range(count):
+        name = MONTH_NAMES[i % 12]
+        out.append(f'{name if i % 2 else name[:3]} {2000 + (i // 12) % 50}')
+    return out
+
+
+def date_pairs(count: int) -> list[tuple[str, str]]:
+    """Build (start, end) date strings one week apart."""
+    base = datetime(2020, 1, 1)
+    return [
+        ((base + timedelta(days=i)).strftime('%Y-%m-%d'), (base + timedelta(days=i + 6)).strftime('%Y-%m-%d'))
+        for i in range(count)
+    ]
+
+
+def contract_results(count: int) -> list[dict]:
+    """Build contract-check result dicts for `count` distinct selectors."""
+    return [
+        {
+            'selector': f'.selector-{i}',
+            'description': f'Selector {i}',
+            'page': 'hostname' if i % 2 else 'geography',
+            'count': i % 7,
+            'expected_min': 1,
+            'found': i % 7 >= 1,
+        }
+        for i in range(count)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+def _bench_aggregate(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    timestamps, values = minute_series(sizes['series_minutes'])
+    return lambda: aggregate_hourly_to_daily(timestamps, values), len(timestamps)
+
+
+def _bench_convert_dates(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    pairs = date_pairs(sizes['date_pairs'])
+    return lambda: [convert_dates_to_utc(s, e) for s, e in pairs], len(pairs)
+
+
+def _bench_parse_traffic(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    texts = kpi_strings(sizes['kpi_strings'])
+    return lambda: [parse_traffic_value(t) for t in texts], len(texts)
+
+
+def _bench_convert_unit(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    pairs = unit_pairs(sizes['unit_pairs'])
+    return lambda: [convert_unit(v, f, t) for v, f, t in pairs], len(pairs)
+
+
+def _bench_nav_clicks(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    months = month_strings(sizes['month_strings'])
+    current = {'left': 'Jan 2026', 'right': 'Feb 2026'}
+    return lambda: [calculate_nav_clicks(current, m) for m in months], len(months)
+
+
+def _bench_parse_month(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    months = month_strings(sizes['month_strings'])
+    return lambda: [_parse_month_str(m) for m in months], len(months)
+
+
+def _bench_diff_baseline(sizes: dict, stack: contextlib.ExitStack) -> tuple[Callable[[], object], int]:
+    results = contract_results(sizes['selectors'])
+    baseline = [dict(r, count=r['count'] + i % 2, found=True) for i, r in enumerate(results)]
+    tmp = Path(stack.enter_context(tempfile.TemporaryDirectory())) / 'contract_baseline.json'
+    tmp.write_text(json.dumps({'timestamp': 'bench', 'results': baseline}))
+    # Patched once for the whole timing loop, so only diff_baseline is measured
+    stack.enter_context(mock.patch('scripts.contract_check.BASELINE_PATH', tmp))
+    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+    return lambda: diff_baseline(results), len(results)
+
+
+# name -> setup(sizes, stack) returning (timed function, item count); resources the
+# timed function needs (patches, temp files) are entered on stack and released after timing
+BENCHMARKS: dict[str, Callable[[dict, contextlib.ExitStack], tuple[Callable[[], object], int]]] = {
+    'aggregate_hourly_to_daily': _bench_aggregate,
+    'convert_dates_to_utc': _bench_convert_dates,
+    'parse_traffic_value': _bench_parse_traffic,
+    'convert_unit': _bench_convert_unit,
+    'calculate_nav_clicks': _bench_nav_clicks,
+    '_parse_month_str': _bench_parse_month,
+    'diff_baseline': _bench_diff_baseline,
+}
+
+
+def time_call(func: Callable[[], object], repeat: int) -> list[float]:
+    """Return wall times (seconds) of `repeat` calls to func."""
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def run_benchmarks(size: str = 'realistic', repeat: int = 5, only: list[str] | None = None) -> dict:
+    """Run all (or selected) benchmarks and return a JSON-serialisable result document."""
+    sizes = SIZES[size]
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        with contextlib.ExitStack() as stack:
+            func, n_items = setup(sizes, stack)
+            timings = time_call(func, repeat)
+        median = statistics.median(timings)
+        results[name] = {
+            'n_items': n_items,
+            'repeat': repeat,
+            'min_s': min(timings),
+            'median_s': median,
+            'per_item_us': median / n_items * 1e6 if n_items else 0.0,
+        }
+        print(
+            f'  {name:<28} n={n_items:<8} median={median * 1000:10.3f} ms  ({results[name]["per_item_us"]:.3f} us/item)'
+        )
+    return {
+        'timestamp': datetime.now(UTC).isoformat(),
+        'python': platform.python_version(),
+        'size': size,
+        'results': results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Compare per-item median times against a baseline document.
+
+    A function regresses when its per-item median grows by more than `threshold`
+    (0.25 = 25% slower). Functions missing from either side are skipped.
+    """
+    rows = []
+    for name, cur in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or not old['per_item_us']:
+            continue
+        ratio = cur['per_item_us'] / old['per_item_us']
+        rows.append(
+            {
+                'name': name,
+                'baseline_us': old['per_item_us'],
+                'current_us': cur['per_item_us'],
+                'ratio': ratio,
+                'regressed': ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for pure-Python hot paths')
+    parser.add_argument('--size', choices=list(SIZES), default='realistic', help='Synthetic input size preset')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed calls per benchmark')
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS), help='Run only this benchmark')
+    parser.add_argument('--output', help='Write results JSON to this path')
+    parser.add_argument('--save', action='store_true', help='Save results as baseline')
+    parser.add_argument('--diff', action='store_true', help='Compare against saved baseline')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='Baseline JSON path')
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown ratio before failing'
+    )
+    args = parser.parse_args()
+
+    print(f'Running {args.size} benchmarks (repeat={args.repeat})...\n')
+    current = run_benchmarks(args.size, args.repeat, args.only)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2) + '\n')
+        print(f'\nResults saved: {args.output}')
+
+    baseline_path = Path(args.baseline)
+    if args.save:
+        baseline_path.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'\nBaseline saved: {baseline_path}')
+
+    if args.diff:
+        if not baseline_path.exists():
+            print(f'\nNo baseline found at {baseline_path}. Run with --save first.')
+            sys.exit(2)
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('size') != current['size']:
+            print(f'\nBaseline size {baseline.get("size")!r} differs from current {current["size"]!r}.')
+            sys.exit(2)
+        rows = compare_results(baseline, current, args.threshold)
+        print(f'\nComparing to baseline from {baseline["timestamp"]} (threshold +{args.threshold:.0%}):')
+        for row in rows:
+            icon = '\U0001f534 REGRESSED' if row['regressed'] else '✅ OK'
+            print(
+                f'  {icon}: {row["name"]} {row["baseline_us"]:.3f} -> {row["current_us"]:.3f} us/item'
+                f' ({row["ratio"]:.2f}x)'
+            )
+        sys.exit(1 if any(r['regressed'] for r in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
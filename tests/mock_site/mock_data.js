@@ -12,8 +12,27 @@ window.MOCK_DATA = {
   geographyRows: [
     { country: "ID", bytes: "168,776,644,787,204" },
     { country: "TW", bytes: "31,398,058,511" },
-    { country: "SG", bytes: "5,234,567,890" }
+    { country: "SG", bytes: "5,234,567,890" },
+    { country: "US", bytes: "2,500,000,000,000" },
+    { country: "JP", bytes: "1,250,000,000,000" },
+    { country: "KR", bytes: "750,000,000,000" },
+    { country: "MY", bytes: "120,000,000,000" },
+    { country: "TH", bytes: "80,000,000,000" }
   ],
+  geographyPageSize: 3,
+  // Per-CP-code bytes; columns sum to the Edge / Origin / Midgress cards
+  cpCodeBreakdown: [
+    { cpCode: "960172", edge: "100,000,000,000,000", origin: "30,000,000,000,000", midgress: "20,000,000,000" },
+    { cpCode: "578716", edge: "50,000,000,000,000", origin: "21,250,000,000,000", midgress: "13,890,000,000" },
+    { cpCode: "1415558", edge: "15,820,000,000,000", origin: "7,000,000,000,000", midgress: "7,000,000,000" },
+    { cpCode: "1421896", edge: "5,000,000,000,000", origin: "3,000,000,000,000", midgress: "3,000,000,000" }
+  ],
+  // Daily traffic chart points (00:00 UTC+8 each day, 2026-01-25 .. 2026-01-31); sums match the cards
+  trafficChart: {
+    start: Date.UTC(2026, 0, 24, 16),
+    edge: [20e12, 22e12, 24e12, 25e12, 26e12, 27e12, 26.82e12],
+    origin: [7e12, 8e12, 9e12, 9e12, 9e12, 9.5e12, 9.75e12]
+  },
   cpCodes: ["960172", "578716", "1415558", "1421896"],
   initialMonth: { year: 2026, month: 0 }  // January (0-indexed)
 };
@@ -0,0 +1,198 @@
+"""Tests for akamai_api module — EdgeGrid signing and a local stub Reporting API."""
+
+import json
+import re
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+
+import pytest
+
+from scripts.akamai_api import (
+    ApiClient,
+    ApiError,
+    EdgeRc,
+    build_api_query,
+    fetch_report,
+    load_edgerc,
+    sign_request,
+)
+from scripts.config import ReportConfig
+from scripts.data_extract import bytes_to_tb
+
+RECORDED = json.loads((Path(__file__).parent / 'golden' / 'reporting_api_v2.json').read_text())
+
+CREDS = EdgeRc(host='akab-test.luna.akamaiapis.net', client_token='ct', client_secret='secret', access_token='at')
+
+HOSTNAME = ReportConfig(label='Report A', cp_codes=['123456'], unit='TB')
+GEOGRAPHY = ReportConfig(label='Geo', cp_codes=['ALL'], unit='TB', geo_countries=['US', 'ID'])
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Replays recorded responses after verifying the EdgeGrid signature."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, *args, requests: list, **kwargs):
+        self.requests = requests
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, doc: dict) -> None:
+        payload = json.dumps(doc).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        auth = self.headers['Authorization']
+        fields = dict(re.findall(r'(\w+)=([^;]+)', auth))
+        expected = sign_request(
+            CREDS, 'POST', self.headers['Host'], self.path, body, fields['timestamp'], fields['nonce']
+        )
+        self.requests.append({'path': self.path, 'body': json.loads(body), 'port': self.client_address[1]})
+        if auth != expected:
+            self._reply(401, {'title': 'The signature does not match'})
+            return
+        dims = json.loads(body)['dimensions']
+        self._reply(200, RECORDED['geography' if dims == ['country'] else 'hostname'])
+
+
+@pytest.fixture
+def stub_api():
+    """Local stub Reporting API; yields (base_url, received requests)."""
+    requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_StubHandler, requests=requests))
+    thread = Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', requests
+    server.shutdown()
+
+
+# ---------------------------------------------------------------------------
+# Credentials and signing
+# ---------------------------------------------------------------------------
+def test_load_edgerc(tmp_path):
+    path = tmp_path / '.edgerc'
+    path.write_text(
+        '[default]\nhost = https://akab-x.luna.akamaiapis.net/\nclient_token = ct\nclient_secret = cs\naccess_token = at\n'
+    )
+    creds = load_edgerc(str(path))
+    assert creds.host == 'akab-x.luna.akamaiapis.net'
+    assert creds.client_secret == 'cs'
+
+
+def test_load_edgerc_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_edgerc(str(tmp_path / 'nope'))
+
+
+def test_sign_request_deterministic_and_path_sensitive():
+    sign = partial(sign_request, CREDS, 'POST', CREDS.host, timestamp='20260125T00:00:00+0000', nonce='n-1')
+    header = sign('/a?x=1', b'{}')
+    assert header.startswith('EG1-HMAC-SHA256 client_token=ct;access_token=at;timestamp=20260125T00:00:00+0000;')
+    assert header == sign('/a?x=1', b'{}')
+    assert header != sign('/a?x=2', b'{}')
+    assert header != sign('/a?x=1', b'{"a": 1}')
+
+
+# Vectors from the EdgeGrid reference implementation (edgegrid-python testcases.json)
+REFERENCE_CREDS = EdgeRc(
+    host='akaa-baseurl-xxxxxxxxxxx-xxxxxxxxxxxxx.luna.akamaiapis.net',
+    client_token='akab-client-token-xxx-xxxxxxxxxxxxxxxx',
+    client_secret='xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx=',
+    access_token='akab-access-token-xxx-xxxxxxxxxxxxxxxx',
+)
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'body', 'signature'),
+    [
+        ('GET', '/', b'', 'tL+y4hxyHxgWVD30X3pWnGKHcPzmrIF+LThiAOhMxYU='),
+        ('GET', '/testapi/v1/t1?p1=1&p2=2', b'', 'hKDH1UlnQySSHjvIcZpDMbQHihTQ0XyVAKZaApabdeA='),
+        ('POST', '/testapi/v1/t3', b'datadatadatadatadatadatadatadata', 'hXm4iCxtpN22m4cbZb4lVLW5rhX8Ca82vCFqXzSTPe4='),
+        ('POST', '/testapi/v1/t6', b'', '1gEDxeQGD5GovIkJJGcBaKnZ+VaPtrc4qBUHixjsPCQ='),
+    ],
+)
+def test_sign_request_matches_reference_vectors(method, path, body, signature):
+    header = sign_request(
+        REFERENCE_CREDS,
+        method,
+        REFERENCE_CREDS.host,
+        path,
+        body,
+        timestamp='20140321T19:34:21+0000',
+        nonce='nonce-xx-xxxx-xxxx-xxxx-xxxxxxxxxxxx',
+    )
+    assert header == (
+        'EG1-HMAC-SHA256 client_token=akab-client-token-xxx-xxxxxxxxxxxxxxxx;'
+        'access_token=akab-access-token-xxx-xxxxxxxxxxxxxxxx;timestamp=20140321T19:34:21+0000;'
+        f'nonce=nonce-xx-xxxx-xxxx-xxxx-xxxxxxxxxxxx;signature={signature}'
+    )
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+def test_build_api_query_filters_cp_codes():
+    params, body = build_api_query('hostname', HOSTNAME, '2026-01-25', '2026-01-31')
+    assert params == {'start': '2026-01-24T16:00:00Z', 'end': '2026-01-31T16:00:00Z'}
+    assert body['filters'][0]['expressions'] == ['123456']
+
+
+def test_build_api_query_all_cp_codes_unfiltered():
+    _, body = build_api_query('geography', GEOGRAPHY, '2026-01-25', '2026-01-31')
+    assert body == {'dimensions': ['country'], 'metrics': ['edgeBytesSum']}
+
+
+# ---------------------------------------------------------------------------
+# Stub server
+# ---------------------------------------------------------------------------
+def test_fetch_report_matches_ui_output(stub_api):
+    url, requests = stub_api
+    client = ApiClient(CREDS, base_url=url)
+    try:
+        results = {
+            name: fetch_report(client, name, config, '2026-01-25', '2026-01-31')
+            for name, config in {'report_a': HOSTNAME, 'geography': GEOGRAPHY}.items()
+        }
+    finally:
+        client.close()
+    assert results['report_a'] == {
+        'date_range': {'start': '2026-01-25', 'end': '2026-01-31'},
+        'type': 'report_a',
+        'label': 'Report A',
+        'traffic': {'edge': 170.82, 'origin': 61.25, 'midgress': 0.04, 'offload': 64.14},
+        'unit': 'TB',
+    }
+    assert results['geography']['geography'] == {
+        'US': bytes_to_tb(2_500_000_000_000),
+        'ID': bytes_to_tb(168_776_644_787_204),
+    }
+    assert len(requests) == 2
+
+
+def test_client_reuses_pooled_connection(stub_api):
+    url, requests = stub_api
+    client = ApiClient(CREDS, base_url=url)
+    try:
+        for _ in range(3):
+            client.request('POST', '/data', {'start': 's'}, {'dimensions': ['time1day']})
+    finally:
+        client.close()
+    assert len({r['port'] for r in requests}) == 1
+
+
+def test_bad_credentials_rejected(stub_api):
+    url, _ = stub_api
+    client = ApiClient(EdgeRc(CREDS.host, 'ct', 'wrong', 'at'), base_url=url)
+    with pytest.raises(ApiError) as exc:
+        client.request('POST', '/data', body={'dimensions': ['country']})
+    assert exc.value.status == 401
+    client.close()
@@ -0,0 +1,121 @@
+"""Tests for akamai_report output helpers — NDJSON streaming, checkpoints and atomic JSON writes."""
+
+import json
+import subprocess
+
+import pytest
+
+from scripts.akamai_report import (
+    CpCodeBatchSource,
+    PageApiSource,
+    _setup_report_filters,
+    load_checkpoint,
+    ndjson_writer,
+    run_api_reports,
+    write_json_atomic,
+)
+from scripts.browser_helpers import page_state
+from scripts.config import REPORT_TYPES, ReportConfig
+from scripts.deadline import DeadlineExceeded
+from scripts.sources import SourceError
+
+
+def test_ndjson_writer_appends_compact_records(tmp_path):
+    path = tmp_path / 'out' / 'report.ndjson'
+    path.parent.mkdir()
+    path.write_text('stale\n')
+    write = ndjson_writer(path)
+    assert path.read_text() == ''
+    write({'type': 'a', 'traffic': {'edge': 1.0}})
+    assert path.read_text() == '{"type":"a","traffic":{"edge":1.0}}\n'
+    write({'type': 'b'})
+    assert [json.loads(line)['type'] for line in path.read_text().splitlines()] == ['a', 'b']
+
+
+def test_checkpoint_resume_keeps_finished_reports(tmp_path):
+    path = tmp_path / 'checkpoint.ndjson'
+    week = {'start': '2026-01-25', 'end': '2026-01-31'}
+    ndjson_writer(path)({'date_range': week, 'type': 'a'})
+    write = ndjson_writer(path, truncate=False)
+    write({'date_range': {'start': '2026-02-01', 'end': '2026-02-07'}, 'type': 'b'})
+    write({'date_range': week, 'type': 'c'})
+    with open(path, 'a') as f:
+        f.write('{"date_range": {"start": "2026-01-25", "end": "2026-01-31"}, "type": "d", "tra')
+    ndjson_writer(path, truncate=False)({'date_range': week, 'type': 'e'})
+    assert list(load_checkpoint(path, '2026-01-25', '2026-01-31')) == ['a', 'c', 'e']
+    assert load_checkpoint(tmp_path / 'missing.ndjson', '2026-01-25', '2026-01-31') == {}
+
+
+def test_write_json_atomic_replaces_file(tmp_path):
+    path = tmp_path / 'report.json'
+    path.write_text('old')
+    write_json_atomic(path, [{'type': 'a'}])
+    assert json.loads(path.read_text()) == [{'type': 'a'}]
+    assert [p.name for p in tmp_path.iterdir()] == ['report.json']
+
+
+@pytest.fixture
+def api_types(monkeypatch):
+    monkeypatch.setitem(REPORT_TYPES, 'main', ReportConfig(label='Main', cp_codes=['1'], unit='B'))
+    monkeypatch.setitem(REPORT_TYPES, 'other', ReportConfig(label='Other', cp_codes=['2'], unit='B'))
+
+
+def test_run_api_reports_skips_failed_requests(mocker, api_types, capsys):
+    doc = {'data': [{'edgeBytesSum': 4, 'originBytesSum': 1, 'midgressBytesSum': 0}]}
+    mocker.patch('scripts.akamai_report.fetch_reports', return_value={'main': doc, 'other': None})
+    results = run_api_reports(['main', 'other'], '2026-01-01', '2026-01-07')
+    assert list(results) == ['main']
+    assert results['main']['traffic']['edge'] == 4
+    assert 'Unexpected API response' not in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    'error', [subprocess.CalledProcessError(1, 'agent-browser'), json.JSONDecodeError('bad', '', 0)]
+)
+def test_page_api_source_failures_fall_back(mocker, api_types, error):
+    mocker.patch('scripts.akamai_report.fetch_reports', side_effect=error)
+    with pytest.raises(SourceError, match='in-page fetch failed'):
+        PageApiSource().start(['main'], '2026-01-01', '2026-01-07')
+
+
+@pytest.mark.parametrize('error', [subprocess.CalledProcessError(1, 'agent-browser'), ValueError('bad cell')])
+def test_cp_code_batch_source_failures_fall_back(mocker, api_types, error):
+    mocker.patch('scripts.akamai_report.run_cp_code_batch', side_effect=error)
+    with pytest.raises(SourceError, match='CP code breakdown unavailable'):
+        CpCodeBatchSource().start(['main', 'other'], '2026-01-01', '2026-01-07')
+
+
+@pytest.fixture
+def filter_steps(mocker):
+    page_state().clear()
+    mocks = {
+        name: mocker.patch(f'scripts.akamai_report.{name}')
+        for name in ('navigate_to_report', 'ab_eval', 'run_ab', 'set_date_range', 'select_cp_codes', 'pause')
+    }
+    yield mocks
+    page_state().clear()
+
+
+def test_setup_report_filters_skips_applied_filters(filter_steps):
+    config = ReportConfig(label='Main', cp_codes=['1'], unit='B')
+    _setup_report_filters('main', 'Traffic by Hostname', config, '2026-01-01', '2026-01-07')
+    _setup_report_filters('main', 'Traffic by Hostname', config, '2026-01-01', '2026-01-07')
+    assert filter_steps['navigate_to_report'].call_count == 1
+    assert filter_steps['set_date_range'].call_count == 1
+
+
+def test_setup_report_filters_redone_after_failed_report(filter_steps):
+    config = ReportConfig(label='Main', cp_codes=['1'], unit='B')
+    _setup_report_filters('main', 'Traffic by Hostname', config, '2026-01-01', '2026-01-07')
+    other = ReportConfig(label='Other', cp_codes=['2'], unit='B')
+    filter_steps['select_cp_codes'].side_effect = DeadlineExceeded('budget spent')
+    with pytest.raises(DeadlineExceeded):
+        _setup_report_filters('other', 'Traffic by Hostname', other, '2026-01-01', '2026-01-07')
+
+    filter_steps['select_cp_codes'].side_effect = None
+    filter_steps['navigate_to_report'].reset_mock()
+    filter_steps['ab_eval'].reset_mock()
+    _setup_report_filters('main', 'Traffic by Hostname', config, '2026-01-01', '2026-01-07')
+    filter_steps['navigate_to_report'].assert_called_once()
+    filter_steps['ab_eval'].assert_called_once()
+    assert page_state()['filters'].cp_codes == frozenset({'1'})
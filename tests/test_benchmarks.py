@@ -0,0 +1,93 @@
+"""Tests for benchmark harness helpers — synthetic inputs and baseline comparison."""
+
+from scripts.cloudfront import aggregate_hourly_to_daily
+from scripts.data_extract import parse_traffic_value
+from tests.benchmarks.e2e import MOCK_CP_CODES, PhaseTimer, date_range_for_span, phase_delta, synthetic_report_types
+from tests.benchmarks.micro import compare_results, contract_results, kpi_strings, minute_series, run_benchmarks
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+def test_minute_series_one_day_aggregates_across_two_local_days():
+    """One UTC day of minute data spans two UTC+8 days."""
+    timestamps, values = minute_series(24 * 60)
+    daily = aggregate_hourly_to_daily(timestamps, values)
+    assert list(daily) == ['01/01', '01/02']
+    assert sum(daily.values()) == int(sum(values))
+
+
+def test_kpi_strings_are_parseable():
+    for text in kpi_strings(50):
+        parse_traffic_value(text)
+
+
+def test_contract_results_unique_selectors():
+    results = contract_results(100)
+    assert len({r['selector'] for r in results}) == 100
+
+
+# ---------------------------------------------------------------------------
+# compare_results
+# ---------------------------------------------------------------------------
+def _doc(**per_item_us):
+    return {'results': {name: {'per_item_us': us} for name, us in per_item_us.items()}}
+
+
+def test_compare_results_within_threshold():
+    rows = compare_results(_doc(convert_unit=1.0), _doc(convert_unit=1.2), threshold=0.25)
+    assert rows[0]['regressed'] is False
+
+
+def test_compare_results_regression():
+    rows = compare_results(_doc(convert_unit=1.0), _doc(convert_unit=1.5), threshold=0.25)
+    assert rows[0]['regressed'] is True
+    assert rows[0]['ratio'] == 1.5
+
+
+def test_compare_results_skips_unknown_and_zero():
+    rows = compare_results(_doc(a=0.0), _doc(a=1.0, b=1.0))
+    assert rows == []
+
+
+def test_run_benchmarks_only_selected():
+    doc = run_benchmarks('realistic', repeat=1, only=['convert_unit'])
+    assert list(doc['results']) == ['convert_unit']
+    assert doc['results']['convert_unit']['n_items'] == 100
+
+
+def test_diff_baseline_benchmark_cleans_up(mocker, tmp_path):
+    import scripts.contract_check
+
+    mocker.patch('tempfile.tempdir', str(tmp_path))
+    original = scripts.contract_check.BASELINE_PATH
+    run_benchmarks('realistic', repeat=2, only=['diff_baseline'])
+    assert original == scripts.contract_check.BASELINE_PATH
+    assert list(tmp_path.iterdir()) == []
+
+
+# ---------------------------------------------------------------------------
+# End-to-end harness helpers
+# ---------------------------------------------------------------------------
+def test_synthetic_report_types_clips_cp_codes():
+    types = synthetic_report_types(n_types=3, n_cp_codes=10)
+    hostname = [name for name in types if name != 'geography']
+    assert hostname == ['bench_1', 'bench_2', 'bench_3']
+    assert all(len(types[name].cp_codes) == len(MOCK_CP_CODES) for name in hostname)
+    assert types['geography'].geo_countries
+
+
+def test_date_range_for_span():
+    assert date_range_for_span(1) == ('2026-01-05', '2026-01-05')
+    assert date_range_for_span(31) == ('2026-01-05', '2026-02-04')
+
+
+def test_phase_timer_accumulates_and_deltas():
+    timer = PhaseTimer()
+    work = timer.wrap('extract', lambda x: x * 2)
+    assert work(21) == 42
+    before = timer.snapshot()
+    work(1)
+    delta = phase_delta(before, timer.snapshot())
+    assert set(delta) <= {'extract'}
+    assert timer.snapshot()['extract'] >= before['extract']
@@ -1,4 +1,4 @@
-"""Tests for browser_helpers module — pure logic and error paths."""
+"""Tests for browser_helpers module — pure logic, error paths and cassette record/replay."""
 
 import json
 import subprocess
@@ -93,3 +93,310 @@ def test_ab_eval_delegates_to_run_ab(mocker):
     from scripts.browser_helpers import ab_eval
 
     assert ab_eval('1+1') == '42'
+
+
+# ---------------------------------------------------------------------------
+# Cassette record / replay
+# ---------------------------------------------------------------------------
+@pytest.fixture
+def cassette_path(tmp_path):
+    from scripts.browser_helpers import stop_cassette
+
+    yield tmp_path / 'session.cassette.jsonl'
+    stop_cassette()
+
+
+def _fake_run(mocker, outputs):
+    results = []
+    for out in outputs:
+        r = mocker.MagicMock()
+        r.stdout = out
+        results.append(r)
+    return mocker.patch('scripts.browser_helpers.subprocess.run', side_effect=results)
+
+
+def test_record_writes_one_line_per_command(mocker, cassette_path):
+    from scripts.browser_helpers import exec_ab, start_recording
+
+    _fake_run(mocker, [' "Traffic by Hostname" ', '4'])
+    start_recording(cassette_path)
+    exec_ab('eval', 'title')
+    exec_ab('eval', 'count')
+
+    entries = [json.loads(line) for line in cassette_path.read_text().splitlines()]
+    assert [e['args'] for e in entries] == [['eval', 'title'], ['eval', 'count']]
+    assert entries[0]['stdout'] == '"Traffic by Hostname"'
+    assert 'elapsed' in entries[0]
+
+
+def test_record_captures_failures(mocker, cassette_path):
+    from scripts.browser_helpers import exec_ab, start_recording
+
+    mocker.patch(
+        'scripts.browser_helpers.subprocess.run',
+        side_effect=subprocess.CalledProcessError(1, 'ab', output='', stderr='element not found'),
+    )
+    start_recording(cassette_path)
+    with pytest.raises(subprocess.CalledProcessError):
+        exec_ab('click', '#missing')
+
+    entry = json.loads(cassette_path.read_text())
+    assert entry['returncode'] == 1
+    assert entry['stderr'] == 'element not found'
+
+
+def test_record_skips_commands_interrupted_by_other_errors(mocker, cassette_path):
+    from scripts.browser_helpers import exec_ab, start_recording
+    from scripts.deadline import DeadlineExceeded
+
+    mocker.patch('scripts.browser_helpers.subprocess.run', side_effect=DeadlineExceeded('budget spent'))
+    start_recording(cassette_path)
+    with pytest.raises(DeadlineExceeded):
+        exec_ab('eval', 'title')
+
+    assert cassette_path.read_text() == ''
+
+
+def test_replay_returns_recorded_stdout_without_browser(mocker, cassette_path):
+    from scripts.browser_helpers import exec_ab, start_replay
+
+    cassette_path.write_text(json.dumps({'args': ['eval', '1+1'], 'stdout': '2', 'elapsed': 0.5}) + '\n')
+    run = mocker.patch('scripts.browser_helpers.subprocess.run')
+    start_replay(cassette_path)
+
+    assert exec_ab('eval', '1+1') == '2'
+    run.assert_not_called()
+
+
+def test_replay_raises_recorded_failure(cassette_path):
+    from scripts.browser_helpers import exec_ab, start_replay
+
+    entry = {'args': ['click', '#x'], 'stdout': '', 'returncode': 1, 'stderr': 'boom', 'elapsed': 0.1}
+    cassette_path.write_text(json.dumps(entry) + '\n')
+    start_replay(cassette_path)
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        exec_ab('click', '#x')
+    assert exc_info.value.stderr == 'boom'
+
+
+def test_replay_mismatch_and_exhaustion(cassette_path):
+    from scripts.browser_helpers import CassetteMismatchError, exec_ab, start_replay
+
+    cassette_path.write_text(json.dumps({'args': ['eval', 'a'], 'stdout': '1', 'elapsed': 0}) + '\n')
+    start_replay(cassette_path)
+    with pytest.raises(CassetteMismatchError, match='mismatch'):
+        exec_ab('eval', 'b')
+    with pytest.raises(CassetteMismatchError, match='exhausted'):
+        exec_ab('eval', 'a')
+
+
+def test_replay_ignores_global_opts_and_volatile_args(cassette_path):
+    from scripts.browser_helpers import exec_ab, start_replay
+
+    entries = [
+        {'args': ['--state', '/old/state.json', 'open', 'http://127.0.0.1:1234'], 'stdout': '', 'elapsed': 0},
+        {'args': ['--state', '/old/state.json', 'screenshot', '/old/a.png'], 'stdout': '', 'elapsed': 0},
+    ]
+    cassette_path.write_text(''.join(json.dumps(e) + '\n' for e in entries))
+    start_replay(cassette_path)
+    exec_ab('--state', '/new/state.json', '--headed', 'open', 'http://127.0.0.1:5678')
+    exec_ab('--state', '/new/state.json', 'screenshot', '/new/a.png')
+
+
+def test_replay_skips_fixed_waits(mocker, cassette_path):
+    from scripts.browser_helpers import start_replay, stop_cassette
+    from scripts.deadline import pause
+
+    cassette_path.write_text('')
+    sleep = mocker.patch('scripts.deadline.time.sleep')
+    start_replay(cassette_path)
+    pause(10)
+    sleep.assert_not_called()
+    start_replay(cassette_path, realtime=True)
+    pause(10)
+    stop_cassette()
+    pause(10)
+    assert sleep.call_count == 2
+
+
+def test_replay_realtime_sleeps_recorded_duration(mocker, cassette_path):
+    from scripts.browser_helpers import exec_ab, start_replay
+
+    cassette_path.write_text(json.dumps({'args': ['eval', 'a'], 'stdout': '1', 'elapsed': 0.25}) + '\n')
+    sleep = mocker.patch('scripts.browser_helpers.time.sleep')
+    start_replay(cassette_path, realtime=True)
+    exec_ab('eval', 'a')
+    sleep.assert_called_once_with(0.25)
+
+
+def test_cp_code_selection_round_trips_through_cassette(mocker, cassette_path):
+    """A recorded select_cp_codes flow replays offline with identical commands."""
+    from scripts.browser_helpers import start_recording, start_replay, stop_cassette
+    from scripts.config import ReportConfig
+    from scripts.cpcode_select import select_cp_codes
+
+    mocker.patch('scripts.deadline.time.sleep')
+    config = ReportConfig(label='Test', cp_codes=['960172', '578716'], unit='TB')
+
+    recorded = _fake_run(mocker, ['ok'] * 20)
+    start_recording(cassette_path)
+    select_cp_codes(config)
+    stop_cassette()
+    n_commands = recorded.call_count
+
+    replayed = mocker.patch('scripts.browser_helpers.subprocess.run', side_effect=AssertionError('no browser'))
+    start_replay(cassette_path)
+    select_cp_codes(config)
+    replayed.assert_not_called()
+    assert len(cassette_path.read_text().splitlines()) == n_commands
+
+
+def test_cp_code_search_retries_only_transient_click_failures(mocker):
+    from scripts.browser_helpers import RetryPolicy, TransientError
+    from scripts.cpcode_select import search_and_select_cp_code
+
+    mocker.patch('scripts.deadline.time.sleep')
+    mocker.patch('scripts.cpcode_select.scroll_to_cp_codes')
+    policy = RetryPolicy(attempts=2, base_delay=0, jitter=0)
+
+    def clicks_fail(stderr):
+        def run_ab(*args):
+            if args[0] == 'click':
+                raise subprocess.CalledProcessError(1, 'ab', output='', stderr=stderr)
+
+        return mocker.patch('scripts.cpcode_select.run_ab', side_effect=run_ab)
+
+    run_ab = clicks_fail('Unknown command')
+    with pytest.raises(subprocess.CalledProcessError):
+        search_and_select_cp_code('960172', policy)
+    assert [c.args[0] for c in run_ab.call_args_list].count('click') == 1
+
+    run_ab = clicks_fail('Timeout 5000ms exceeded waiting for locator')
+    with pytest.raises(TransientError):
+        search_and_select_cp_code('960172', policy)
+    assert [c.args[0] for c in run_ab.call_args_list].count('click') == 2
+
+
+# ---------------------------------------------------------------------------
+# use_session / wait_until
+# ---------------------------------------------------------------------------
+def test_use_session_routes_commands(mocker):
+    from scripts.browser_helpers import exec_ab, use_session
+    from scripts.config import SESSION
+
+    run = mocker.patch('scripts.browser_helpers.subprocess.run')
+    run.return_value.stdout = ''
+    with use_session('other-session'):
+        exec_ab('eval', '1')
+    exec_ab('eval', '1')
+
+    assert run.call_args_list[0][0][0][1:3] == ['--session', 'other-session']
+    assert run.call_args_list[1][0][0][1:3] == ['--session', SESSION]
+
+
+def test_global_opts_are_per_session(mocker):
+    from scripts.browser_helpers import run_ab, use_session
+
+    run = mocker.patch('scripts.browser_helpers.subprocess.run')
+    run.return_value.stdout = ''
+    mocker.patch.dict('scripts.browser_helpers._global_opts', {'warm': ['--state', 'state.json']}, clear=True)
+    with use_session('warm'):
+        run_ab('eval', '1')
+    with use_session('cold'):
+        run_ab('eval', '1')
+
+    assert run.call_args_list[0][0][0][3:] == ['--state', 'state.json', 'eval', '1']
+    assert run.call_args_list[1][0][0][3:] == ['eval', '1']
+
+
+def test_wait_until_returns_when_ready(mocker):
+    from scripts.browser_helpers import wait_until
+
+    sleep = mocker.patch('scripts.browser_helpers.time.sleep')
+    answers = iter([False, False, True])
+    assert wait_until(lambda: next(answers), timeout=10, interval=0.5) is True
+    assert sleep.call_count == 2
+
+
+def test_wait_until_times_out(mocker):
+    from scripts.browser_helpers import wait_until
+
+    mocker.patch('scripts.browser_helpers.time.sleep')
+    mocker.patch('scripts.browser_helpers.time.monotonic', side_effect=[0.0, 1.0, 2.0, 3.0])
+    assert wait_until(lambda: False, timeout=2) is False
+
+
+# ---------------------------------------------------------------------------
+# Failure classification / retry
+# ---------------------------------------------------------------------------
+def _failed(stderr: str) -> subprocess.CalledProcessError:
+    return subprocess.CalledProcessError(1, ['ab'], output='', stderr=stderr)
+
+
+@pytest.mark.parametrize(
+    ('exc', 'kind'),
+    [
+        (_failed('Error: Target closed'), 'session'),
+        (subprocess.TimeoutExpired(cmd='ab', timeout=120), 'session'),
+        (_failed('Timeout 5000ms exceeded waiting for locator'), 'transient'),
+        (_failed('Unknown command'), 'fatal'),
+        (KeyError('x'), 'fatal'),
+    ],
+)
+def test_classify_failure(exc, kind):
+    from scripts.browser_helpers import classify_failure
+
+    assert classify_failure(exc) == kind
+
+
+def test_retry_policy_delay_is_capped_and_jittered():
+    from scripts.browser_helpers import RetryPolicy
+
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0, jitter=0.5)
+    assert [policy.delay(n, rand=lambda: 0.0) for n in range(4)] == [1.0, 2.0, 4.0, 4.0]
+    assert policy.delay(1, rand=lambda: 1.0) == 1.0
+
+
+def test_retry_backs_off_on_transient_then_succeeds():
+    from scripts.browser_helpers import RetryPolicy, TransientError, retry
+
+    calls, sleeps = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TransientError('not ready')
+        return 'ok'
+
+    assert retry(flaky, RetryPolicy(attempts=3, jitter=0), sleep=sleeps.append) == 'ok'
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_raises_fatal_and_exhausted_transient():
+    from scripts.browser_helpers import RetryPolicy, TransientError, retry
+
+    def slow():
+        raise TransientError('slow')
+
+    sleeps = []
+    with pytest.raises(ValueError):
+        retry(lambda: int('x'), sleep=sleeps.append)
+    with pytest.raises(TransientError):
+        retry(slow, RetryPolicy(attempts=2), sleep=sleeps.append)
+    assert len(sleeps) == 1
+
+
+def test_retry_reinitialises_lost_session_once():
+    from scripts.browser_helpers import SessionLostError, retry
+
+    restarts = []
+
+    def lost():
+        raise SessionLostError('logged out')
+
+    with pytest.raises(SessionLostError):
+        retry(lost, on_session_lost=lambda: restarts.append(1), sleep=lambda _: None)
+    assert restarts == [1]
+    with pytest.raises(SessionLostError):
+        retry(lost, sleep=lambda _: None)
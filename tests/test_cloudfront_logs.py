@@ -0,0 +1,108 @@
+"""Tests for cloudfront_logs module — log parsing, UTC+8 days and pooled ingestion."""
+
+import gzip
+
+from scripts.cloudfront_logs import (
+    LOG_SOURCE,
+    facts_from_groups,
+    ingest,
+    ingest_directory,
+    parse_log_lines,
+    summarize,
+    uri_prefix,
+)
+from scripts.cube import connect, query
+
+HEADER = [
+    '#Version: 1.0\n',
+    '#Fields: date time x-edge-location sc-bytes c-ip cs-method cs(Host) cs-uri-stem sc-status\n',
+]
+
+
+def _line(day, time, size, stem):
+    return '\t'.join([day, time, 'TPE50-C1', str(size), '1.2.3.4', 'GET', 'd.cloudfront.net', stem, '200']) + '\n'
+
+
+def test_uri_prefix():
+    assert uri_prefix('/img/a/b.png', 1) == '/img'
+    assert uri_prefix('/img/a/b.png', 2) == '/img/a'
+    assert uri_prefix('/index.html', 1) == '/'
+
+
+def test_parse_log_lines_shifts_days_to_utc8():
+    lines = HEADER + [
+        _line('2026-01-24', '15:59:59', 100, '/img/x.png'),
+        _line('2026-01-24', '16:00:00', 200, '/img/y.png'),
+        _line('2026-01-25', '01:00:00', 50, '/js/app.js'),
+        _line('2026-01-25', '02:00:00', '-', '/js/app.js'),
+    ]
+    assert parse_log_lines(lines) == {
+        ('2026-01-24', '', '/img'): 100,
+        ('2026-01-25', '', '/img'): 200,
+        ('2026-01-25', '', '/js'): 50,
+    }
+
+
+def test_parse_log_lines_reads_country_column():
+    lines = ['#Fields: timestamp c-country date time sc-bytes cs-uri-stem\n', '1\tTW\t2026-01-25\t01:00:00\t10\t/a/b\n']
+    assert parse_log_lines(lines) == {('2026-01-25', 'TW', '/a'): 10}
+
+
+def test_ingest_directory_reduces_across_processes(tmp_path):
+    for hour in range(3):
+        with gzip.open(tmp_path / f'E123.2026-01-25-0{hour}.abc.gz', 'wt') as f:
+            f.writelines(HEADER + [_line('2026-01-25', f'0{hour}:10:00', 10, '/img/a.png')] * 4)
+    groups = ingest_directory(tmp_path, workers=2)
+    assert groups == {('2026-01-25', '', '/img'): 120}
+    assert summarize(groups) == {'2026-01-25': {'countries': {'unknown': 120}, 'prefixes': {'/img': 120}}}
+    [fact] = facts_from_groups(groups, 'E123')
+    assert (fact.source, fact.cp_code, fact.path, fact.day_start, fact.bytes) == (
+        LOG_SOURCE,
+        'E123',
+        '/img',
+        '2026-01-25',
+        120,
+    )
+
+
+def test_ingest_adds_batches_of_a_utc8_day(tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    conn = connect(tmp_path / 'cube.db')
+
+    def write(name, day, time, size):
+        with gzip.open(logs / name, 'wt') as f:
+            f.writelines(HEADER + [_line(day, time, size, '/img/a.png')])
+
+    def total():
+        return query(conn, '2026-01-25', '2026-01-25', source=LOG_SOURCE)['rows'][0]['value']
+
+    write('E123.2026-01-24-16.a.gz', '2026-01-24', '16:30:00', 30)
+    assert len(ingest(conn, logs, 'E123')[0]) == 1
+    write('E123.2026-01-25-01.b.gz', '2026-01-25', '01:00:00', 12)
+    files, groups = ingest(conn, logs, 'E123')
+    assert (len(files), groups) == (1, {('2026-01-25', '', '/img'): 12})
+    assert total() == 42
+    assert ingest(conn, logs, 'E123') == ([], {})
+    assert total() == 42
+    conn.close()
+
+
+def test_ingest_skips_truncated_gzip_until_complete(tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    conn = connect(tmp_path / 'cube.db')
+    data = gzip.compress(''.join(HEADER + [_line('2026-01-25', '01:00:00', 12, '/img/a.png')] * 50).encode())
+    (logs / 'E123.2026-01-25-01.a.gz').write_bytes(data[: len(data) // 2])
+    with gzip.open(logs / 'E123.2026-01-25-02.b.gz', 'wt') as f:
+        f.writelines(HEADER + [_line('2026-01-25', '02:00:00', 5, '/img/a.png')])
+
+    files, groups = ingest(conn, logs, 'E123')
+    assert [p.rsplit('/', 1)[1] for p in files] == ['E123.2026-01-25-02.b.gz']
+    assert groups == {('2026-01-25', '', '/img'): 5}
+
+    (logs / 'E123.2026-01-25-01.a.gz').write_bytes(data)
+    files, groups = ingest(conn, logs, 'E123')
+    assert [p.rsplit('/', 1)[1] for p in files] == ['E123.2026-01-25-01.a.gz']
+    assert query(conn, '2026-01-25', '2026-01-25', source=LOG_SOURCE)['rows'][0]['value'] == 605
+    conn.close()
@@ -3,7 +3,15 @@
 import pytest
 import yaml
 
-from scripts.config import _SETTINGS_FILE, CLOUDFRONT_CONFIG, REPORT_TYPES, _build_report_types, _validate_cp_codes
+from scripts.config import (
+    _SETTINGS_FILE,
+    CLOUDFRONT_CONFIG,
+    REPORT_TYPES,
+    SESSION,
+    _build_daemon_config,
+    _build_report_types,
+    _validate_cp_codes,
+)
 
 
 def _load_raw_settings():
@@ -111,3 +119,20 @@ def test_validate_cp_codes_accepts_all():
 
 def test_validate_cp_codes_accepts_numeric():
     _validate_cp_codes(['123456', '789012'], 'test')  # should not raise
+
+
+def test_build_daemon_config_defaults_and_normalises():
+    config = _build_daemon_config({'jobs': [{'name': 'weekly', 'at': '9:05', 'days': 7, 'weekdays': ['Monday']}]})
+    assert config.sessions == [SESSION]
+    assert config.refresh_minutes == 30
+    job = config.jobs[0]
+    assert (job.at, job.days, job.weekdays, job.types, job.deadline_minutes) == ('09:05', 7, ['mon'], [], 60)
+
+
+def test_build_daemon_config_rejects_bad_time_and_weekday():
+    with pytest.raises(ValueError, match='Invalid time'):
+        _build_daemon_config({'jobs': [{'name': 'x', 'at': '25:00'}]})
+    with pytest.raises(ValueError, match='Invalid weekdays'):
+        _build_daemon_config({'jobs': [{'name': 'x', 'at': '09:00', 'weekdays': ['someday']}]})
+    with pytest.raises(ValueError, match="Unknown report types \\['geograpy'\\]"):
+        _build_daemon_config({'jobs': [{'name': 'x', 'at': '09:00', 'types': ['cloudfront', 'geograpy']}]})
@@ -1,8 +1,23 @@
-"""Tests for contract_check module — diff logic and selector escaping."""
+"""Tests for contract_check module — diff logic, selector counting and DOM fingerprints."""
 
 import json
 
-from scripts.contract_check import CONTRACTS, _check_and_record, diff_baseline
+import pytest
+
+from scripts.contract_check import (
+    CONTRACTS,
+    ContractRecorder,
+    _check_and_record,
+    _check_phase,
+    collect_signatures,
+    count_selectors,
+    diff_baseline,
+    diff_fingerprint,
+    hash_signatures,
+    load_fingerprint,
+    load_results,
+    save_fingerprint,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -135,3 +150,128 @@ def test_contracts_all_have_positive_min_count():
     """All expected_min_count values should be > 0."""
     for _sel, _desc, _page, _phase, min_count in CONTRACTS:
         assert min_count > 0
+
+
+# ---------------------------------------------------------------------------
+# count_selectors / _check_phase — one evaluation per phase
+# ---------------------------------------------------------------------------
+def test_count_selectors_single_eval(mocker):
+    """All selectors should be counted with one ab_eval call."""
+    ab_eval = mocker.patch('scripts.contract_check.ab_eval', return_value='{"akam-single-kpi": 4, ".missing": 0}')
+    counts = count_selectors(['akam-single-kpi', '.missing', "input[placeholder='CP codes']"])
+    assert ab_eval.call_count == 1
+    assert counts == {'akam-single-kpi': 4, '.missing': 0, "input[placeholder='CP codes']": 0}
+
+
+def test_count_selectors_embeds_selectors_as_json(mocker):
+    """Quotes in selectors must survive embedding in the evaluated script."""
+    ab_eval = mocker.patch('scripts.contract_check.ab_eval', return_value='{}')
+    count_selectors(["input[placeholder='CP codes']"])
+    assert json.dumps(["input[placeholder='CP codes']"]) in ab_eval.call_args[0][0]
+
+
+@pytest.mark.parametrize('raw', ['not json', 'null', '[1, 2]'])
+def test_count_selectors_bad_output_counts_zero(mocker, raw):
+    mocker.patch('scripts.contract_check.ab_eval', return_value=raw)
+    assert count_selectors(['a', 'b']) == {'a': 0, 'b': 0}
+
+
+def test_check_phase_records_only_that_phase(mocker):
+    counts = {s: 100 for s, *_ in CONTRACTS}
+    count = mocker.patch(
+        'scripts.contract_check.count_selectors', side_effect=lambda sels: {s: counts[s] for s in sels}
+    )
+    hostname = [c for c in CONTRACTS if c[2] == 'hostname']
+    results = []
+    _check_phase(hostname, 'filter', results)
+
+    assert count.call_count == 1
+    assert {r['selector'] for r in results} == {c[0] for c in hostname if c[3] == 'filter'}
+    assert all(r['found'] for r in results)
+
+
+def test_check_phase_without_contracts_skips_eval(mocker):
+    count = mocker.patch('scripts.contract_check.count_selectors')
+    results = []
+    _check_phase([c for c in CONTRACTS if c[2] == 'geography'], 'filter', results)
+    count.assert_not_called()
+    assert results == []
+
+
+# ---------------------------------------------------------------------------
+# DOM fingerprint
+# ---------------------------------------------------------------------------
+def test_collect_signatures_single_eval(mocker):
+    ab_eval = mocker.patch(
+        'scripts.contract_check.ab_eval', return_value='{"akam-single-kpi": "akam-single-kpi[div.single-kpi__title]"}'
+    )
+    signatures = collect_signatures(['akam-single-kpi', '.missing'])
+    assert ab_eval.call_count == 1
+    assert signatures == {'akam-single-kpi': 'akam-single-kpi[div.single-kpi__title]', '.missing': ''}
+    assert 'els.length' not in ab_eval.call_args.args[0]
+
+
+def test_hash_signatures_is_order_independent():
+    a = hash_signatures({'x': '1|div', 'y': '2|span'})
+    b = hash_signatures({'y': '2|span', 'x': '1|div'})
+    assert a == b
+    assert len(a['hash']) == 16
+    assert set(a['subtrees']) == {'x', 'y'}
+
+
+def test_hash_signatures_detects_structure_change():
+    a = hash_signatures({'x': '1|div.kpi'})
+    b = hash_signatures({'x': '1|div.kpi-v2'})
+    assert a['hash'] != b['hash']
+
+
+def test_diff_fingerprint_reports_changed_added_removed():
+    old = hash_signatures({'same': 'a', 'changed': 'b', 'removed': 'c'})
+    new = hash_signatures({'same': 'a', 'changed': 'B', 'added': 'd'})
+    assert diff_fingerprint(old, new) == ['added', 'changed', 'removed']
+
+
+def test_diff_fingerprint_identical():
+    fp = hash_signatures({'x': 'a'})
+    assert diff_fingerprint(fp, fp) == []
+
+
+def test_fingerprint_save_and_load(tmp_path, mocker):
+    mocker.patch('scripts.contract_check.FINGERPRINT_PATH', tmp_path / 'contract_fingerprint.json')
+    assert load_fingerprint() is None
+    fp = hash_signatures({'x': 'a'})
+    save_fingerprint(fp)
+    stored = load_fingerprint()
+    assert stored['hash'] == fp['hash']
+    assert stored['subtrees'] == fp['subtrees']
+    assert 'timestamp' in stored
+
+
+# ---------------------------------------------------------------------------
+# ContractRecorder — counts taken during report runs
+# ---------------------------------------------------------------------------
+def test_contract_recorder_counts_each_phase_once(mocker):
+    count = mocker.patch('scripts.contract_check.count_selectors', side_effect=lambda sels: dict.fromkeys(sels, 100))
+    recorder = ContractRecorder()
+    recorder.record('hostname', 'filter')
+    recorder.record('hostname', 'filter')
+    recorder.record('hostname', 'data')
+    recorder.record('geography', 'filter')  # no geography filter contracts
+
+    assert count.call_count == 2
+    expected = {c[0] for c in CONTRACTS if c[2] == 'hostname'}
+    assert {r['selector'] for r in recorder.results} == expected
+
+
+def test_contract_recorder_output_is_diffable(tmp_path, mocker):
+    """Saved counts should load back and diff against a baseline like a normal run."""
+    mocker.patch('scripts.contract_check.count_selectors', side_effect=lambda sels: dict.fromkeys(sels, 100))
+    recorder = ContractRecorder()
+    recorder.record('geography', 'data')
+    counts_path = tmp_path / 'contract_counts.json'
+    recorder.save(counts_path)
+
+    baseline_path = tmp_path / 'baseline.json'
+    baseline_path.write_text(counts_path.read_text())
+    mocker.patch('scripts.contract_check.BASELINE_PATH', baseline_path)
+    assert diff_baseline(load_results(counts_path)) == 0
@@ -0,0 +1,120 @@
+"""Tests for cube module — fact conversion, coverage resolution and queries."""
+
+import pytest
+
+from scripts.config import ReportConfig
+from scripts.cube import Fact, add_facts, connect, day_ranges, facts_from_result, query, resolve_coverage
+
+HOST_CONFIG = ReportConfig(label='Main', cp_codes=['2', '1'], unit='TB')
+GEO_CONFIG = ReportConfig(label='Geo', cp_codes=['ALL'], unit='TB', geo_countries=['US', 'JP', 'TW'])
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(tmp_path / 'cube.db')
+    yield conn
+    conn.close()
+
+
+def _fact(day_start, day_end, value, metric='edge', cp_code='1,2', country=''):
+    return Fact('akamai', cp_code, '', country, '', metric, day_start, day_end, value)
+
+
+def test_facts_from_hostname_result_with_daily():
+    result = {
+        'date_range': {'start': '2026-01-25', 'end': '2026-01-26'},
+        'type': 'main',
+        'traffic': {'edge': 1.5, 'origin': 0.5, 'midgress': 0.0, 'offload': 66.67},
+        'unit': 'TB',
+        'daily': {'2026-01-25': {'edge': 700}, '2026-01-26': {'edge': 800}},
+    }
+    facts = facts_from_result(result, HOST_CONFIG)
+    assert _fact('2026-01-25', '2026-01-26', 1_500_000_000_000) in facts
+    assert _fact('2026-01-26', '2026-01-26', 800) in facts
+    assert not any(f.metric == 'offload' for f in facts)
+
+
+def test_facts_from_geography_result_records_absent_countries():
+    result = {
+        'date_range': {'start': '2026-01-25', 'end': '2026-01-31'},
+        'type': 'geography',
+        'traffic': {},
+        'unit': 'TB',
+        'geography': {'US': 2.0, 'JP': 1.0},
+    }
+    facts = {f.country: f.bytes for f in facts_from_result(result, GEO_CONFIG)}
+    assert facts == {'US': 2_000_000_000_000, 'JP': 1_000_000_000_000, 'TW': 0}
+
+
+def test_facts_from_cloudfront_result_spans_year_end():
+    result = {
+        'date_range': {'start': '2025-12-31', 'end': '2026-01-01'},
+        'type': 'cloudfront',
+        'distribution_id': 'E123',
+        'daily_bytes': {'12/31': 10, '01/01': 20},
+    }
+    assert [(f.day_start, f.bytes) for f in facts_from_result(result)] == [('2025-12-31', 10), ('2026-01-01', 20)]
+
+
+def test_resolve_coverage_keeps_wide_facts_and_reports_gaps():
+    facts = [
+        _fact('2026-01-01', '2026-01-07', 700),
+        _fact('2026-01-01', '2026-01-01', 90),
+        _fact('2026-01-08', '2026-01-14', 1400),
+    ]
+    chosen, missing = resolve_coverage(facts, '2026-01-01', '2026-01-16')
+    assert [f.bytes for f in chosen] == [700, 1400]
+    assert day_ranges(missing) == [('2026-01-15', '2026-01-16')]
+
+
+def test_resolve_coverage_closes_gaps_with_days():
+    week = [_fact('2026-01-01', '2026-01-07', 700)]
+    days = [_fact(f'2026-01-0{d}', f'2026-01-0{d}', d) for d in range(1, 10)]
+    chosen, missing = resolve_coverage(week + days, '2026-01-01', '2026-01-09')
+    assert [f.bytes for f in chosen] == [700, 8, 9]
+    assert missing == []
+    chosen, missing = resolve_coverage([_fact('2026-01-05', '2026-01-09', 5), *days[:6]], '2026-01-01', '2026-01-09')
+    assert [f.bytes for f in chosen] == [1, 2, 3, 4, 5]
+    assert missing == []
+
+
+def test_query_sums_weeks_into_month_and_converts_unit(conn):
+    add_facts(conn, [_fact('2026-01-01', '2026-01-07', 3 * 10**12), _fact('2026-01-08', '2026-01-14', 10**12)])
+    result = query(conn, '2026-01-01', '2026-01-14', unit='TB')
+    assert result == {'rows': [{'metric': 'edge', 'value': 4.0, 'unit': 'TB'}], 'missing': []}
+
+
+def test_query_groups_and_filters(conn):
+    add_facts(
+        conn,
+        [
+            _fact('2026-01-01', '2026-01-01', 5, country='US'),
+            _fact('2026-01-01', '2026-01-01', 7, country='JP'),
+            _fact('2026-01-02', '2026-01-02', 1, country='US'),
+            _fact('2026-01-01', '2026-01-01', 100, metric='origin', country='US'),
+        ],
+    )
+    result = query(conn, '2026-01-01', '2026-01-02', group_by=['country'], metric='edge')
+    assert result['rows'] == [{'country': 'JP', 'value': 7, 'unit': 'B'}, {'country': 'US', 'value': 6, 'unit': 'B'}]
+    assert result['missing'] == [
+        {
+            'source': 'akamai',
+            'cp_code': '1,2',
+            'hostname': '',
+            'country': 'JP',
+            'path': '',
+            'metric': 'edge',
+            'ranges': [('2026-01-02', '2026-01-02')],
+        }
+    ]
+
+
+def test_add_facts_replaces_same_span(conn):
+    add_facts(conn, [_fact('2026-01-01', '2026-01-01', 5)])
+    add_facts(conn, [_fact('2026-01-01', '2026-01-01', 8)])
+    assert query(conn, '2026-01-01', '2026-01-01')['rows'] == [{'metric': 'edge', 'value': 8, 'unit': 'B'}]
+
+
+def test_query_rejects_unknown_dimension(conn):
+    with pytest.raises(ValueError, match='Unknown dimensions'):
+        query(conn, '2026-01-01', '2026-01-02', group_by=['region'])
@@ -0,0 +1,49 @@
+"""Tests for daemon module — job schedule, report ranges and session refresh timing."""
+
+from datetime import datetime
+
+from scripts.config import ScheduledJob
+from scripts.daemon import UTC8, Schedule, load_cookies, next_run, refresh_time, report_range
+
+DAILY = ScheduledJob(name='daily', at='09:00', days=1)
+WEEKLY = ScheduledJob(name='weekly', at='09:30', days=7, weekdays=['mon'])
+
+
+def _at(text):
+    return datetime.fromisoformat(text).replace(tzinfo=UTC8)
+
+
+def test_report_range_ends_yesterday_utc8():
+    assert report_range(DAILY, _at('2026-02-02 09:00')) == ('2026-02-01', '2026-02-01')
+    assert report_range(WEEKLY, _at('2026-02-02 09:30')) == ('2026-01-26', '2026-02-01')
+
+
+def test_next_run_same_day_or_later_weekday():
+    assert next_run(DAILY, _at('2026-02-02 08:59')) == _at('2026-02-02 09:00')
+    assert next_run(DAILY, _at('2026-02-02 09:00')) == _at('2026-02-03 09:00')
+    # 2026-02-03 is a Tuesday; the next Monday is 2026-02-09
+    assert next_run(WEEKLY, _at('2026-02-03 10:00')) == _at('2026-02-09 09:30')
+
+
+def test_schedule_hands_out_due_jobs_once():
+    schedule = Schedule([DAILY, WEEKLY], _at('2026-02-02 08:00'))
+    assert schedule.due(_at('2026-02-02 08:30')) == []
+    assert schedule.seconds_until_next(_at('2026-02-02 08:30')) == 1800
+    due = schedule.due(_at('2026-02-02 09:45'))
+    assert due == [(DAILY, _at('2026-02-02 09:00')), (WEEKLY, _at('2026-02-02 09:30'))]
+    assert schedule.due(_at('2026-02-02 09:46')) == []
+    assert [at for _, at in schedule.upcoming()] == [_at('2026-02-03 09:00'), _at('2026-02-09 09:30')]
+
+
+def test_refresh_time_before_earliest_cookie_expiry():
+    cookies = [{'name': 'a', 'expires': 10_000}, {'name': 'b', 'expires': -1}, {'name': 'c', 'expires': 5_000}]
+    assert refresh_time(cookies, last_refresh=0, interval=1800) == 1800
+    assert refresh_time(cookies, last_refresh=4_000, interval=1800) == 4_700
+    assert refresh_time([{'name': 'b', 'expires': -1}], last_refresh=4_000, interval=1800) == 5_800
+    assert refresh_time(cookies, last_refresh=4_800, interval=1800) == 6_600
+
+
+def test_load_cookies_missing_or_bad_file(tmp_path):
+    assert load_cookies(str(tmp_path / 'missing.json')) == []
+    (tmp_path / 'state.json').write_text('{"cookies": [{"name": "a"}]}')
+    assert load_cookies(str(tmp_path / 'state.json')) == [{'name': 'a'}]
@@ -1,8 +1,27 @@
 """Tests for data_extract module."""
 
+from pathlib import Path
+
 import pytest
 
-from scripts.data_extract import build_report_output, bytes_to_tb, convert_unit, parse_traffic_value
+from scripts.data_extract import (
+    aggregate_series_daily,
+    build_report_output,
+    bytes_to_tb,
+    chart_series_bytes,
+    convert_unit,
+    iter_geography_rows,
+    parse_cp_code_breakdown,
+    parse_csv_table,
+    parse_traffic_value,
+    read_geography_csv,
+    select_geography,
+    total_for_range,
+    traffic_for_cp_codes,
+    traffic_from_bytes,
+)
+
+MOCK_GEO_CSV = Path(__file__).resolve().parent / 'mock_site' / 'exports' / 'geography.csv'
 
 
 @pytest.mark.parametrize(
@@ -198,3 +217,153 @@ def test_build_report_output_none_geography_excluded():
         unit='TB',
     )
     assert 'geography' not in output
+
+
+# ---------------------------------------------------------------------------
+# select_geography / iter_geography_rows
+# ---------------------------------------------------------------------------
+def test_select_geography_keeps_configured_order():
+    rows = {'ID': 168_776_644_787_204, 'TW': 31_398_058_511, 'SG': 5_234_567_890}
+    geo = select_geography(rows, ['SG', 'XX', 'ID'])
+    assert list(geo) == ['SG', 'ID']
+    assert geo['ID'] == 168.78
+
+
+def test_select_geography_all_countries():
+    rows = {'ID': 2_000_000_000_000, 'TW': 1_000_000_000_000}
+    assert select_geography(rows, ['ALL']) == {'ID': 2.0, 'TW': 1.0}
+
+
+def test_iter_geography_rows_drains_buffer_in_batches(mocker):
+    mocker.patch('scripts.data_extract._collect_geography_rows', return_value=3)
+    ab_eval = mocker.patch(
+        'scripts.data_extract.ab_eval',
+        side_effect=['[["ID", "1,000"], ["TW", "2,000"]]', '[["SG", "3,000"]]'],
+    )
+    rows = list(iter_geography_rows(batch_size=2))
+    assert rows == [('ID', 1000), ('TW', 2000), ('SG', 3000)]
+    assert ab_eval.call_count == 2
+    assert 'splice(0, 2)' in ab_eval.call_args_list[0][0][0]
+
+
+def test_iter_geography_rows_empty_table(mocker):
+    mocker.patch('scripts.data_extract._collect_geography_rows', return_value=0)
+    ab_eval = mocker.patch('scripts.data_extract.ab_eval')
+    assert list(iter_geography_rows()) == []
+    ab_eval.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# parse_csv_table / read_geography_csv
+# ---------------------------------------------------------------------------
+def test_parse_csv_table_skips_preamble_and_blank_rows():
+    lines = ['Traffic by Geography', '', 'country/area,BYTES', 'ID,"1,000"', ',5', 'TW,', 'JP,N/A', 'KR,-', 'SG,2500']
+    assert list(parse_csv_table(lines, 'Country/area', 'Bytes')) == [('ID', 1000), ('SG', 2500)]
+
+
+def test_parse_csv_table_keeps_large_counts_exact_and_rejects_other_values():
+    big = 2**53 + 1
+    assert list(parse_csv_table(['Country/area,Bytes', f'US,"{big:,}"'], 'Country/area', 'Bytes')) == [('US', big)]
+    with pytest.raises(ValueError, match='Unexpected Bytes value'):
+        list(parse_csv_table(['Country/area,Bytes', 'US,1.2 TB'], 'Country/area', 'Bytes'))
+
+
+def test_parse_csv_table_missing_header():
+    with pytest.raises(ValueError, match='not found'):
+        list(parse_csv_table(['Region,Bytes', 'ID,1'], 'Country/area', 'Bytes'))
+
+
+def test_read_geography_csv_mock_export():
+    geo = read_geography_csv(MOCK_GEO_CSV, ['TH', 'ID'])
+    assert geo == {'TH': bytes_to_tb(80_000_000_000), 'ID': bytes_to_tb(168_776_644_787_204)}
+    assert len(read_geography_csv(MOCK_GEO_CSV, ['ALL'])) == 8
+
+
+# ---------------------------------------------------------------------------
+# traffic_from_bytes / traffic_for_cp_codes
+# ---------------------------------------------------------------------------
+BREAKDOWN = {
+    '960172': {'edge': 100_000_000_000_000, 'origin': 30_000_000_000_000, 'midgress': 20_000_000_000},
+    '578716': {'edge': 50_000_000_000_000, 'origin': 21_250_000_000_000, 'midgress': 13_890_000_000},
+    '1415558': {'edge': 20_820_000_000_000, 'origin': 10_000_000_000_000, 'midgress': 10_000_000_000},
+}
+
+
+def test_traffic_from_bytes_zero_edge():
+    assert traffic_from_bytes(0, 0, 0, 'TB') == {'edge': 0.0, 'origin': 0.0, 'midgress': 0.0, 'offload': 0.0}
+
+
+def test_traffic_for_cp_codes_subset():
+    traffic = traffic_for_cp_codes(BREAKDOWN, ['960172', '578716'], 'TB')
+    assert traffic == {'edge': 150.0, 'origin': 51.25, 'midgress': 0.03, 'offload': 65.83}
+
+
+def test_traffic_for_cp_codes_all_matches_cards():
+    traffic = traffic_for_cp_codes(BREAKDOWN, ['ALL'], 'TB')
+    assert traffic['edge'] == 170.82
+    assert traffic['origin'] == 61.25
+    assert traffic['offload'] == 64.14
+
+
+def test_traffic_for_cp_codes_missing_code():
+    with pytest.raises(KeyError, match='999'):
+        traffic_for_cp_codes(BREAKDOWN, ['960172', '999'], 'TB')
+
+
+# ---------------------------------------------------------------------------
+# aggregate_series_daily / total_for_range
+# ---------------------------------------------------------------------------
+HOUR_MS = 3600 * 1000
+# 2026-01-24T15:00:00Z = 23:00 on 01/24 in UTC+8
+T0 = 1769266800000
+
+
+def test_chart_series_bytes_maps_names_and_scales_units(capsys):
+    raw = [
+        {'name': 'Edge Traffic', 'unit': 'Traffic (TB)', 'points': [[T0, 2.0], [T0 + HOUR_MS, None]]},
+        {'name': 'Origin', 'unit': '', 'points': [[T0, 5.0]]},
+        {'name': 'Offload', 'unit': '%', 'points': [[T0, 90.0]]},
+        {'name': 'Edge', 'unit': 'bps', 'points': [[T0, 1.0]]},
+    ]
+    assert chart_series_bytes(raw) == {'edge': [[T0, 2e12], [T0 + HOUR_MS, None]], 'origin': [[T0, 5.0]]}
+    out = capsys.readouterr().out
+    assert "Ignoring series 'Offload'" in out
+    assert "Ignoring series 'Edge' (bps)" in out
+
+
+def test_aggregate_series_daily_splits_on_utc8_midnight():
+    series = {'edge': [[T0, 1.0], [T0 + HOUR_MS, 2.0], [T0 + 2 * HOUR_MS, 3.0]], 'origin': [[T0 + HOUR_MS, 5.0]]}
+    assert aggregate_series_daily(series) == {
+        '2026-01-24': {'edge': 1},
+        '2026-01-25': {'edge': 5, 'origin': 5},
+    }
+
+
+def test_aggregate_series_daily_skips_gaps():
+    assert aggregate_series_daily({'edge': [[T0, None]]}) == {}
+
+
+def test_total_for_range_sub_range():
+    daily = {'2026-01-25': {'edge': 10}, '2026-01-26': {'edge': 20, 'origin': 1}, '2026-01-27': {'edge': 40}}
+    assert total_for_range(daily, '2026-01-26', '2026-01-27') == {'edge': 60, 'origin': 1}
+    assert total_for_range(daily, '2026-02-01', '2026-02-07') == {}
+
+
+def test_build_report_output_includes_daily():
+    daily = {'2026-01-25': {'edge': 10}}
+    output = build_report_output('a', 'A', '2026-01-25', '2026-01-25', {}, 'TB', daily=daily)
+    assert output['daily'] == daily
+    assert 'daily' not in build_report_output('a', 'A', '2026-01-25', '2026-01-25', {}, 'TB')
+
+
+def test_parse_cp_code_breakdown_grouped_bytes():
+    rows = [['960172', '1,000,000', '250', '0']]
+    assert parse_cp_code_breakdown(rows) == {'960172': {'edge': 1_000_000, 'origin': 250, 'midgress': 0}}
+
+
+@pytest.mark.parametrize(
+    'row', [['960172', '1.5 TB', '0', '0'], ['Total', '1', '2', '3'], ['960172', '1,00', '0', '0']]
+)
+def test_parse_cp_code_breakdown_rejects_unexpected_cells(row):
+    with pytest.raises(ValueError, match='Unexpected CP code breakdown row'):
+        parse_cp_code_breakdown([row])
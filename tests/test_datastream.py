@@ -0,0 +1,97 @@
+"""Tests for datastream module — record parsing, incremental ingest and report outputs."""
+
+import gzip
+import json
+
+import pytest
+
+from scripts.config import REPORT_TYPES, ReportConfig
+from scripts.cube import connect
+from scripts.datastream import geography_report, hostname_report, ingest, offload_by_cp_code, parse_records
+
+# 2026-01-24T16:00:00Z = 2026-01-25 00:00 UTC+8
+DAY_START = 1769270400
+
+
+def _record(offset, cp, size, cache, country='US', host='a.example.com'):
+    rec = {'reqTimeSec': str(DAY_START + offset), 'cp': cp, 'reqHost': host, 'country': country}
+    return json.dumps({**rec, 'totalBytes': str(size), 'cacheStatus': str(cache)}) + '\n'
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setitem(REPORT_TYPES, 'main', ReportConfig(label='Main', cp_codes=['111'], unit='B'))
+    monkeypatch.setitem(
+        REPORT_TYPES, 'geography', ReportConfig(label='Geo', cp_codes=['ALL'], unit='TB', geo_countries=['US', 'JP'])
+    )
+    conn = connect(tmp_path / 'cube.db')
+    yield conn
+    conn.close()
+
+
+def test_parse_records_groups_by_utc8_day_and_stops_at_partial_line():
+    lines = [
+        _record(-1, 111, 10, 1).encode(),
+        _record(0, 111, 30, 0).encode(),
+        b'not json\n',
+        _record(5, 111, 99, 0).encode().rstrip(b'\n'),
+    ]
+    groups, consumed = parse_records(lines)
+    assert groups == {
+        ('2026-01-24', '111', 'a.example.com', 'US'): [10, 0],
+        ('2026-01-25', '111', 'a.example.com', 'US'): [30, 30],
+    }
+    assert consumed == sum(len(line) for line in lines[:3])
+
+
+def test_ingest_resumes_from_offsets(conn, tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    log = logs / 'ds2.log'
+    log.write_text(_record(0, 111, 100, 1) + _record(60, 111, 50, 0))
+    assert ingest(conn, logs, workers=1) == 1
+    assert ingest(conn, logs, workers=1) == 0
+    with log.open('a') as f:
+        f.write(_record(120, 111, 50, 0) + _record(180, 222, 7, 1, country='JP'))
+    assert ingest(conn, logs, workers=1) == 1
+
+    output = hostname_report(conn, 'main', '2026-01-25', '2026-01-25')
+    assert output['traffic'] == {'edge': 200, 'origin': 100, 'midgress': 0, 'offload': 50.0}
+    assert output['daily'] == {'2026-01-25': {'edge': 200, 'origin': 100}}
+    assert offload_by_cp_code(conn, '2026-01-25', '2026-01-25') == {'111': 50.0, '222': 100.0}
+
+
+def test_geography_report_and_missing_days(conn, tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    (logs / 'ds2.log').write_text(_record(0, 111, 2 * 10**12, 1) + _record(1, 222, 10**12, 1, country='JP'))
+    ingest(conn, logs, workers=1)
+    assert geography_report(conn, '2026-01-25', '2026-01-25')['geography'] == {'US': 2.0, 'JP': 1.0}
+    with pytest.raises(LookupError, match='1 day'):
+        geography_report(conn, '2026-01-25', '2026-01-26')
+
+
+def test_ingest_gzip_waits_until_complete(conn, tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    data = gzip.compress((_record(0, 111, 100, 1) + _record(60, 111, 50, 0)).encode())
+    log = logs / 'ds2.log.gz'
+    log.write_bytes(data[: len(data) // 2])
+    ingest(conn, logs, workers=1)
+    with pytest.raises(LookupError):
+        hostname_report(conn, 'main', '2026-01-25', '2026-01-25')
+    log.write_bytes(data)
+    assert ingest(conn, logs, workers=1) == 1
+    assert ingest(conn, logs, workers=1) == 0
+    assert hostname_report(conn, 'main', '2026-01-25', '2026-01-25')['traffic']['edge'] == 150
+
+
+def test_ingest_rereads_truncated_file(conn, tmp_path):
+    logs = tmp_path / 'logs'
+    logs.mkdir()
+    log = logs / 'ds2.log'
+    log.write_text(_record(0, 111, 100, 1) + _record(60, 111, 50, 0))
+    ingest(conn, logs, workers=1)
+    log.write_text(_record(120, 111, 7, 1))
+    ingest(conn, logs, workers=1)
+    assert hostname_report(conn, 'main', '2026-01-25', '2026-01-25')['traffic']['edge'] == 157
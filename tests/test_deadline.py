@@ -0,0 +1,45 @@
+"""Tests for deadline module — nested budgets, trimmed limits and pauses."""
+
+import pytest
+
+from scripts.deadline import DeadlineExceeded, deadline, no_deadline, pause, remaining
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch('scripts.deadline.time.monotonic', side_effect=lambda: now[0])
+    mocker.patch('scripts.deadline.time.sleep', side_effect=lambda s: now.__setitem__(0, now[0] + s))
+    return now
+
+
+def test_remaining_without_budget_returns_limit(clock):
+    assert remaining(120) == 120
+
+
+def test_nested_budget_keeps_earlier_end(clock):
+    with deadline(10):
+        with deadline(60):
+            assert remaining(120) == 10
+        with deadline(3):
+            assert remaining(120) == 3
+        assert remaining(5) == 5
+    assert remaining(120) == 120
+
+
+def test_remaining_raises_when_spent(clock):
+    with deadline(10):
+        clock[0] += 10
+        with pytest.raises(DeadlineExceeded):
+            remaining(1)
+        with no_deadline():
+            assert remaining(1) == 1
+
+
+def test_pause_is_trimmed_then_raises(clock):
+    with deadline(2):
+        pause(1.5)
+        assert clock[0] == 101.5
+        with pytest.raises(DeadlineExceeded):
+            pause(3)
+        assert clock[0] == 102.0
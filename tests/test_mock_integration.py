@@ -11,7 +11,20 @@ import pytest
 
 from scripts.browser_helpers import ab_eval, run_ab
 from scripts.calendar_nav import get_displayed_months
-from scripts.data_extract import bytes_to_tb, extract_geography_table, extract_traffic_cards
+from scripts.config import ReportConfig
+from scripts.data_extract import (
+    aggregate_series_daily,
+    bytes_to_tb,
+    export_table_csv,
+    extract_chart_series,
+    extract_cp_code_breakdown,
+    extract_geography_table,
+    extract_traffic_cards,
+    iter_geography_rows,
+    read_geography_csv,
+    traffic_for_cp_codes,
+)
+from scripts.report_api import build_report_url, fetch_reports, traffic_from_response
 
 pytestmark = pytest.mark.integration
 
@@ -45,6 +58,21 @@ class TestMockDataExtract:
         assert cards['midgress'] == {'value': 43.89, 'unit': 'GB'}
         assert cards['offload'] == {'value': 64.14, 'unit': '%'}
 
+    def test_chart_series_daily(self, mock_browser):
+        daily = aggregate_series_daily(extract_chart_series())
+        assert list(daily) == [f'2026-01-{d}' for d in range(25, 32)]
+        assert daily['2026-01-25'] == {'edge': 20_000_000_000_000, 'origin': 7_000_000_000_000}
+        assert bytes_to_tb(sum(day['edge'] for day in daily.values())) == extract_traffic_cards()['edge']['value']
+
+    def test_cp_code_breakdown_sums_to_cards(self, mock_browser):
+        breakdown = extract_cp_code_breakdown()
+        assert set(breakdown) == {'960172', '578716', '1415558', '1421896'}
+        traffic = traffic_for_cp_codes(breakdown, ['ALL'], 'TB')
+        cards = extract_traffic_cards()
+        assert traffic['edge'] == cards['edge']['value']
+        assert traffic['origin'] == cards['origin']['value']
+        assert traffic['offload'] == cards['offload']['value']
+
     def test_extract_geography_table(self, mock_browser):
         ab_eval("window.location.hash = '#/predefined/traffic-by-geography'")
         time.sleep(1)
@@ -53,6 +81,41 @@ class TestMockDataExtract:
         assert geo['TW'] == bytes_to_tb(31_398_058_511)
         assert geo['SG'] == bytes_to_tb(5_234_567_890)
 
+    def test_extract_geography_table_filter_beyond_first_page(self, mock_browser):
+        ab_eval("window.location.hash = '#/predefined/traffic-by-geography'")
+        time.sleep(1)
+        geo = extract_geography_table(['TH', 'ID'])
+        assert geo == {'TH': bytes_to_tb(80_000_000_000), 'ID': bytes_to_tb(168_776_644_787_204)}
+
+    def test_extract_geography_table_all_countries(self, mock_browser):
+        ab_eval("window.location.hash = '#/predefined/traffic-by-geography'")
+        time.sleep(1)
+        rows = list(iter_geography_rows(batch_size=3))
+        assert [country for country, _ in rows] == ['ID', 'TW', 'SG', 'US', 'JP', 'KR', 'MY', 'TH']
+        assert dict(rows)['US'] == 2_500_000_000_000
+        geo = extract_geography_table(['ALL'])
+        assert len(geo) == 8
+
+    def test_export_geography_csv(self, mock_browser, tmp_path):
+        ab_eval("window.location.hash = '#/predefined/traffic-by-geography'")
+        time.sleep(1)
+        path = export_table_csv(tmp_path / 'geography.csv')
+        assert read_geography_csv(path, ['ALL']) == extract_geography_table(['ALL'])
+
+    def test_fetch_reports_from_page(self, mock_browser):
+        config = ReportConfig(label='Mock', cp_codes=['960172'], unit='TB')
+        docs = fetch_reports(
+            {
+                'hostname': build_report_url('hostname', config, '2026-01-25', '2026-01-31'),
+                'missing': '/reporting-api/v1/reports/missing/versions/1/report-data',
+            }
+        )
+        assert docs['missing'] is None
+        cards = extract_traffic_cards()
+        traffic = traffic_from_response(docs['hostname'], 'TB')
+        assert traffic['edge'] == cards['edge']['value']
+        assert traffic['offload'] == cards['offload']['value']
+
 
 # ---------------------------------------------------------------------------
 # Calendar
@@ -0,0 +1,71 @@
+"""Tests for planner module — step model, ordering and plan output."""
+
+from scripts.planner import (
+    EXHAUSTIVE_LIMIT,
+    FilterState,
+    PendingReport,
+    format_plan,
+    plan_cost,
+    plan_in_order,
+    plan_reports,
+    report_steps,
+)
+
+DATES = ('2026-01-25', '2026-01-31')
+HOST, GEO = 'Traffic by Hostname', 'Traffic by Geography'
+
+
+def test_report_steps_fresh_browser():
+    steps = report_steps(FilterState(), PendingReport('a', HOST, ('1',)), DATES)
+    assert steps == ['navigate', 'open_filters', 'date_range', 'cp_codes', 'apply', 'extract', 'screenshot']
+
+
+def test_report_steps_same_page_new_cp_codes():
+    state = FilterState(HOST, DATES, frozenset({'1'}))
+    steps = report_steps(state, PendingReport('b', HOST, ('2',)), DATES)
+    assert steps == ['open_filters', 'cp_codes', 'apply', 'extract', 'screenshot']
+
+
+def test_report_steps_filters_already_applied():
+    state = FilterState(HOST, DATES, frozenset({'1', '2'}))
+    steps = report_steps(state, PendingReport('c', HOST, ('2', '1'), screenshot=False), DATES)
+    assert steps == ['extract']
+
+
+def test_plan_groups_pages_and_cp_code_sets():
+    reports = [
+        PendingReport('a', HOST, ('1',)),
+        PendingReport('geo', GEO, ('ALL',)),
+        PendingReport('b', HOST, ('2',)),
+        PendingReport('c', HOST, ('1',)),
+    ]
+    plan = plan_reports(reports, DATES)
+    order = [item.report.report_type for item in plan]
+    assert order.index('geo') in (0, 3)
+    assert abs(order.index('a') - order.index('c')) == 1
+    assert plan_cost(plan) < plan_cost(plan_in_order(reports, DATES))
+
+
+def test_plan_keeps_order_on_ties():
+    reports = [PendingReport('a', HOST, ('1',)), PendingReport('b', HOST, ('2',))]
+    assert [item.report.report_type for item in plan_reports(reports, DATES)] == ['a', 'b']
+
+
+def test_plan_greedy_for_large_runs():
+    reports = [PendingReport(f'r{i}', HOST if i % 2 else GEO, (str(i % 3),)) for i in range(EXHAUSTIVE_LIMIT + 3)]
+    plan = plan_reports(reports, DATES)
+    assert sorted(item.report.report_type for item in plan) == sorted(r.report_type for r in reports)
+    pages = [item.report.page for item in plan]
+    assert sum(a != b for a, b in zip(pages, pages[1:])) == 1
+
+
+def test_plan_empty():
+    assert plan_reports([], DATES) == []
+
+
+def test_format_plan():
+    reports = [PendingReport('a', HOST, ('1',))]
+    text = format_plan(plan_reports(reports, DATES), baseline=plan_in_order(reports, DATES))
+    assert '1. a' in text
+    assert 'Total:' in text
+    assert 'Configured order:' in text
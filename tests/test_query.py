@@ -0,0 +1,94 @@
+"""Tests for query module — report outputs from the cube and missing ranges."""
+
+import pytest
+
+from scripts.config import CLOUDFRONT_CONFIG, REPORT_TYPES, ReportConfig
+from scripts.cube import Fact, add_facts, connect
+from scripts.query import answer, fill_plan
+
+TB = 10**12
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setitem(REPORT_TYPES, 'main', ReportConfig(label='Main', cp_codes=['1', '2'], unit='TB'))
+    monkeypatch.setitem(
+        REPORT_TYPES, 'geography', ReportConfig(label='Geo', cp_codes=['ALL'], unit='TB', geo_countries=['US', 'JP'])
+    )
+    conn = connect(tmp_path / 'cube.db')
+    yield conn
+    conn.close()
+
+
+def _week(start, end, edge, origin, midgress=0):
+    return [
+        Fact('akamai', '1,2', '', '', '', metric, start, end, value)
+        for metric, value in (('edge', edge), ('origin', origin), ('midgress', midgress))
+    ]
+
+
+def test_hostname_month_from_weeks(conn):
+    add_facts(conn, _week('2026-01-01', '2026-01-07', 3 * TB, TB) + _week('2026-01-08', '2026-01-14', TB, TB))
+    results, missing = answer(conn, ['main'], '2026-01-01', '2026-01-14')
+    assert missing == {}
+    assert results == [
+        {
+            'date_range': {'start': '2026-01-01', 'end': '2026-01-14'},
+            'type': 'main',
+            'label': 'Main',
+            'traffic': {'edge': 4.0, 'origin': 2.0, 'midgress': 0.0, 'offload': 50.0},
+            'unit': 'TB',
+        }
+    ]
+
+
+def test_hostname_reports_missing_days(conn):
+    add_facts(conn, _week('2026-01-01', '2026-01-07', 3 * TB, TB))
+    results, missing = answer(conn, ['main'], '2026-01-01', '2026-01-10')
+    assert results == []
+    assert missing == {'main': [('2026-01-08', '2026-01-10')]}
+
+
+def test_geography_needs_every_configured_country(conn):
+    add_facts(conn, [Fact('akamai', 'ALL', '', 'US', '', 'edge', '2026-01-01', '2026-01-07', 2 * TB)])
+    assert answer(conn, ['geography'], '2026-01-01', '2026-01-07')[1] == {'geography': [('2026-01-01', '2026-01-07')]}
+    add_facts(conn, [Fact('akamai', 'ALL', '', 'JP', '', 'edge', '2026-01-01', '2026-01-07', 0)])
+    results, missing = answer(conn, ['geography'], '2026-01-01', '2026-01-07')
+    assert missing == {}
+    assert results[0]['geography'] == {'US': 2.0, 'JP': 0.0}
+
+
+def test_cloudfront_daily_bytes(conn):
+    dist = CLOUDFRONT_CONFIG.distribution_id
+    add_facts(conn, [Fact('cloudfront', dist, '', '', '', 'edge', d, d, 5) for d in ('2026-01-01', '2026-01-03')])
+    assert answer(conn, ['cloudfront'], '2026-01-01', '2026-01-03')[1] == {'cloudfront': [('2026-01-02', '2026-01-02')]}
+    results, _ = answer(conn, ['cloudfront'], '2026-01-03', '2026-01-03')
+    assert results[0]['daily_bytes'] == {'01/03': 5}
+
+
+def test_logs_answer_when_reports_leave_gaps(conn):
+    add_facts(conn, _week('2026-01-01', '2026-01-07', 3 * TB, TB))
+    days = [f'2026-01-{d:02d}' for d in range(1, 11)]
+    add_facts(conn, [Fact('datastream', '2', 'a.example', 'US', '', 'edge', d, d, TB) for d in days[:-1]])
+    assert answer(conn, ['main'], '2026-01-01', '2026-01-10')[1] == {'main': [('2026-01-08', '2026-01-10')]}
+
+    add_facts(conn, [Fact('datastream', '1', 'a.example', 'JP', '', 'edge', days[-1], days[-1], TB)])
+    results, missing = answer(conn, ['main', 'geography'], '2026-01-01', '2026-01-10')
+    assert missing == {}
+    assert results[0]['traffic']['edge'] == 10.0
+    assert results[1]['geography'] == {'US': 9.0, 'JP': 1.0}
+
+
+def test_cloudfront_logs_answer_missing_days(conn):
+    dist = CLOUDFRONT_CONFIG.distribution_id
+    add_facts(conn, [Fact('cloudfront', dist, '', '', '', 'edge', '2026-01-01', '2026-01-01', 5)])
+    logs = [('2026-01-01', 'US', 3), ('2026-01-01', '', 4), ('2026-01-02', 'JP', 6)]
+    add_facts(conn, [Fact('cloudfront-logs', dist, '', c, '/img', 'edge', d, d, v) for d, c, v in logs])
+    results, missing = answer(conn, ['cloudfront'], '2026-01-01', '2026-01-02')
+    assert missing == {}
+    assert results[0]['daily_bytes'] == {'01/01': 7, '01/02': 6}
+
+
+def test_fill_plan_groups_types_by_range():
+    missing = {'a': [('2026-01-08', '2026-01-10')], 'b': [('2026-01-08', '2026-01-10'), ('2026-01-01', '2026-01-01')]}
+    assert fill_plan(missing) == {('2026-01-01', '2026-01-01'): ['b'], ('2026-01-08', '2026-01-10'): ['a', 'b']}
@@ -1,6 +1,7 @@
 """Tests for refresh_session module — _check_logged_in and _save_state error paths."""
 
 import json
+import os
 
 import pytest
 
@@ -59,3 +60,21 @@ def test_save_state_missing_data_key(mocker, tmp_path):
     state = json.loads((tmp_path / 'state.json').read_text())
     assert state['cookies'] == []
     assert state['origins'][0]['localStorage'] == []
+
+
+def test_save_state_replaces_file_atomically(mocker, tmp_path):
+    """The state file is renamed into place, private, with no temp file left behind."""
+    path = tmp_path / 'state.json'
+    path.write_text('{"cookies": [{"name": "old"}]}')
+    cookies_json = json.dumps({'data': {'cookies': [{'name': 'new'}]}})
+    mocker.patch('scripts.refresh_session.exec_ab', side_effect=[cookies_json, '{}'])
+    mocker.patch('scripts.refresh_session.STATE_FILE', str(path))
+    replace = mocker.spy(os, 'replace')
+
+    from scripts.refresh_session import _save_state
+
+    _save_state()
+    replace.assert_called_once()
+    assert json.loads(path.read_text())['cookies'] == [{'name': 'new'}]
+    assert path.stat().st_mode & 0o777 == 0o600
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
@@ -0,0 +1,78 @@
+"""Tests for report_api module."""
+
+import json
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from scripts.config import ReportConfig
+from scripts.data_extract import bytes_to_tb
+from scripts.report_api import (
+    build_report_url,
+    fetch_reports,
+    geography_from_response,
+    sum_metrics,
+    traffic_from_response,
+)
+
+MOCK_REPORTS = Path(__file__).resolve().parent / 'mock_site' / 'reporting-api' / 'v1' / 'reports'
+
+
+def _mock_response(report: str) -> dict:
+    return json.loads((MOCK_REPORTS / report / 'versions' / '1' / 'report-data').read_text())
+
+
+def test_build_report_url_cp_codes_and_dates():
+    config = ReportConfig(label='A', cp_codes=['123456', '789012'], unit='TB')
+    url = urlsplit(build_report_url('hostname', config, '2026-01-25', '2026-01-31'))
+    assert url.path == '/reporting-api/v1/reports/hostname-traffic/versions/1/report-data'
+    params = parse_qs(url.query)
+    assert params['start'] == ['2026-01-24T16:00:00Z']
+    assert params['end'] == ['2026-01-31T16:00:00Z']
+    assert params['objectIds'] == ['123456,789012']
+    assert params['metrics'] == ['edgeBytesSum,originBytesSum,midgressBytesSum']
+
+
+def test_build_report_url_all_cp_codes():
+    config = ReportConfig(label='Geo', cp_codes=['ALL'], unit='TB', geo_countries=['ID'])
+    params = parse_qs(urlsplit(build_report_url('geography', config, '2026-01-25', '2026-01-31')).query)
+    assert params['allObjectIds'] == ['true']
+    assert 'objectIds' not in params
+
+
+def test_sum_metrics_missing_values():
+    rows = [{'a': '1', 'b': 2}, {'a': None}]
+    assert sum_metrics(rows, ['a', 'b']) == {'a': 1.0, 'b': 2.0}
+
+
+def test_traffic_from_response_matches_kpi_cards():
+    traffic = traffic_from_response(_mock_response('hostname-traffic'), 'TB')
+    assert traffic == {'edge': 170.82, 'origin': 61.25, 'midgress': 0.04, 'offload': 64.14}
+
+
+def test_traffic_from_response_no_edge_traffic():
+    assert traffic_from_response({'data': []}, 'GB')['offload'] == 0.0
+
+
+def test_geography_from_response():
+    doc = _mock_response('geography-traffic')
+    assert geography_from_response(doc, ['TH', 'ID']) == {
+        'TH': bytes_to_tb(80_000_000_000),
+        'ID': bytes_to_tb(168_776_644_787_204),
+    }
+    assert len(geography_from_response(doc, ['ALL'])) == 8
+
+
+def test_fetch_reports_marks_failures(mocker):
+    raw = {'a': {'status': 200, 'body': {'data': []}}, 'b': {'status': 403}}
+    ab_eval = mocker.patch('scripts.report_api.ab_eval', return_value=json.dumps(raw))
+    docs = fetch_reports({'a': '/x?1', 'b': '/x?2', 'c': '/x?3'})
+    assert docs == {'a': {'data': []}, 'b': None, 'c': None}
+    assert ab_eval.call_count == 1
+    assert 'Promise.all' in ab_eval.call_args[0][0]
+
+
+def test_geography_from_response_bad_shape():
+    with pytest.raises(KeyError):
+        geography_from_response({}, ['ID'])
@@ -0,0 +1,165 @@
+"""Tests for service module — cached answers, request coalescing and the HTTP endpoints."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from scripts.config import CLOUDFRONT_CONFIG
+from scripts.cube import Fact, add_facts, connect
+from scripts.deadline import pause
+from scripts.service import ReportService, make_handler, parse_request, percentile
+
+DIST = CLOUDFRONT_CONFIG.distribution_id
+
+
+def _cloudfront(start_date, end_date, daily_bytes):
+    return {
+        'date_range': {'start': start_date, 'end': end_date},
+        'type': 'cloudfront',
+        'distribution_id': DIST,
+        'daily_bytes': daily_bytes,
+    }
+
+
+class FakePool:
+    """Runs each submitted task on its own thread once release is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.fetched = []
+
+    def submit(self, task):
+        threading.Thread(target=task, args=(None,)).start()
+
+    def fetch(self, types, start_date, end_date, browser):
+        self.release.wait(5)
+        self.fetched.append((types, start_date, end_date))
+        return [_cloudfront(start_date, end_date, {'01/02': 7})]
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'cube.db')
+    conn = connect(path)
+    add_facts(conn, [Fact('cloudfront', DIST, '', '', '', 'edge', '2026-01-01', '2026-01-01', 5)])
+    conn.close()
+    return path
+
+
+def test_cached_request_does_not_fetch(db):
+    pool = FakePool()
+    service = ReportService(pool.submit, db, pool.fetch)
+    response = service.request(['cloudfront'], '2026-01-01', '2026-01-01')
+    assert response['cached'] is True
+    assert response['results'][0]['daily_bytes'] == {'01/01': 5}
+    assert pool.fetched == []
+    assert service.stats()['cache_hits'] == 1
+
+
+def test_identical_requests_share_one_fetch(db):
+    pool = FakePool()
+    service = ReportService(pool.submit, db, pool.fetch)
+    responses = []
+    callers = [
+        threading.Thread(target=lambda: responses.append(service.request(['cloudfront'], '2026-01-01', '2026-01-02')))
+        for _ in range(3)
+    ]
+    for caller in callers:
+        caller.start()
+    while service.stats()['coalesced'] < 2:
+        threading.Event().wait(0.005)
+    assert service.stats()['in_flight'] == 1
+    pool.release.set()
+    for caller in callers:
+        caller.join(5)
+    assert pool.fetched == [(['cloudfront'], '2026-01-02', '2026-01-02')]
+    assert [r['results'][0]['daily_bytes'] for r in responses] == [{'01/01': 5, '01/02': 7}] * 3
+    stats = service.stats()
+    assert (stats['fetches'], stats['coalesced'], stats['in_flight'], stats['queued']) == (1, 2, 0, 0)
+
+
+def test_requests_for_reordered_types_share_one_fetch(db):
+    pool = FakePool()
+    service = ReportService(pool.submit, db, pool.fetch)
+    callers = [
+        threading.Thread(target=service.request, args=(types, '2026-01-01', '2026-01-02'))
+        for types in (['cloudfront', 'geography'], ['geography', 'cloudfront'])
+    ]
+    for caller in callers:
+        caller.start()
+    while service.stats()['coalesced'] < 1:
+        threading.Event().wait(0.005)
+    pool.release.set()
+    for caller in callers:
+        caller.join(5)
+    assert (service.stats()['fetches'], service.stats()['coalesced']) == (1, 1)
+
+
+def test_fetch_error_reaches_waiting_requests(db):
+    def fail(types, start_date, end_date, browser):
+        raise RuntimeError('browser gone')
+
+    service = ReportService(lambda task: task(None), db, fail)
+    with pytest.raises(RuntimeError, match='browser gone'):
+        service.request(['cloudfront'], '2026-01-02', '2026-01-02')
+    assert service.stats()['errors'] == 1
+    assert service.stats()['in_flight'] == 0
+
+
+def test_request_times_out_when_no_worker_runs_the_fetch(db):
+    service = ReportService(lambda task: None, db)
+    with pytest.raises(TimeoutError, match='within 0.05s'):
+        service.request(['cloudfront'], '2026-01-02', '2026-01-02', timeout=0.05)
+    assert service.stats()['errors'] == 1
+
+
+def test_fill_runs_under_the_request_deadline(db):
+    def fetch(types, start_date, end_date, browser):
+        pause(5)
+
+    service = ReportService(lambda task: threading.Thread(target=task, args=(None,)).start(), db, fetch)
+    with pytest.raises(TimeoutError):
+        service.request(['cloudfront'], '2026-01-02', '2026-01-02', timeout=0.05)
+
+
+def test_parse_request_validates_dates_and_types():
+    assert parse_request('start=2026-01-01&end=2026-01-07&type=cloudfront') == (
+        ['cloudfront'],
+        '2026-01-01',
+        '2026-01-07',
+    )
+    with pytest.raises(ValueError, match='YYYY-MM-DD'):
+        parse_request('start=2026-01-08&end=2026-01-07')
+    with pytest.raises(ValueError, match='Unknown report types: nope'):
+        parse_request('start=2026-01-01&end=2026-01-07&type=cloudfront,nope')
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 95) == 0.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 50) == 2.0
+    assert percentile([3.0, 1.0, 2.0, 4.0], 95) == 4.0
+
+
+def test_http_endpoints(db):
+    service = ReportService(lambda task: None, db)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{base}/report?start=2026-01-01&end=2026-01-01&type=cloudfront') as response:
+            assert json.load(response)['cached'] is True
+        with urllib.request.urlopen(f'{base}/stats') as response:
+            assert json.load(response)['requests'] == 1
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/report?start=bad&end=2026-01-01')
+        assert error.value.code == 400
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/report?start=2026-01-02&end=2026-01-02&type=cloudfront&timeout=0')
+        assert error.value.code == 504
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,195 @@
+"""Tests for sources module — source chains, resource limits and lifecycle."""
+
+import threading
+import time
+
+import pytest
+
+from scripts.deadline import deadline, pause
+from scripts.sources import Job, Resource, Source, SourceError, run_jobs
+
+
+class FakeSource(Source):
+    def __init__(self, name, resources=(), fail=(), delay=0.0):
+        self.name = name
+        self.resources = resources
+        self.fail = set(fail)
+        self.delay = delay
+        self.started_with = None
+        self.stopped = False
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def start(self, report_types, start_date, end_date):
+        self.started_with = list(report_types)
+
+    def fetch(self, report_type, start_date, end_date):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if report_type in self.fail:
+            raise SourceError('unavailable')
+        return {'type': report_type, 'source': self.name}
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_run_jobs_results_in_job_order_with_callback():
+    source = FakeSource('a')
+    seen = []
+    results = run_jobs([Job('x', [source]), Job('y', [source])], {}, 's', 'e', on_result=seen.append)
+    assert [r['type'] for r in results] == ['x', 'y']
+    assert sorted(r['type'] for r in seen) == ['x', 'y']
+    assert source.started_with == ['x', 'y']
+    assert source.stopped
+
+
+def test_run_jobs_falls_back_along_chain():
+    api, ui = FakeSource('api', fail={'x'}), FakeSource('ui')
+    results = run_jobs([Job('x', [api, ui]), Job('y', [api, ui])], {}, 's', 'e')
+    assert results == [{'type': 'x', 'source': 'ui'}, {'type': 'y', 'source': 'api'}]
+
+
+def test_run_jobs_last_source_error_raises():
+    with pytest.raises(SourceError):
+        run_jobs([Job('x', [FakeSource('a', fail={'x'})])], {}, 's', 'e')
+
+
+class PausingSource(FakeSource):
+    def fetch(self, report_type, start_date, end_date):
+        pause(self.delay)
+        return {'type': report_type, 'source': self.name}
+
+
+def test_run_jobs_drops_jobs_over_their_timeout(capsys):
+    slow, fast = PausingSource('slow', delay=5), PausingSource('fast')
+    results = run_jobs([Job('x', [slow]), Job('y', [fast])], {}, 's', 'e', job_timeout=0.05)
+    assert results == [{'type': 'y', 'source': 'fast'}]
+    assert '[x] Failed: time budget exhausted' in capsys.readouterr().out
+    assert slow.stopped
+
+
+def test_run_jobs_inherit_run_deadline():
+    with deadline(0.05):
+        assert run_jobs([Job('x', [PausingSource('slow', delay=5)])], {}, 's', 'e') == []
+
+
+def test_run_jobs_start_error_cached_and_skipped():
+    class BrokenStart(FakeSource):
+        calls = 0
+
+        def start(self, report_types, start_date, end_date):
+            BrokenStart.calls += 1
+            raise SourceError('no credentials')
+
+    broken, ui = BrokenStart('api'), FakeSource('ui')
+    results = run_jobs([Job('x', [broken, ui]), Job('y', [broken, ui])], {}, 's', 'e')
+    assert [r['source'] for r in results] == ['ui', 'ui']
+    assert BrokenStart.calls == 1
+    assert not broken.stopped
+
+
+def test_resource_capacity_limits_concurrency():
+    browser = FakeSource('browser', resources=('browser',), delay=0.02)
+    api = FakeSource('api', resources=('api',), delay=0.02)
+    resources = {'browser': Resource('browser'), 'api': Resource('api', capacity=3)}
+    jobs = [Job(f'b{i}', [browser]) for i in range(3)] + [Job(f'a{i}', [api]) for i in range(3)]
+    run_jobs(jobs, resources, 's', 'e')
+    assert browser.max_active == 1
+    assert api.max_active > 1
+
+
+def test_resource_grants_waiters_by_priority():
+    resource = Resource('browser')
+    resource.acquire(0)
+    order = []
+
+    def waiter(priority):
+        resource.acquire(priority)
+        order.append(priority)
+        resource.release()
+
+    threads = [threading.Thread(target=waiter, args=(p,)) for p in (3, 1, 2)]
+    for t in threads:
+        t.start()
+    while len(resource._waiting) < 3:
+        time.sleep(0.001)
+    resource.release()
+    for t in threads:
+        t.join()
+    assert order == [1, 2, 3]
+
+
+def test_resource_opened_lazily_once_and_closed():
+    events = []
+    resource = Resource('browser', open=lambda: events.append('open'), close=lambda: events.append('close'))
+    source = FakeSource('b', resources=('browser',))
+    run_jobs([Job('x', [source]), Job('y', [source])], {'browser': resource, 'aws': Resource('aws')}, 's', 'e')
+    assert events == ['open', 'close']
+
+
+def test_unused_resource_not_opened():
+    events = []
+    resource = Resource('browser', open=lambda: events.append('open'), close=lambda: events.append('close'))
+    run_jobs(
+        [Job('x', [FakeSource('cw', resources=('aws',))])], {'browser': resource, 'aws': Resource('aws')}, 's', 'e'
+    )
+    assert events == []
+
+
+def test_resource_open_failure_releases_slot():
+    def fail():
+        raise RuntimeError('login failed')
+
+    resource = Resource('browser', open=fail)
+    source = FakeSource('b', resources=('browser',))
+    with pytest.raises(RuntimeError, match='login failed'):
+        run_jobs([Job('x', [source]), Job('y', [source])], {'browser': resource}, 's', 'e')
+    assert resource._free == 1
+
+
+def test_run_jobs_unexpected_start_error_cached():
+    class CrashingStart(FakeSource):
+        calls = 0
+
+        def start(self, report_types, start_date, end_date):
+            CrashingStart.calls += 1
+            raise ValueError('bad table')
+
+    source = CrashingStart('batch')
+    with pytest.raises(ValueError, match='bad table'):
+        run_jobs([Job('x', [source]), Job('y', [source])], {}, 's', 'e')
+    assert CrashingStart.calls == 1
+
+
+def test_build_jobs_order_and_chains():
+    from scripts.akamai_report import build_jobs
+
+    jobs = build_jobs(['report_a', 'geography', 'cloudfront'], api=True)
+    assert [j.report_type for j in jobs] == ['report_a', 'geography', 'cloudfront']
+    assert [s.name for s in jobs[0].sources] == ['page-api', 'browser']
+    assert [s.name for s in jobs[2].sources] == ['cloudwatch']
+    assert jobs[0].sources[0] is jobs[1].sources[0]
+
+
+def test_build_jobs_single_apply_only_for_hostname_types():
+    from scripts.akamai_report import build_jobs
+
+    jobs = build_jobs(['report_a', 'report_b', 'geography'], single_apply=True)
+    assert [s.name for s in jobs[0].sources] == ['cp-batch', 'browser']
+    assert jobs[0].sources[0] is jobs[1].sources[0]
+    assert [s.name for s in jobs[2].sources] == ['browser']
+
+
+def test_build_jobs_datastream_first():
+    from scripts.akamai_report import build_jobs
+
+    jobs = build_jobs(['report_a', 'geography', 'cloudfront'], edgegrid=True, datastream=True)
+    assert [s.name for s in jobs[0].sources] == ['datastream', 'edgegrid', 'browser']
+    assert [s.name for s in jobs[1].sources] == ['datastream', 'edgegrid', 'browser']
+    assert [s.name for s in jobs[2].sources] == ['cloudwatch']
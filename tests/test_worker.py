@@ -0,0 +1,60 @@
+"""Tests for worker module — JSON-lines request handling over stdin/stdout."""
+
+import io
+import json
+
+import pytest
+
+from scripts.config import CLOUDFRONT_CONFIG
+from scripts.cube import Fact, add_facts, connect
+from scripts.service import ReportService
+from scripts.worker import handle, serve
+
+DIST = CLOUDFRONT_CONFIG.distribution_id
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = str(tmp_path / 'cube.db')
+    conn = connect(path)
+    add_facts(conn, [Fact('cloudfront', DIST, '', '', '', 'edge', '2026-01-01', '2026-01-01', 5)])
+    conn.close()
+
+    def fetch(types, start_date, end_date, browser):
+        print('fetching')  # progress output must not reach the protocol stream
+        return []
+
+    return ReportService(lambda task: task(None), path, fetch)
+
+
+def test_handle_report_from_cube(service):
+    response = handle(service, '{"id": 7, "start": "2026-01-01", "end": "2026-01-01", "type": "cloudfront"}')
+    assert response['id'] == 7
+    assert response['ok'] is True
+    assert response['cached'] is True
+    assert response['results'][0]['daily_bytes'] == {'01/01': 5}
+
+
+def test_handle_errors_keep_id(service):
+    assert handle(service, 'not json')['ok'] is False
+    response = handle(service, '{"id": "a", "start": "2026-01-01", "end": "2026-01-01", "type": ["nope"]}')
+    assert response == {'id': 'a', 'ok': False, 'error': 'ValueError: Unknown report types: nope'}
+    assert handle(service, '{"id": 3, "op": "restart"}')['error'] == "ValueError: unknown op 'restart'"
+
+
+def test_serve_answers_each_line_until_shutdown(service, capsys):
+    stdin = io.StringIO(
+        '{"id": 1, "start": "2026-01-02", "end": "2026-01-02", "type": "cloudfront"}\n'
+        '\n'
+        '{"id": 2, "op": "stats"}\n'
+        '{"id": 3, "op": "shutdown"}\n'
+        '{"id": 4, "op": "stats"}\n'
+    )
+    stdout = io.StringIO()
+    serve(service, stdin, stdout)
+    lines = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert lines[0]['ready'] is True
+    assert [line['id'] for line in lines[1:]] == [1, 2, 3]
+    assert lines[1]['missing'] == {'cloudfront': [['2026-01-02', '2026-01-02']]}
+    assert lines[2]['stats']['fetches'] == 1
+    assert 'fetching' in capsys.readouterr().err